@@ -1,10 +1,156 @@
-from sqlalchemy import create_engine
+from typing import Any, AsyncIterator, Dict, Optional
+import threading
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from config import settings
 
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait and how often they time out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            checkouts, timeouts, total_wait, max_wait = self.checkouts, self.timeouts, self.total_wait, self.max_wait
+        return {
+            "pool": "queue",
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "avg_wait_ms": round(total_wait / checkouts * 1000, 3) if checkouts else 0.0,
+            "max_wait_ms": round(max_wait * 1000, 3),
+        }
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """InstrumentedQueuePool for asyncio engines (checkouts wait on an asyncio-aware queue)."""
+
+
+def engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    create_engine() / create_async_engine() keyword arguments for the configured
+    pooling mode. PgBouncer mode leaves pooling to PgBouncer (NullPool); in-memory
+    SQLite keeps SQLAlchemy's default single-connection pool.
+    """
+
+    url = make_url(database_url)
+    is_postgres = url.get_backend_name() == "postgresql"
+    is_asyncpg = url.get_driver_name() == "asyncpg"
+    options: Dict[str, Any] = {}
+
+    if settings.db_pgbouncer_mode:
+        options["poolclass"] = NullPool
+        if is_asyncpg:
+            # Transaction pooling hands each transaction a different server connection,
+            # so asyncpg's statement cache must be off (SQLAlchemy's is disabled in the URL)
+            options["connect_args"] = {"statement_cache_size": 0}
+    elif url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+    else:
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if url.get_dialect().is_async else InstrumentedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+
+    # PgBouncer (transaction pooling) rejects startup options; the timeout is set per transaction instead
+    if is_postgres and settings.db_statement_timeout_ms and not settings.db_pgbouncer_mode:
+        if is_asyncpg:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+
+    return options
+
+
+def _set_local_statement_timeout(engine) -> None:
+    # PgBouncer mode: startup parameters are rejected, so set the timeout per transaction
+    if engine.dialect.name == "postgresql" and settings.db_statement_timeout_ms and settings.db_pgbouncer_mode:
+        timeout_ms = int(settings.db_statement_timeout_ms)
+
+        @event.listens_for(engine, "begin")
+        def set_statement_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+
+def create_db_engine(database_url: str):
+    """Create an engine with the pooling, pre-ping and timeout settings from config."""
+
+    engine = create_engine(database_url, **engine_options(database_url))
+    _set_local_statement_timeout(engine)
+    return engine
+
+
+def async_database_url(database_url: str) -> str:
+    """The async-driver form of a database URL (asyncpg for Postgres, aiosqlite for SQLite)."""
+
+    url = make_url(database_url)
+    if url.get_dialect().is_async:
+        return database_url
+    drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+    backend = url.get_backend_name()
+    if backend not in drivers:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return url.set(drivername=drivers[backend]).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(database_url: str) -> AsyncEngine:
+    """Async counterpart of create_db_engine(), sharing the same pool settings."""
+
+    url = make_url(async_database_url(database_url))
+    if settings.db_pgbouncer_mode and url.get_driver_name() == "asyncpg":
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+    url = url.render_as_string(hide_password=False)
+    engine = create_async_engine(url, **engine_options(url))
+    _set_local_statement_timeout(engine.sync_engine)
+    return engine
+
+
+def pool_stats(engine) -> Dict[str, Any]:
+    """Connection pool utilization for health checks and metrics."""
+
+    pool = engine.sync_engine.pool if isinstance(engine, AsyncEngine) else engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    return {"pool": type(pool).__name__, "status": pool.status()}
+
+
 # Create database engine
-engine = create_engine(settings.database_url)
+engine = create_db_engine(settings.database_url)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,6 +168,42 @@ def get_db():
         db.close()
 
 
+# Async engine for the async route variants (DB_ASYNC_ENABLED). Created on first use,
+# so the async driver is only required when async mode is switched on.
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """The process-wide async engine."""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_db_engine(settings.async_database_url or settings.database_url)
+        # Objects stay usable after commit without an implicit (async-incompatible) refresh
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency function to get an async database session."""
+    get_async_engine()
+    async with _async_session_factory() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    """Close the async engine's pooled connections (application shutdown)."""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
+
 def init_db():
-    """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
+    """
+    Initialize database tables for fresh dev/test databases.
+    Existing databases are migrated with `alembic upgrade head` (see migrations/).
+    """
+    if settings.db_auto_create_tables:
+        Base.metadata.create_all(bind=engine)
@@ -1,14 +1,40 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import time
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from database import init_db
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from database import dispose_async_engine, engine, init_db, pool_stats
+from services.auth_service import shutdown_hash_executor
 from config import settings
 from routes import auth, onboarding, dashboard, universities, ai_counsellor, todos
+from services.llm_provider import provider_registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize database and shared AI clients on startup, release them on shutdown."""
+    init_db()
+    print("✅ Database initialized")
+    
+    provider_registry.startup()
+    healthy = [name for name, state in provider_registry.health().items() if state["healthy"]]
+    print(f"✅ AI providers initialized (healthy: {healthy or 'none'})")
+    
+    yield
+    
+    await provider_registry.ashutdown()
+    print("✅ AI providers shut down")
+    await dispose_async_engine()
+    shutdown_hash_executor()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="AI Counsellor API",
     description="Backend API for AI-powered study-abroad planning system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -18,22 +44,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Include routers
-app.include_router(auth.router, prefix="/api")
-app.include_router(onboarding.router, prefix="/api")
-app.include_router(dashboard.router, prefix="/api")
-app.include_router(universities.router, prefix="/api")
-app.include_router(ai_counsellor.router, prefix="/api")
-app.include_router(todos.router, prefix="/api")
 
+def include_api_routers(app: FastAPI, async_db: bool = False) -> None:
+    """
+    Mount the API routers. With async_db the hot routes (dashboard, chat,
+    shortlist, todos) are served by their async-session variants, which are
+    mounted first so they take precedence over the sync routes on the same paths.
+    """
+    if async_db:
+        for module in (dashboard, universities, ai_counsellor, todos):
+            app.include_router(module.async_router, prefix="/api")
+    
+    app.include_router(auth.router, prefix="/api")
+    app.include_router(onboarding.router, prefix="/api")
+    app.include_router(dashboard.router, prefix="/api")
+    app.include_router(universities.router, prefix="/api")
+    app.include_router(ai_counsellor.router, prefix="/api")
+    app.include_router(todos.router, prefix="/api")
 
-@app.on_event("startup")
-def startup_event():
-    """Initialize database on startup."""
-    init_db()
-    print("✅ Database initialized")
+
+# Include routers
+include_api_routers(app, async_db=settings.db_async_enabled)
 
 
 @app.get("/")
@@ -52,6 +86,22 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/db")
+def database_health_check():
+    """Database round trip plus connection pool utilization."""
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=503, detail={"status": "unavailable", "error": str(e), "pool": pool_stats(engine)})
+    return {
+        "status": "healthy",
+        "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+        "pool": pool_stats(engine)
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
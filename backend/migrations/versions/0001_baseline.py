@@ -0,0 +1,139 @@
+"""Baseline schema (tables previously created by init_db)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Databases created by init_db() already have these tables; the migration skips
+any table that exists, so `alembic upgrade head` works on them directly.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    if op.get_context().as_sql:
+        return False  # offline (--sql) mode cannot inspect the database
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    if not _has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Uuid(), primary_key=True),
+            sa.Column("email", sa.String(255), nullable=False),
+            sa.Column("password_hash", sa.String(255), nullable=False),
+            sa.Column("full_name", sa.String(255), nullable=False),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if not _has_table("onboarding"):
+        op.create_table(
+            "onboarding",
+            sa.Column("id", sa.Uuid(), primary_key=True),
+            sa.Column("user_id", sa.Uuid(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True),
+            sa.Column("education_level", sa.String(100)),
+            sa.Column("degree", sa.String(255)),
+            sa.Column("major", sa.String(255)),
+            sa.Column("graduation_year", sa.Integer()),
+            sa.Column("gpa", sa.DECIMAL(3, 2)),
+            sa.Column("intended_degree", sa.String(100)),
+            sa.Column("field_of_study", sa.String(255)),
+            sa.Column("target_intake_year", sa.Integer()),
+            sa.Column("preferred_countries", sa.JSON()),
+            sa.Column("budget_range_min", sa.Integer()),
+            sa.Column("budget_range_max", sa.Integer()),
+            sa.Column("funding_type", sa.String(50)),
+            sa.Column("ielts_status", sa.String(50)),
+            sa.Column("ielts_score", sa.DECIMAL(2, 1)),
+            sa.Column("toefl_status", sa.String(50)),
+            sa.Column("toefl_score", sa.Integer()),
+            sa.Column("gre_status", sa.String(50)),
+            sa.Column("gre_score", sa.Integer()),
+            sa.Column("gmat_status", sa.String(50)),
+            sa.Column("gmat_score", sa.Integer()),
+            sa.Column("sop_status", sa.String(50)),
+            sa.Column("is_complete", sa.Boolean()),
+            sa.Column("completed_at", sa.TIMESTAMP()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+
+    if not _has_table("universities"):
+        op.create_table(
+            "universities",
+            sa.Column("id", sa.Uuid(), primary_key=True),
+            sa.Column("name", sa.String(255), nullable=False),
+            sa.Column("country", sa.String(100), nullable=False),
+            sa.Column("degree_type", sa.String(100), nullable=False),
+            sa.Column("field_of_study", sa.String(255)),
+            sa.Column("cost_level", sa.String(20)),
+            sa.Column("estimated_cost_min", sa.Integer()),
+            sa.Column("estimated_cost_max", sa.Integer()),
+            sa.Column("competitiveness", sa.String(20)),
+            sa.Column("avg_gpa_required", sa.DECIMAL(3, 2)),
+            sa.Column("min_ielts_required", sa.DECIMAL(2, 1)),
+            sa.Column("min_toefl_required", sa.Integer()),
+            sa.Column("min_gre_required", sa.Integer()),
+            sa.Column("description", sa.Text()),
+            sa.Column("website", sa.String(255)),
+            sa.Column("ranking", sa.Integer()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+
+    if not _has_table("chat_history"):
+        op.create_table(
+            "chat_history",
+            sa.Column("id", sa.Uuid(), primary_key=True),
+            sa.Column("user_id", sa.Uuid(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("role", sa.String(20), nullable=False),
+            sa.Column("message", sa.Text(), nullable=False),
+            sa.Column("actions", sa.JSON()),
+            sa.Column("suggested_questions", sa.JSON()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+
+    if not _has_table("todos"):
+        op.create_table(
+            "todos",
+            sa.Column("id", sa.Uuid(), primary_key=True),
+            sa.Column("user_id", sa.Uuid(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("university_id", sa.Uuid(), sa.ForeignKey("universities.id", ondelete="SET NULL")),
+            sa.Column("title", sa.String(255), nullable=False),
+            sa.Column("description", sa.Text()),
+            sa.Column("category", sa.String(50)),
+            sa.Column("priority", sa.String(20)),
+            sa.Column("deadline", sa.Date()),
+            sa.Column("is_complete", sa.Boolean()),
+            sa.Column("completed_at", sa.TIMESTAMP()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+
+    if not _has_table("user_universities"):
+        op.create_table(
+            "user_universities",
+            sa.Column("id", sa.Uuid(), primary_key=True),
+            sa.Column("user_id", sa.Uuid(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("university_id", sa.Uuid(), sa.ForeignKey("universities.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("category", sa.String(20)),
+            sa.Column("acceptance_likelihood", sa.String(20)),
+            sa.Column("fit_reason", sa.Text()),
+            sa.Column("risk_factors", sa.Text()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+
+
+def downgrade() -> None:
+    for table in ("user_universities", "todos", "chat_history", "universities", "onboarding", "users"):
+        op.drop_table(table)
@@ -0,0 +1,45 @@
+"""Precomputed recommendations table and field-of-study search index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    if op.get_context().as_sql or not sa.inspect(bind).has_table("precomputed_recommendations"):
+        op.create_table(
+            "precomputed_recommendations",
+            sa.Column("id", sa.Uuid(), primary_key=True),
+            sa.Column("user_id", sa.Uuid(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("university_id", sa.Uuid(), sa.ForeignKey("universities.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("position", sa.Integer(), nullable=False),
+            sa.Column("category", sa.String(20)),
+            sa.Column("acceptance_likelihood", sa.String(20)),
+            sa.Column("acceptance_score", sa.DECIMAL(4, 1)),
+            sa.Column("reason_bits", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("profile_key", sa.String(32), nullable=False),
+            sa.Column("catalog_version", sa.String(100), nullable=False),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+
+    if bind.dialect.name == "postgresql":
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_universities_field_of_study_fts ON universities "
+            "USING gin (to_tsvector('simple', coalesce(field_of_study, '')))"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_universities_field_of_study_fts")
+    op.drop_table("precomputed_recommendations")
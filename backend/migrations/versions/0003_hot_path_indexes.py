@@ -0,0 +1,58 @@
+"""Composite indexes for the hot queries and one row per (user, university)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+On Postgres the indexes are built with CREATE INDEX CONCURRENTLY outside the
+migration transaction, so writes are not blocked while they build.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, unique)
+INDEXES = [
+    ("uq_user_universities_user_university", "user_universities", ["user_id", "university_id"], True),
+    ("ix_user_universities_user_status", "user_universities", ["user_id", "status", "created_at"], False),
+    ("ix_todos_user_order", "todos", ["user_id", "is_complete", sa.text("priority DESC"), sa.text("created_at DESC")], False),
+    ("ix_chat_history_user_created", "chat_history", ["user_id", "created_at"], False),
+    ("ix_precomputed_recommendations_lookup", "precomputed_recommendations",
+     ["user_id", "profile_key", "catalog_version", "position"], False),
+]
+
+# Keep one row per (user, university) before the unique index: locked beats
+# shortlisted, then the oldest row wins.
+DEDUPLICATE_USER_UNIVERSITIES = """
+DELETE FROM user_universities WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY user_id, university_id
+            ORDER BY CASE status WHEN 'locked' THEN 0 ELSE 1 END, created_at, id
+        ) AS duplicate_rank
+        FROM user_universities
+    ) ranked
+    WHERE duplicate_rank > 1
+)
+"""
+
+
+def upgrade() -> None:
+    op.execute(DEDUPLICATE_USER_UNIVERSITIES)
+
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, columns, unique in INDEXES:
+                op.create_index(name, table, columns, unique=unique, if_not_exists=True, postgresql_concurrently=True)
+    else:
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
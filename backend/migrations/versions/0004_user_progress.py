@@ -0,0 +1,44 @@
+"""Per-user progress summary table
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Rows are written by the application on every progress-related commit. Fill
+them for existing users with `python reconcile_progress.py` after upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table("user_progress"):
+        return
+
+    op.create_table(
+        "user_progress",
+        sa.Column("user_id", sa.Uuid(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("shortlisted_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("locked_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("dream_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("target_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("safe_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("open_todos_high", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("open_todos_medium", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("open_todos_low", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("profile_academic", sa.String(20)),
+        sa.Column("profile_exams", sa.String(20)),
+        sa.Column("profile_sop", sa.String(20)),
+        sa.Column("profile_score", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("current_stage", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_progress")
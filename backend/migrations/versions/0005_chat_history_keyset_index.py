@@ -0,0 +1,37 @@
+"""Add id to the chat history index for (created_at, id) keyset pagination
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+On Postgres the new index is built concurrently under a temporary name and
+swapped in, so history reads keep an index while it builds.
+"""
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+INDEX = "ix_chat_history_user_created"
+BUILDING = "ix_chat_history_user_created_id"
+
+
+def _replace_index(columns) -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(BUILDING, "chat_history", columns, if_not_exists=True, postgresql_concurrently=True)
+            op.drop_index(INDEX, table_name="chat_history", if_exists=True, postgresql_concurrently=True)
+            op.execute(f"ALTER INDEX {BUILDING} RENAME TO {INDEX}")
+    else:
+        op.drop_index(INDEX, table_name="chat_history", if_exists=True)
+        op.create_index(INDEX, "chat_history", columns)
+
+
+def upgrade() -> None:
+    _replace_index(["user_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    _replace_index(["user_id", "created_at"])
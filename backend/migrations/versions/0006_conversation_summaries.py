@@ -0,0 +1,35 @@
+"""Rolling per-user conversation summaries
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+Rows are created after a user's next counsellor turn; until then the prompt
+falls back to the recent-message window alone.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table("conversation_summaries"):
+        return
+
+    op.create_table(
+        "conversation_summaries",
+        sa.Column("user_id", sa.Uuid(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("summary", sa.Text(), nullable=False, server_default=""),
+        sa.Column("summarized_until", sa.TIMESTAMP()),
+        sa.Column("summarized_message_id", sa.Uuid()),
+        sa.Column("message_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("conversation_summaries")
@@ -0,0 +1,30 @@
+"""Track in-place university updates
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+The catalog snapshot (and the ranking, reason and precomputed recommendation
+caches keyed on its version) is re-validated on max(updated_at), so edits to
+cost, requirements or competitiveness are picked up without a restart.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not op.get_context().as_sql:
+        columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("universities")}
+        if "updated_at" in columns:
+            return
+
+    op.add_column("universities", sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()))
+
+
+def downgrade() -> None:
+    op.drop_column("universities", "updated_at")
@@ -1,11 +1,14 @@
-from .user import User, Onboarding, ChatHistory, Todo
-from .university import University, UserUniversity
+from .user import User, Onboarding, ChatHistory, Todo, UserProgress, ConversationSummary
+from .university import University, UserUniversity, PrecomputedRecommendation
 
 __all__ = [
     "User",
     "Onboarding",
     "ChatHistory",
     "Todo",
+    "UserProgress",
+    "ConversationSummary",
     "University",
     "UserUniversity",
+    "PrecomputedRecommendation",
 ]
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, Integer, DECIMAL, TIMESTAMP, Text, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, DECIMAL, TIMESTAMP, Text, ForeignKey, Uuid, DDL, event, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from datetime import datetime
 import uuid
 from database import Base
 
@@ -10,7 +10,7 @@ class University(Base):
     """University model."""
     __tablename__ = "universities"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False)
     country = Column(String(100), nullable=False)
     degree_type = Column(String(100), nullable=False)  # bachelors, masters, mba, phd
@@ -34,18 +34,38 @@ class University(Base):
     ranking = Column(Integer)
     
     created_at = Column(TIMESTAMP, server_default=func.now())
+    # Set in Python for microsecond resolution; part of the catalog snapshot version
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now())
     
     # Relationships
     user_universities = relationship("UserUniversity", back_populates="university", cascade="all, delete-orphan")
 
 
+# Field-of-study full-text index (Postgres only) for token matching.
+# See services/field_matching.py.
+event.listen(
+    University.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS ix_universities_field_of_study_fts ON universities "
+        "USING gin (to_tsvector('simple', coalesce(field_of_study, '')))"
+    ).execute_if(dialect="postgresql")
+)
+
+
 class UserUniversity(Base):
     """User's shortlisted/locked universities with AI analysis."""
     __tablename__ = "user_universities"
+    __table_args__ = (
+        # A university appears at most once per user (shortlisted or locked)
+        Index("uq_user_universities_user_university", "user_id", "university_id", unique=True),
+        # Shortlisted/locked lists and counts: WHERE user_id = ? AND status = ? ORDER BY created_at
+        Index("ix_user_universities_user_status", "user_id", "status", "created_at"),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    university_id = Column(UUID(as_uuid=True), ForeignKey("universities.id", ondelete="CASCADE"), nullable=False)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    university_id = Column(Uuid(as_uuid=True), ForeignKey("universities.id", ondelete="CASCADE"), nullable=False)
     
     status = Column(String(20), nullable=False)  # shortlisted, locked
     category = Column(String(20))  # dream, target, safe
@@ -61,3 +81,27 @@ class UserUniversity(Base):
     # Relationships
     user = relationship("User", back_populates="user_universities")
     university = relationship("University", back_populates="user_universities")
+
+
+class PrecomputedRecommendation(Base):
+    """Recommendations written by the offline batch job, served while still current."""
+    __tablename__ = "precomputed_recommendations"
+    __table_args__ = (
+        Index("ix_precomputed_recommendations_lookup", "user_id", "profile_key", "catalog_version", "position"),
+    )
+    
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    university_id = Column(Uuid(as_uuid=True), ForeignKey("universities.id", ondelete="CASCADE"), nullable=False)
+    
+    position = Column(Integer, nullable=False)  # order among eligible universities in the catalog
+    category = Column(String(20))  # dream, target, safe
+    acceptance_likelihood = Column(String(20))  # low, medium, high
+    acceptance_score = Column(DECIMAL(4, 1))
+    reason_bits = Column(Integer, nullable=False, default=0)  # REASON_BITS codes; prose rendered on demand
+    
+    # Rows are only served if the profile and catalog still match what was scored
+    profile_key = Column(String(32), nullable=False)
+    catalog_version = Column(String(100), nullable=False)
+    
+    created_at = Column(TIMESTAMP, server_default=func.now())
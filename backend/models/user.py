@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, Boolean, Integer, DECIMAL, TIMESTAMP, Text, ForeignKey, Date, JSON
-from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from sqlalchemy import Column, String, Boolean, Integer, DECIMAL, TIMESTAMP, Text, ForeignKey, Date, JSON, Uuid, Index
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 import uuid
 from database import Base
 
@@ -10,7 +10,7 @@ class User(Base):
     """User account model."""
     __tablename__ = "users"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String(255), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
     full_name = Column(String(255), nullable=False)
@@ -28,8 +28,8 @@ class Onboarding(Base):
     """User onboarding data model."""
     __tablename__ = "onboarding"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), unique=True, nullable=False)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), unique=True, nullable=False)
     
     # Academic Background
     education_level = Column(String(100))
@@ -74,9 +74,14 @@ class Onboarding(Base):
 class ChatHistory(Base):
     """AI counsellor chat history model."""
     __tablename__ = "chat_history"
+    __table_args__ = (
+        # History pages and prompt context: WHERE user_id = ? [AND (created_at, id) < (?, ?)]
+        # ORDER BY created_at DESC, id DESC LIMIT n
+        Index("ix_chat_history_user_created", "user_id", "created_at", "id"),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     role = Column(String(20), nullable=False)  # user, assistant
     message = Column(Text, nullable=False)
@@ -94,10 +99,14 @@ class ChatHistory(Base):
 class Todo(Base):
     """User todo/task model."""
     __tablename__ = "todos"
+    __table_args__ = (
+        # Todo list and dashboard: WHERE user_id = ? ORDER BY is_complete, priority DESC, created_at DESC
+        Index("ix_todos_user_order", "user_id", "is_complete", text("priority DESC"), text("created_at DESC")),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    university_id = Column(UUID(as_uuid=True), ForeignKey("universities.id", ondelete="SET NULL"))
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    university_id = Column(Uuid(as_uuid=True), ForeignKey("universities.id", ondelete="SET NULL"))
     
     title = Column(String(255), nullable=False)
     description = Column(Text)
@@ -113,3 +122,52 @@ class Todo(Base):
     
     # Relationships
     user = relationship("User", back_populates="todos")
+
+
+class UserProgress(Base):
+    """
+    Per-user progress summary, recomputed in the same transaction as every write
+    to onboarding, user_universities or todos (see services.progress_service).
+    """
+    __tablename__ = "user_progress"
+    
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    
+    # University list by status and category
+    shortlisted_count = Column(Integer, nullable=False, default=0)
+    locked_count = Column(Integer, nullable=False, default=0)
+    dream_count = Column(Integer, nullable=False, default=0)
+    target_count = Column(Integer, nullable=False, default=0)
+    safe_count = Column(Integer, nullable=False, default=0)
+    
+    # Open todos by priority
+    open_todos_high = Column(Integer, nullable=False, default=0)
+    open_todos_medium = Column(Integer, nullable=False, default=0)
+    open_todos_low = Column(Integer, nullable=False, default=0)
+    
+    # Profile strength and stage
+    profile_academic = Column(String(20))
+    profile_exams = Column(String(20))
+    profile_sop = Column(String(20))
+    profile_score = Column(Integer, nullable=False, default=0)
+    current_stage = Column(Integer, nullable=False, default=1)
+    
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+
+class ConversationSummary(Base):
+    """
+    Rolling summary of a user's counsellor conversation. Messages up to the
+    (summarized_until, summarized_message_id) history key are folded into the
+    summary; newer ones are sent verbatim (see services.memory_service).
+    """
+    __tablename__ = "conversation_summaries"
+    
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    
+    summary = Column(Text, nullable=False, default="")
+    summarized_until = Column(TIMESTAMP)
+    summarized_message_id = Column(Uuid(as_uuid=True))
+    message_count = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
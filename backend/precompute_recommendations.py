@@ -0,0 +1,29 @@
+import sys
+import os
+import argparse
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal, init_db
+from services.recommendation_batch import precompute_recommendations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute university recommendations for all onboarded users.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="scoring processes")
+    parser.add_argument("--chunk-size", type=int, default=256, help="profiles scored per matrix operation")
+    args = parser.parse_args()
+    
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f"Scoring profiles with {args.workers} worker(s)...")
+        count = precompute_recommendations(db, chunk_size=args.chunk_size, workers=args.workers)
+        print(f"Precomputed recommendations for {count} users.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
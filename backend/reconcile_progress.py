@@ -0,0 +1,27 @@
+import sys
+import os
+import argparse
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal, init_db
+from services.progress_service import reconcile_user_progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the user_progress summary rows from the underlying tables.")
+    parser.add_argument("--batch-size", type=int, default=500, help="users refreshed per transaction")
+    args = parser.parse_args()
+    
+    init_db()
+    db = SessionLocal()
+    try:
+        count = reconcile_user_progress(db, batch_size=args.batch_size)
+        print(f"Reconciled progress for {count} users.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
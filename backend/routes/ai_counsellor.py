@@ -1,14 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models.user import User, ChatHistory
-from schemas.ai import ChatRequest, ChatResponse, ChatHistoryResponse
-from services.ai_service import AICounsellorService
-from utils.dependencies import require_onboarding_complete
+from typing import List, Optional, Union
+import json
+import traceback
+from database import get_async_db, get_db
+from models.user import User, ChatHistory, ConversationSummary
+from schemas.ai import ChatRequest, ChatResponse, ChatHistoryCompactResponse, ChatHistoryResponse
+from services.ai_service import AICounsellorService, provider_router
+from services.history_service import get_history_page, serialize_history
+from services.memory_service import session_runner, update_conversation_summary
+from services.llm_provider import provider_registry
+from services.response_cache import response_cache
+from utils.dependencies import (
+    Principal,
+    require_onboarding_complete,
+    require_onboarding_complete_async,
+    require_onboarded_principal
+)
 from config import settings
 
 router = APIRouter(prefix="/counsellor", tags=["AI Counsellor"])
+# Async variants of the chat route, served instead when DB_ASYNC_ENABLED is set
+async_router = APIRouter(prefix="/counsellor", tags=["AI Counsellor"])
+
+
+def _chat_failure(error: Exception) -> HTTPException:
+    """Write the traceback of a failed chat turn to error.log and map it to a 500. Call from an except block."""
+    with open("error.log", "w") as f:
+        f.write(traceback.format_exc())
+    return HTTPException(status_code=500, detail=str(error))
 
 
 @router.get("/health")
@@ -18,13 +42,27 @@ def health_check():
         "ai_service": settings.ai_service,
         "gemini_key_configured": bool(settings.gemini_api_key),
         "openai_key_configured": bool(settings.openai_api_key),
+        "providers": provider_registry.health(),
+        "routing_order": provider_router.stats()["order"],
         "status": "healthy"
     }
 
 
+@router.get("/metrics")
+def metrics():
+    """AI usage counters: prompt tokens served from provider caches, retries and breaker state, routing, reply cache hit rates."""
+    return {
+        "prompt_tokens": provider_registry.token_stats(),
+        "resilience": provider_registry.resilience_stats(),
+        "routing": provider_router.stats(),
+        "response_cache": response_cache.stats()
+    }
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(require_onboarding_complete),
     db: Session = Depends(get_db)
 ):
@@ -42,28 +80,52 @@ async def chat(
             onboarding
         )
         
-        # Save user message
-        user_msg = ChatHistory(
-            user_id=current_user.id,
-            role="user",
-            message=request.message
+        # Persist the turn and run actions off the event loop
+        await run_in_threadpool(
+            ai_service.save_turn,
+            current_user.id,
+            request.message,
+            response
         )
-        db.add(user_msg)
         
-        # Save assistant response
-        assistant_msg = ChatHistory(
-            user_id=current_user.id,
-            role="assistant",
+        # Fold older messages into the rolling summary once the reply is sent
+        background_tasks.add_task(
+            update_conversation_summary, current_user.id, session_runner(db.get_bind())
+        )
+        
+        return ChatResponse(
             message=response["message"],
             actions=response.get("actions"),
             suggested_questions=response.get("suggested_questions")
         )
-        db.add(assistant_msg)
-        db.commit()
+    except Exception as e:
+        raise _chat_failure(e)
+
+
+@async_router.post("/chat", response_model=ChatResponse)
+async def chat_async(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(require_onboarding_complete_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Chat with AI Counsellor and get actionable responses.
+    The service's session work runs through AsyncSession.run_sync, so its queries
+    use the async driver on the event loop instead of occupying a threadpool thread.
+    """
+    try:
+        onboarding = current_user.onboarding
+        ai_service = AICounsellorService(db.sync_session)
         
-        # Execute actions if present
-        if response.get("actions"):
-            ai_service.execute_actions(str(current_user.id), response["actions"])
+        prompt = await db.run_sync(
+            lambda session: ai_service.build_prompt(str(current_user.id), request.message, onboarding)
+        )
+        response = await ai_service.generate_response(prompt)
+        await db.run_sync(
+            lambda session: ai_service.save_turn(current_user.id, request.message, response)
+        )
+        background_tasks.add_task(update_conversation_summary, current_user.id, session_runner(db.bind))
         
         return ChatResponse(
             message=response["message"],
@@ -71,34 +133,99 @@ async def chat(
             suggested_questions=response.get("suggested_questions")
         )
     except Exception as e:
-        import traceback
-        with open("error.log", "w") as f:
-            f.write(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _chat_failure(e)
 
 
-@router.get("/history", response_model=List[ChatHistoryResponse])
-def get_chat_history(
-    limit: int = 50,
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
     current_user: User = Depends(require_onboarding_complete),
     db: Session = Depends(get_db)
 ):
-    """Get chat history with AI Counsellor."""
+    """
+    Chat with AI Counsellor over Server-Sent Events.
+    Emits `token` events as text arrives and a final `done` event carrying the
+    full message, actions and suggested questions after the turn is saved.
+    """
+    onboarding = current_user.onboarding
+    ai_service = AICounsellorService(db)
+    
+    # Build the prompt while the request-scoped session is still open
+    prompt = await run_in_threadpool(
+        ai_service.build_prompt,
+        str(current_user.id),
+        request.message,
+        onboarding
+    )
+    
+    async def event_stream():
+        events = ai_service.stream_ai_response(
+            str(current_user.id),
+            request.message,
+            prompt
+        )
+        try:
+            async for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            traceback.print_exc()
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Runs after the last event, once the turn has been saved
+        background=BackgroundTask(
+            update_conversation_summary, current_user.id, session_runner(db.get_bind())
+        )
+    )
+
+
+@router.get(
+    "/history",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "model": Union[List[ChatHistoryResponse], List[ChatHistoryCompactResponse]],
+            "description": "Messages oldest first; compact=true entries carry only id, role, message and created_at.",
+            "headers": {
+                "X-Next-Cursor": {
+                    "description": "Pass back as `before` for the page of older messages; absent on the last page.",
+                    "schema": {"type": "string"}
+                }
+            }
+        }
+    }
+)
+def get_chat_history(
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    compact: bool = False,
+    current_user: Principal = Depends(require_onboarded_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Get chat history with AI Counsellor, oldest first.
+    Pass the X-Next-Cursor response header back as `before` to fetch the page of
+    older messages; compact=true leaves out actions and suggested questions.
+    """
     try:
-        history = db.query(ChatHistory).filter(
-            ChatHistory.user_id == current_user.id
-        ).order_by(ChatHistory.created_at.desc()).limit(limit).all()
-        
-        return list(reversed(history))
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+        rows, next_cursor = get_history_page(db, current_user.id, limit, cursor=before, compact=compact)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return StreamingResponse(
+        serialize_history(rows, compact=compact),
+        media_type="application/json",
+        headers=headers
+    )
 
 
 @router.delete("/history")
 def clear_chat_history(
-    current_user: User = Depends(require_onboarding_complete),
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Clear chat history."""
@@ -107,6 +234,11 @@ def clear_chat_history(
         ChatHistory.user_id == current_user.id
     ).delete()
     
+    # The rolling summary is built from the cleared messages
+    db.query(ConversationSummary).filter(
+        ConversationSummary.user_id == current_user.id
+    ).delete()
+    
     db.commit()
     
     return {"message": "Chat history cleared"}
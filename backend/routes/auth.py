@@ -1,19 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from typing import Optional
 from database import get_db
 from models.user import User
 from schemas.auth import SignupRequest, LoginRequest, TokenResponse, UserResponse
-from services.auth_service import get_password_hash, verify_password, create_access_token
+from services.auth_service import hash_password_async, verify_and_update_password_async, create_access_token
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+def _find_user(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _create_user(db: Session, email: str, password_hash: str, full_name: str) -> User:
+    user = User(
+        email=email,
+        password_hash=password_hash,
+        full_name=full_name
+    )
+    
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def _update_password_hash(db: Session, user: User, password_hash: str) -> None:
+    user.password_hash = password_hash
+    db.commit()
+
+
 @router.post("/signup", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
-def signup(request: SignupRequest, db: Session = Depends(get_db)):
-    """Register a new user account."""
+async def signup(request: SignupRequest, db: Session = Depends(get_db)):
+    """
+    Register a new user account.
+    Hashing runs on the dedicated hashing pool and database work in the
+    threadpool, so no request thread is held for the hash.
+    """
     
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == request.email).first()
+    existing_user = await run_in_threadpool(_find_user, db, request.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -21,15 +49,8 @@ def signup(request: SignupRequest, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    user = User(
-        email=request.email,
-        password_hash=get_password_hash(request.password),
-        full_name=request.full_name
-    )
-    
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    password_hash = await hash_password_async(request.password)
+    user = await run_in_threadpool(_create_user, db, request.email, password_hash, request.full_name)
     
     # Create access token
     access_token = create_access_token(data={"sub": str(user.id)})
@@ -38,19 +59,27 @@ def signup(request: SignupRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: Session = Depends(get_db)):
     """Authenticate user and return JWT token."""
     
     # Find user
-    user = db.query(User).filter(User.email == request.email).first()
+    user = await run_in_threadpool(_find_user, db, request.email)
     
-    if not user or not verify_password(request.password, user.password_hash):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_and_update_password_async(request.password, user.password_hash)
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Hashing parameters changed since this password was stored
+    if new_hash:
+        await run_in_threadpool(_update_password_hash, db, user, new_hash)
+    
     # Create access token
     access_token = create_access_token(data={"sub": str(user.id)})
     
@@ -1,57 +1,151 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models.user import User, Todo
-from models.university import UserUniversity
-from schemas.dashboard import DashboardResponse, ProfileStrength, StageInfo, TodoItem
-from services.profile_service import calculate_profile_strength, determine_stage
-from utils.dependencies import require_onboarding_complete
+from fastapi import APIRouter, Depends, Request, Response, status
+from sqlalchemy import select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from typing import Any, Optional, Sequence, Tuple
+import hashlib
+from database import get_async_db, get_db
+from models.user import Todo, UserProgress
+from schemas.dashboard import DashboardResponse, ProfileStrength, StageInfo
+from services.profile_service import stage_info
+from services.progress_service import refresh_user_progress
+from services.cache_service import VersionedCache, get_user_version
+from utils.dependencies import Principal, require_onboarded_principal, require_onboarded_principal_async
+from config import settings
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+# Async variants of the routes above, served instead when DB_ASYNC_ENABLED is set
+async_router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+# Serialized dashboards with their ETags, rebuilt after writes to onboarding,
+# universities or todos bump the user's data version
+dashboard_cache = VersionedCache(ttl_seconds=settings.dashboard_cache_ttl_seconds)
 
-@router.get("/", response_model=DashboardResponse)
-def get_dashboard(
-    current_user: User = Depends(require_onboarding_complete),
-    db: Session = Depends(get_db)
-):
-    """Get dashboard data including profile strength, stage, and todos."""
-    
-    onboarding = current_user.onboarding
-    
-    # Calculate profile strength
-    strength_data = calculate_profile_strength(onboarding)
-    profile_strength = ProfileStrength(**strength_data)
-    
-    # Get university counts
-    shortlisted_count = db.query(UserUniversity).filter(
-        UserUniversity.user_id == current_user.id,
-        UserUniversity.status == "shortlisted"
-    ).count()
-    
-    locked_count = db.query(UserUniversity).filter(
-        UserUniversity.user_id == current_user.id,
-        UserUniversity.status == "locked"
-    ).count()
-    
-    # Determine stage
-    stage_data = determine_stage(onboarding, shortlisted_count, locked_count)
-    stage_info = StageInfo(**stage_data)
-    
-    # Get todos (top 10, incomplete first)
-    todos = db.query(Todo).filter(
-        Todo.user_id == current_user.id
+
+def top_todos_statement(user_id: Any, limit: int = 10):
+    """Top todos for the dashboard, incomplete first."""
+    return select(Todo).where(
+        Todo.user_id == user_id
     ).order_by(
         Todo.is_complete.asc(),
         Todo.priority.desc(),
         Todo.created_at.desc()
-    ).limit(10).all()
+    ).limit(limit)
+
+
+def dashboard_statement(user_id: Any):
+    """
+    Everything the dashboard reads, in one round trip: the user's progress row
+    (primary-key lookup) with the top todos LEFT JOINed, one row per todo.
+    """
+    top_todo = aliased(Todo, top_todos_statement(user_id).subquery("top_todos"))
+    
+    return select(
+        UserProgress,
+        top_todo
+    ).outerjoin(
+        top_todo, true()
+    ).where(
+        UserProgress.user_id == user_id
+    ).order_by(
+        top_todo.is_complete.asc(),
+        top_todo.priority.desc(),
+        top_todo.created_at.desc()
+    )
+
+
+def build_dashboard(rows: Sequence[Any]) -> DashboardResponse:
+    """Assemble the dashboard from the rows of dashboard_statement()."""
+    
+    progress = rows[0][0]
+    todos = [todo for _, todo in rows if todo is not None]
     
     return DashboardResponse(
-        profile_strength=profile_strength,
-        stage_info=stage_info,
+        profile_strength=ProfileStrength(
+            academic=progress.profile_academic,
+            exams=progress.profile_exams,
+            sop=progress.profile_sop,
+            overall_score=progress.profile_score
+        ),
+        stage_info=StageInfo(**stage_info(progress.current_stage)),
         todos=todos,
-        shortlisted_count=shortlisted_count,
-        locked_count=locked_count
+        shortlisted_count=progress.shortlisted_count,
+        locked_count=progress.locked_count
     )
+
+
+def cache_dashboard(user_id: Any, version: int, dashboard: DashboardResponse) -> Tuple[str, bytes]:
+    """Serialize the dashboard once and cache it with its ETag."""
+    
+    body = dashboard.model_dump_json().encode()
+    # Content hash rather than the version, so ETags agree across workers
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    dashboard_cache.set(user_id, version, (etag, body))
+    return etag, body
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison)."""
+    
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+
+def dashboard_response(request: Request, etag: str, body: bytes) -> Response:
+    """200 with the cached body, or 304 when the client already has this version."""
+    
+    # Clients must revalidate, which costs no DB work while the cache is warm
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/", response_model=DashboardResponse)
+def get_dashboard(
+    request: Request,
+    current_user: Principal = Depends(require_onboarded_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Get dashboard data including profile strength, stage, and todos.
+    Supports If-None-Match: unchanged dashboards are answered with 304.
+    """
+    
+    # Read the version before loading so a concurrent write leaves the entry stale
+    version = get_user_version(current_user.id)
+    cached = dashboard_cache.get(current_user.id, version)
+    if cached is None:
+        rows = db.execute(dashboard_statement(current_user.id)).all()
+        if not rows:
+            # Progress row not built yet (e.g. before reconcile_progress.py has run)
+            refresh_user_progress(db, [current_user.id])
+            db.commit()
+            rows = db.execute(dashboard_statement(current_user.id)).all()
+        cached = cache_dashboard(current_user.id, version, build_dashboard(rows))
+    return dashboard_response(request, *cached)
+
+
+@async_router.get("/", response_model=DashboardResponse)
+async def get_dashboard_async(
+    request: Request,
+    current_user: Principal = Depends(require_onboarded_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get dashboard data including profile strength, stage, and todos.
+    Supports If-None-Match: unchanged dashboards are answered with 304.
+    """
+    
+    version = get_user_version(current_user.id)
+    cached = dashboard_cache.get(current_user.id, version)
+    if cached is None:
+        rows = (await db.execute(dashboard_statement(current_user.id))).all()
+        if not rows:
+            await db.run_sync(refresh_user_progress, [current_user.id])
+            await db.commit()
+            rows = (await db.execute(dashboard_statement(current_user.id))).all()
+        cached = cache_dashboard(current_user.id, version, build_dashboard(rows))
+    return dashboard_response(request, *cached)
@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from datetime import datetime
 from database import get_db
-from models.user import User, Onboarding
+from models.user import Onboarding
 from schemas.onboarding import OnboardingRequest, OnboardingResponse
-from utils.dependencies import get_current_user
+from services.cache_service import bump_user_version
+from utils.dependencies import Principal, get_current_principal
 
 router = APIRouter(prefix="/onboarding", tags=["Onboarding"])
 
@@ -12,7 +13,7 @@ router = APIRouter(prefix="/onboarding", tags=["Onboarding"])
 @router.post("/", response_model=OnboardingResponse, status_code=status.HTTP_201_CREATED)
 def submit_onboarding(
     request: OnboardingRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Submit or update onboarding data."""
@@ -41,13 +42,14 @@ def submit_onboarding(
     
     db.commit()
     db.refresh(onboarding)
+    bump_user_version(current_user.id)
     
     return onboarding
 
 
 @router.get("/", response_model=OnboardingResponse)
 def get_onboarding(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get user's onboarding data."""
@@ -67,7 +69,7 @@ def get_onboarding(
 
 @router.get("/status")
 def get_onboarding_status(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Check if user has completed onboarding."""
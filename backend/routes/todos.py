@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, List, Optional
 from datetime import datetime
-from database import get_db
-from models.user import User, Todo
-from utils.dependencies import require_onboarding_complete
+from database import get_async_db, get_db
+from models.user import Todo
+from services.cache_service import bump_user_version
+from utils.dependencies import Principal, require_onboarded_principal, require_onboarded_principal_async
 from pydantic import BaseModel
 from datetime import date
 import uuid
 
 router = APIRouter(prefix="/todos", tags=["Todos"])
+# Async variants of the routes below, served instead when DB_ASYNC_ENABLED is set
+async_router = APIRouter(prefix="/todos", tags=["Todos"])
 
 
 class TodoCreate(BaseModel):
@@ -35,10 +40,10 @@ class TodoResponse(BaseModel):
     """Todo response."""
     id: uuid.UUID
     title: str
-    description: str = None
+    description: Optional[str] = None
     category: str
     priority: str
-    deadline: date = None
+    deadline: Optional[date] = None
     is_complete: bool
     created_at: datetime
     
@@ -46,10 +51,28 @@ class TodoResponse(BaseModel):
         from_attributes = True
 
 
+def todo_list_statement(user_id: Any, completed: Optional[bool] = None, category: Optional[str] = None):
+    """A user's todos, optionally filtered, incomplete and high priority first."""
+    
+    statement = select(Todo).where(Todo.user_id == user_id)
+    
+    if completed is not None:
+        statement = statement.where(Todo.is_complete == completed)
+    
+    if category:
+        statement = statement.where(Todo.category == category)
+    
+    return statement.order_by(
+        Todo.is_complete.asc(),
+        Todo.priority.desc(),
+        Todo.created_at.desc()
+    )
+
+
 @router.post("/", response_model=TodoResponse, status_code=status.HTTP_201_CREATED)
 def create_todo(
     request: TodoCreate,
-    current_user: User = Depends(require_onboarding_complete),
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Create a new todo."""
@@ -62,6 +85,7 @@ def create_todo(
     db.add(todo)
     db.commit()
     db.refresh(todo)
+    bump_user_version(current_user.id)
     
     return todo
 
@@ -70,32 +94,18 @@ def create_todo(
 def get_todos(
     completed: bool = None,
     category: str = None,
-    current_user: User = Depends(require_onboarding_complete),
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Get all todos with optional filters."""
     
-    query = db.query(Todo).filter(Todo.user_id == current_user.id)
-    
-    if completed is not None:
-        query = query.filter(Todo.is_complete == completed)
-    
-    if category:
-        query = query.filter(Todo.category == category)
-    
-    todos = query.order_by(
-        Todo.is_complete.asc(),
-        Todo.priority.desc(),
-        Todo.created_at.desc()
-    ).all()
-    
-    return todos
+    return db.scalars(todo_list_statement(current_user.id, completed, category)).all()
 
 
 @router.get("/{todo_id}", response_model=TodoResponse)
 def get_todo(
     todo_id: uuid.UUID,
-    current_user: User = Depends(require_onboarding_complete),
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Get a specific todo."""
@@ -118,7 +128,7 @@ def get_todo(
 def update_todo(
     todo_id: uuid.UUID,
     request: TodoUpdate,
-    current_user: User = Depends(require_onboarding_complete),
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Update a todo."""
@@ -147,6 +157,7 @@ def update_todo(
     
     db.commit()
     db.refresh(todo)
+    bump_user_version(current_user.id)
     
     return todo
 
@@ -154,7 +165,7 @@ def update_todo(
 @router.post("/{todo_id}/complete", response_model=TodoResponse)
 def complete_todo(
     todo_id: uuid.UUID,
-    current_user: User = Depends(require_onboarding_complete),
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Mark a todo as complete."""
@@ -175,6 +186,7 @@ def complete_todo(
     
     db.commit()
     db.refresh(todo)
+    bump_user_version(current_user.id)
     
     return todo
 
@@ -182,7 +194,7 @@ def complete_todo(
 @router.delete("/{todo_id}")
 def delete_todo(
     todo_id: uuid.UUID,
-    current_user: User = Depends(require_onboarding_complete),
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Delete a todo."""
@@ -200,5 +212,128 @@ def delete_todo(
     
     db.delete(todo)
     db.commit()
+    bump_user_version(current_user.id)
+    
+    return {"message": "Todo deleted successfully"}
+
+
+async def _get_user_todo_async(db: AsyncSession, todo_id: uuid.UUID, user_id: Any) -> Todo:
+    todo = (await db.scalars(
+        select(Todo).where(Todo.id == todo_id, Todo.user_id == user_id)
+    )).first()
+    
+    if not todo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Todo not found"
+        )
+    
+    return todo
+
+
+@async_router.post("/", response_model=TodoResponse, status_code=status.HTTP_201_CREATED)
+async def create_todo_async(
+    request: TodoCreate,
+    current_user: Principal = Depends(require_onboarded_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a new todo."""
+    
+    todo = Todo(
+        user_id=current_user.id,
+        **request.dict()
+    )
+    
+    db.add(todo)
+    await db.commit()
+    await db.refresh(todo)
+    bump_user_version(current_user.id)
+    
+    return todo
+
+
+@async_router.get("/", response_model=List[TodoResponse])
+async def get_todos_async(
+    completed: bool = None,
+    category: str = None,
+    current_user: Principal = Depends(require_onboarded_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all todos with optional filters."""
+    
+    return (await db.scalars(todo_list_statement(current_user.id, completed, category))).all()
+
+
+@async_router.get("/{todo_id}", response_model=TodoResponse)
+async def get_todo_async(
+    todo_id: uuid.UUID,
+    current_user: Principal = Depends(require_onboarded_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a specific todo."""
+    
+    return await _get_user_todo_async(db, todo_id, current_user.id)
+
+
+@async_router.patch("/{todo_id}", response_model=TodoResponse)
+async def update_todo_async(
+    todo_id: uuid.UUID,
+    request: TodoUpdate,
+    current_user: Principal = Depends(require_onboarded_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Update a todo."""
+    
+    todo = await _get_user_todo_async(db, todo_id, current_user.id)
+    
+    # Update fields
+    update_data = request.dict(exclude_unset=True)
+    for key, value in update_data.items():
+        setattr(todo, key, value)
+    
+    # Set completed_at if marking complete
+    if request.is_complete and not todo.completed_at:
+        todo.completed_at = datetime.utcnow()
+    elif request.is_complete == False:
+        todo.completed_at = None
+    
+    await db.commit()
+    await db.refresh(todo)
+    bump_user_version(current_user.id)
+    
+    return todo
+
+
+@async_router.post("/{todo_id}/complete", response_model=TodoResponse)
+async def complete_todo_async(
+    todo_id: uuid.UUID,
+    current_user: Principal = Depends(require_onboarded_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Mark a todo as complete."""
+    
+    todo = await _get_user_todo_async(db, todo_id, current_user.id)
+    todo.is_complete = True
+    todo.completed_at = datetime.utcnow()
+    
+    await db.commit()
+    await db.refresh(todo)
+    bump_user_version(current_user.id)
+    
+    return todo
+
+
+@async_router.delete("/{todo_id}")
+async def delete_todo_async(
+    todo_id: uuid.UUID,
+    current_user: Principal = Depends(require_onboarded_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a todo."""
+    
+    todo = await _get_user_todo_async(db, todo_id, current_user.id)
+    await db.delete(todo)
+    await db.commit()
+    bump_user_version(current_user.id)
     
     return {"message": "Todo deleted successfully"}
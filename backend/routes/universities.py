@@ -1,29 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from database import get_db
+import uuid
+from database import get_async_db, get_db
 from models.user import User
 from models.university import University, UserUniversity
 from schemas.university import (
     UniversityResponse,
     UserUniversityResponse,
+    UniversitySearchResponse,
     ShortlistRequest,
     LockRequest
 )
 from services.recommendation_service import (
     recommend_universities,
+    rank_universities,
     categorize_university,
-    generate_fit_analysis
+    generate_fit_analysis,
+    fit_reason_codes,
+    render_fit_analysis
+)
+from services.recommendation_batch import get_precomputed_recommendations
+from services.university_catalog import get_catalog, field_of_study_condition
+from services.university_search import search_universities
+from services.profile_service import get_user_universities, get_user_universities_async
+from services.cache_service import bump_user_version
+from utils.dependencies import (
+    Principal,
+    require_onboarding_complete,
+    require_onboarding_complete_async,
+    require_onboarded_principal,
+    require_onboarded_principal_async
 )
-from utils.dependencies import require_onboarding_complete
 
 router = APIRouter(prefix="/universities", tags=["Universities"])
+# Async variants of the shortlist routes, served instead when DB_ASYNC_ENABLED is set
+async_router = APIRouter(prefix="/universities", tags=["Universities"])
 
 
 @router.get("/discover", response_model=List[UniversityResponse])
 def discover_universities(
     limit: int = Query(20, ge=1, le=50),
     country: Optional[str] = None,
+    field: Optional[str] = None,
     current_user: User = Depends(require_onboarding_complete),
     db: Session = Depends(get_db)
 ):
@@ -35,6 +57,10 @@ def discover_universities(
     if country:
         query = query.filter(University.country == country)
     
+    # Filter by field (synonym-aware, index-backed on Postgres)
+    if field:
+        query = query.filter(field_of_study_condition(db, field))
+    
     # Filter by user's intended degree
     onboarding = current_user.onboarding
     query = query.filter(University.degree_type == onboarding.intended_degree)
@@ -44,29 +70,166 @@ def discover_universities(
     return universities
 
 
+@router.get("/search", response_model=UniversitySearchResponse)
+def search(
+    field: Optional[str] = None,
+    country: List[str] = Query([]),
+    cost_level: List[str] = Query([]),
+    competitiveness: List[str] = Query([]),
+    degree_type: Optional[str] = None,
+    cost_min: Optional[int] = Query(None, ge=0),
+    cost_max: Optional[int] = Query(None, ge=0),
+    ranking_max: Optional[int] = Query(None, ge=1),
+    gpa: Optional[float] = Query(None, ge=0),
+    ielts: Optional[float] = Query(None, ge=0),
+    toefl: Optional[int] = Query(None, ge=0),
+    gre: Optional[int] = Query(None, ge=0),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=50),
+    current_user: User = Depends(require_onboarding_complete),
+    db: Session = Depends(get_db)
+):
+    """
+    Search universities with filters and facet counts (per country, cost level
+    and competitiveness). Score filters (gpa, ielts, toefl, gre) keep universities
+    whose requirement the score meets. Degree type defaults to the user's intended degree.
+    """
+    
+    return search_universities(
+        get_catalog(db),
+        countries=country,
+        cost_levels=cost_level,
+        competitiveness=competitiveness,
+        offset=offset,
+        limit=limit,
+        degree_type=degree_type or current_user.onboarding.intended_degree,
+        field=field,
+        cost_min=cost_min,
+        cost_max=cost_max,
+        ranking_max=ranking_max,
+        gpa=gpa,
+        ielts=ielts,
+        toefl=toefl,
+        gre=gre
+    )
+
+
 @router.get("/recommendations")
 def get_recommendations(
+    response: Response,
+    ranked: bool = False,
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None,
+    details: bool = True,
     current_user: User = Depends(require_onboarding_complete),
     db: Session = Depends(get_db)
 ):
-    """Get AI-powered university recommendations with categorization."""
+    """
+    Get AI-powered university recommendations with categorization.
+    Each entry carries fit_codes / risk_codes and the fit_reason / risk_factors text;
+    pass details=false to skip rendering the text (clients can render it from the
+    codes, or fetch it per university from /{id}/fit).
+    With ranked=true the whole eligible catalog is ordered by fit score; pass the
+    X-Next-Cursor response header back as `cursor` to fetch the next page.
+    """
     
     onboarding = current_user.onboarding
-    recommendations = recommend_universities(db, onboarding, limit=20)
+    if ranked or cursor:
+        try:
+            recommendations, next_cursor = rank_universities(
+                db, onboarding, limit=limit, cursor=cursor, details=details
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    else:
+        # Served from the batch job's output while the profile and catalog are unchanged
+        recommendations = get_precomputed_recommendations(
+            db, onboarding, get_catalog(db), limit=limit, details=details
+        )
+        if recommendations is None:
+            recommendations = recommend_universities(db, onboarding, limit=limit, details=details)
     
     result = []
     for rec in recommendations:
-        result.append({
+        item = {
             "university": rec["university"],
             "category": rec["category"],
             "acceptance_likelihood": rec["acceptance_likelihood"],
-            "fit_reason": rec["fit_reason"],
-            "risk_factors": rec["risk_factors"]
-        })
+            "acceptance_score": rec["acceptance_score"],
+            "fit_codes": rec["fit_codes"],
+            "risk_codes": rec["risk_codes"]
+        }
+        if "fit_score" in rec:
+            item["fit_score"] = rec["fit_score"]
+        if details:
+            item["fit_reason"] = rec["fit_reason"]
+            item["risk_factors"] = rec["risk_factors"]
+        result.append(item)
     
     return result
 
 
+@router.get("/{university_id}/fit")
+def get_university_fit(
+    university_id: str,
+    current_user: User = Depends(require_onboarding_complete),
+    db: Session = Depends(get_db)
+):
+    """Get the fit analysis text for one university."""
+    
+    university = get_catalog(db).get(university_id)
+    if not university:
+        # Added since the catalog snapshot was taken
+        try:
+            university = db.query(University).filter(University.id == uuid.UUID(university_id)).first()
+        except ValueError:
+            university = None
+    if not university:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="University not found"
+        )
+    
+    onboarding = current_user.onboarding
+    category, acceptance = categorize_university(onboarding, university)
+    fit_codes, risk_codes = fit_reason_codes(onboarding, university)
+    analysis = render_fit_analysis(onboarding, university, fit_codes, risk_codes)
+    
+    return {
+        "university_id": university.id,
+        "category": category,
+        "acceptance_likelihood": acceptance,
+        "fit_codes": fit_codes,
+        "risk_codes": risk_codes,
+        "fit_reason": analysis["fit_reason"],
+        "risk_factors": analysis["risk_factors"]
+    }
+
+
+def new_shortlist_entry(current_user: User, university: University, request: ShortlistRequest) -> UserUniversity:
+    """Shortlist row with the acceptance estimate and fit analysis for the user's profile."""
+    
+    # Calculate acceptance and fit
+    onboarding = current_user.onboarding
+    category, acceptance = categorize_university(onboarding, university)
+    analysis = generate_fit_analysis(onboarding, university, category, acceptance)
+    
+    return UserUniversity(
+        user_id=current_user.id,
+        university_id=request.university_id,
+        status="shortlisted",
+        category=request.category,
+        acceptance_likelihood=acceptance,
+        fit_reason=analysis["fit_reason"],
+        risk_factors=analysis["risk_factors"]
+    )
+
+
 @router.post("/shortlist", status_code=status.HTTP_201_CREATED)
 def shortlist_university(
     request: ShortlistRequest,
@@ -98,48 +261,38 @@ def shortlist_university(
             detail="University not found"
         )
     
-    # Calculate acceptance and fit
-    onboarding = current_user.onboarding
-    category, acceptance = categorize_university(onboarding, university)
-    analysis = generate_fit_analysis(onboarding, university, category, acceptance)
-    
-    # Create user university
-    user_uni = UserUniversity(
-        user_id=current_user.id,
-        university_id=request.university_id,
-        status="shortlisted",
-        category=request.category,
-        acceptance_likelihood=acceptance,
-        fit_reason=analysis["fit_reason"],
-        risk_factors=analysis["risk_factors"]
-    )
+    user_uni = new_shortlist_entry(current_user, university, request)
     
     db.add(user_uni)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent shortlist of the same university
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="University already in your list"
+        )
     db.refresh(user_uni)
+    bump_user_version(current_user.id)
     
     return {"message": "University shortlisted successfully", "id": user_uni.id}
 
 
 @router.get("/shortlisted", response_model=List[UserUniversityResponse])
 def get_shortlisted(
-    current_user: User = Depends(require_onboarding_complete),
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Get all shortlisted universities."""
     
-    user_unis = db.query(UserUniversity).filter(
-        UserUniversity.user_id == current_user.id,
-        UserUniversity.status == "shortlisted"
-    ).all()
-    
-    return user_unis
+    return get_user_universities(db, current_user.id, "shortlisted")
 
 
 @router.post("/lock", status_code=status.HTTP_200_OK)
 def lock_university(
     request: LockRequest,
-    current_user: User = Depends(require_onboarding_complete),
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Lock a shortlisted university."""
@@ -160,29 +313,25 @@ def lock_university(
     # Update status
     user_uni.status = "locked"
     db.commit()
+    bump_user_version(current_user.id)
     
     return {"message": "University locked successfully"}
 
 
 @router.get("/locked", response_model=List[UserUniversityResponse])
 def get_locked(
-    current_user: User = Depends(require_onboarding_complete),
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Get all locked universities."""
     
-    user_unis = db.query(UserUniversity).filter(
-        UserUniversity.user_id == current_user.id,
-        UserUniversity.status == "locked"
-    ).all()
-    
-    return user_unis
+    return get_user_universities(db, current_user.id, "locked")
 
 
 @router.post("/unlock/{university_id}")
 def unlock_university(
-    university_id: str,
-    current_user: User = Depends(require_onboarding_complete),
+    university_id: uuid.UUID,
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Unlock a locked university (WARNING: resets application strategy)."""
@@ -203,6 +352,7 @@ def unlock_university(
     # Update status back to shortlisted
     user_uni.status = "shortlisted"
     db.commit()
+    bump_user_version(current_user.id)
     
     return {
         "message": "University unlocked - your application strategy has been reset",
@@ -212,8 +362,8 @@ def unlock_university(
 
 @router.delete("/remove/{university_id}")
 def remove_university(
-    university_id: str,
-    current_user: User = Depends(require_onboarding_complete),
+    university_id: uuid.UUID,
+    current_user: Principal = Depends(require_onboarded_principal),
     db: Session = Depends(get_db)
 ):
     """Remove a university from shortlist."""
@@ -232,5 +382,60 @@ def remove_university(
     
     db.delete(user_uni)
     db.commit()
+    bump_user_version(current_user.id)
     
     return {"message": "University removed from shortlist"}
+
+
+@async_router.post("/shortlist", status_code=status.HTTP_201_CREATED)
+async def shortlist_university_async(
+    request: ShortlistRequest,
+    current_user: User = Depends(require_onboarding_complete_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Shortlist a university."""
+    
+    existing = (await db.scalars(select(UserUniversity.id).where(
+        UserUniversity.user_id == current_user.id,
+        UserUniversity.university_id == request.university_id
+    ))).first()
+    
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="University already in your list"
+        )
+    
+    university = await db.get(University, request.university_id)
+    
+    if not university:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="University not found"
+        )
+    
+    user_uni = new_shortlist_entry(current_user, university, request)
+    
+    db.add(user_uni)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent shortlist of the same university
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="University already in your list"
+        )
+    bump_user_version(current_user.id)
+    
+    return {"message": "University shortlisted successfully", "id": user_uni.id}
+
+
+@async_router.get("/shortlisted", response_model=List[UserUniversityResponse])
+async def get_shortlisted_async(
+    current_user: Principal = Depends(require_onboarded_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all shortlisted universities."""
+    
+    return await get_user_universities_async(db, current_user.id, "shortlisted")
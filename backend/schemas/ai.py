@@ -40,3 +40,14 @@ class ChatHistoryResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class ChatHistoryCompactResponse(BaseModel):
+    """Chat history entry returned with compact=true (no actions or suggested questions)."""
+    id: uuid.UUID
+    role: str
+    message: str
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from decimal import Decimal
 import uuid
@@ -69,3 +69,11 @@ class ShortlistRequest(BaseModel):
 class LockRequest(BaseModel):
     """Lock university request schema."""
     university_id: uuid.UUID
+
+
+class UniversitySearchResponse(BaseModel):
+    """Faceted university search response schema."""
+    total: int
+    results: List[UniversityResponse]
+    # facet -> value -> number of matches if that value were selected
+    facets: Dict[str, Dict[str, int]]
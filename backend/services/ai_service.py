@@ -1,13 +1,288 @@
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta
+import hashlib
 import json
 import re
+import threading
+import time
+import uuid
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from models.user import Onboarding, ChatHistory, Todo
 from models.university import UserUniversity, University
-from services.profile_service import calculate_profile_strength, determine_stage
+from services.profile_service import calculate_profile_strength, determine_stage, get_user_universities
 from services.recommendation_service import recommend_universities
+from services.memory_service import ConversationMemory, load_memory, assemble_prompt
+from services.history_service import last_suggested_questions
+from services.response_cache import normalize_message, response_cache
+from services.llm_provider import provider_registry, ChatPrompt, LLMProvider, ProviderRegistry, ProviderUnavailableError
+from services.resilience import ResiliencePolicy
+from services.stream_parser import StreamingReplyParser
+from services.cache_service import VersionedCache, get_user_version, bump_user_version
 from config import settings
 
+AI_ERROR_MESSAGE = "I apologize, but I'm currently experiencing technical difficulties. This might be due to API quota limits or configuration issues. Please try again in a moment."
+
+# Instructions identical for every user. Sent first so providers can cache the prefix.
+STATIC_SYSTEM_PROMPT = """You are an expert study-abroad counsellor helping a student plan their journey.
+The student's profile, current stage and university lists follow these instructions.
+
+YOUR ROLE:
+1. Provide personalized, actionable advice based on current stage
+2. Recommend universities that fit the student's profile
+3. Explain WHY universities fit (or don't fit)
+4. Help shortlist and lock universities
+5. Create relevant tasks and to-dos
+6. Guide through each stage systematically
+
+STAGE-SPECIFIC GUIDANCE:
+- Stage 1 (Profile Building): Focus on improving test scores, GPA, and SOP
+- Stage 2 (University Discovery): Recommend and explain universities (Dream/Target/Safe)
+- Stage 3 (University Finalization): Help lock universities, explain commitment
+- Stage 4 (Application Preparation): Create application tasks, deadlines, document checklists
+
+IMPORTANT RULES:
+- Always consider the student's budget and funding constraints
+- Categorize universities as Dream (reach), Target (match), or Safe (likely)
+- Provide specific, actionable next steps
+- Be encouraging but realistic
+- Never recommend universities outside their budget or field
+- Always explain your reasoning
+
+RESPONSE STYLE & TONE:
+- Be concise and to the point (max 3-4 sentences per response unless detailed info is requested)
+- Use a natural, conversational, and "human-like" tone
+- Avoid robotic or overly formal language
+- Focus on the most important next step rather than overwhelming with information
+
+When you want to take actions (shortlist university, lock university, create todo), include them in a structured JSON format at the end of your response wrapped in [ACTIONS]...[/ACTIONS] tags.
+
+Action format:
+[ACTIONS]
+{
+  "actions": [
+    {"type": "shortlist_university", "university_id": "uuid", "category": "dream|target|safe"},
+    {"type": "lock_university", "university_id": "uuid"},
+    {"type": "create_todo", "title": "Task title", "description": "Details", "category": "exam|document|application|other", "priority": "high|medium|low"}
+  ]
+}
+[/ACTIONS]
+"""
+
+
+# Rendered per-user contexts, rebuilt when the user's data version changes
+context_cache = VersionedCache(ttl_seconds=settings.context_cache_ttl_seconds)
+
+
+class UserContextSnapshot:
+    """
+    Rendered per-user prompt context, the non-personal outline of it and the
+    progress figures both were built from.
+    """
+    
+    def __init__(
+        self,
+        context: str,
+        profile_strength: Dict[str, Any],
+        stage_info: Dict[str, Any],
+        shortlisted_count: int,
+        locked_count: int,
+        outline: str = ""
+    ):
+        self.context = context
+        self.outline = outline
+        self.profile_strength = profile_strength
+        self.stage_info = stage_info
+        self.shortlisted_count = shortlisted_count
+        self.locked_count = locked_count
+
+
+class ProviderRoute:
+    """Rolling latency and error rate of one provider as seen by the router."""
+    
+    def __init__(self):
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.last_failure_at: Optional[float] = None
+        self.requests = 0
+        self.failures = 0
+
+
+class ProviderRouter:
+    """
+    Sends each generation to the fastest healthy provider and fails over to the
+    next one, so one provider's outage or exhausted quota does not fail the chat.
+    Candidates are AI_SERVICE followed by AI_FALLBACK_PROVIDERS. Providers that have
+    answered are ranked by expected time to a successful reply (rolling latency /
+    success rate, failures counting for AI_ROUTER_COOLDOWN_SECONDS); the others keep
+    the configured order behind them, so a fallback only gets traffic, and a
+    latency measurement, once the providers before it have failed.
+    """
+    
+    def __init__(self, registry: ProviderRegistry):
+        self.registry = registry
+        self._routes: Dict[str, ProviderRoute] = {}
+        self._lock = threading.Lock()
+    
+    def provider_names(self) -> List[str]:
+        """Configured providers in order of preference."""
+        names = [settings.ai_service]
+        if settings.ai_router_enabled:
+            names += [name.strip() for name in settings.ai_fallback_providers.split(",") if name.strip()]
+        return list(dict.fromkeys(names))
+    
+    def candidates(self) -> List[LLMProvider]:
+        """
+        Providers to try for the next request, best first. Unconfigured providers are
+        left out; open circuits and providers over AI_ROUTER_MAX_ERROR_RATE during their
+        cooldown are only tried when nothing else is left (an open circuit fails fast).
+        """
+        
+        available = []
+        for order, name in enumerate(self.provider_names()):
+            try:
+                provider = self.registry.get(name)
+            except ProviderUnavailableError:
+                continue
+            if provider.healthy:
+                available.append((order, provider))
+        
+        now = time.monotonic()
+        with self._lock:
+            ranked = [
+                provider for _, provider in
+                sorted(available, key=lambda item: (self._rank(item[1].name, now), item[0]))
+            ]
+            preferred = [provider for provider in ranked if not self._avoid(provider, now)]
+        return preferred or ranked
+    
+    def _avoid(self, provider: LLMProvider, now: float) -> bool:
+        if provider.breaker.state == "open":
+            return True
+        return (
+            self._failed_recently(provider.name, now)
+            and self._routes[provider.name].error_ewma > settings.ai_router_max_error_rate
+        )
+    
+    def _rank(self, name: str, now: float) -> Tuple[int, float]:
+        """
+        (tier, expected seconds to a successful reply). Tier 0: has answered before;
+        tier 1: not measured yet; tier 2: failed recently without ever answering.
+        """
+        route = self._routes.get(name)
+        if route is None:
+            return 1, 0.0
+        failed_recently = self._failed_recently(name, now)
+        if route.latency_ewma is None:
+            return (2 if failed_recently else 1), 0.0
+        error_rate = route.error_ewma if failed_recently else 0.0
+        return 0, route.latency_ewma / max(1.0 - error_rate, 0.05)
+    
+    def _failed_recently(self, name: str, now: float) -> bool:
+        route = self._routes.get(name)
+        return (
+            route is not None
+            and route.last_failure_at is not None
+            and now - route.last_failure_at < settings.ai_router_cooldown_seconds
+        )
+    
+    def record(self, name: str, seconds: float, ok: bool) -> None:
+        """Fold one call's outcome into the provider's rolling latency and error rate."""
+        alpha = settings.ai_router_ewma_alpha
+        with self._lock:
+            route = self._routes.setdefault(name, ProviderRoute())
+            route.requests += 1
+            route.error_ewma = alpha * (0.0 if ok else 1.0) + (1 - alpha) * route.error_ewma
+            if ok:
+                route.latency_ewma = seconds if route.latency_ewma is None else (
+                    alpha * seconds + (1 - alpha) * route.latency_ewma
+                )
+            else:
+                route.failures += 1
+                route.last_failure_at = time.monotonic()
+    
+    def _no_provider_error(self) -> ProviderUnavailableError:
+        return ProviderUnavailableError(f"{settings.ai_service} API key not configured or invalid")
+    
+    def _attempts(self, candidates: List[LLMProvider]) -> Iterator[Tuple[LLMProvider, ResiliencePolicy]]:
+        """
+        Each candidate with what is left of one AI_CALL_DEADLINE_SECONDS shared by all.
+        Only the last candidate retries; before that, failing over beats backing off.
+        """
+        
+        policy = ResiliencePolicy.from_settings()
+        ends_at = time.monotonic() + policy.deadline
+        for index, provider in enumerate(candidates):
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0:
+                return
+            last = index == len(candidates) - 1
+            yield provider, policy.limited(remaining, attempts=None if last else 1)
+    
+    async def generate(self, prompt: ChatPrompt) -> str:
+        """Reply from the best provider, failing over until one succeeds; raises the last error."""
+        
+        error: Exception = self._no_provider_error()
+        for provider, policy in self._attempts(self.candidates()):
+            started = time.perf_counter()
+            try:
+                text = await provider.agenerate(prompt, policy)
+            except Exception as e:
+                self.record(provider.name, time.perf_counter() - started, False)
+                print(f"AI provider {provider.name} failed, trying the next one: {str(e)}")
+                error = e
+                continue
+            self.record(provider.name, time.perf_counter() - started, True)
+            return text
+        raise error
+    
+    async def stream(self, prompt: ChatPrompt) -> AsyncIterator[str]:
+        """
+        Stream from the best provider. Failover happens only before the first chunk;
+        once text has been sent a failure is raised to the caller.
+        """
+        
+        error: Exception = self._no_provider_error()
+        for provider, policy in self._attempts(self.candidates()):
+            started = time.perf_counter()
+            sent = False
+            try:
+                async for chunk in provider.astream(prompt, policy):
+                    sent = True
+                    yield chunk
+            except Exception as e:
+                self.record(provider.name, time.perf_counter() - started, False)
+                if sent:
+                    raise
+                print(f"AI provider {provider.name} failed, trying the next one: {str(e)}")
+                error = e
+                continue
+            self.record(provider.name, time.perf_counter() - started, True)
+            return
+        raise error
+    
+    def stats(self) -> Dict[str, Any]:
+        """Current routing order and each provider's rolling latency and error rate."""
+        order = [provider.name for provider in self.candidates()]
+        with self._lock:
+            providers = {
+                name: {
+                    "latency_ms": round(route.latency_ewma * 1000, 1) if route.latency_ewma is not None else None,
+                    "error_rate": round(route.error_ewma, 4),
+                    "requests": route.requests,
+                    "failures": route.failures,
+                }
+                for name, route in self._routes.items()
+            }
+        return {"order": order, "providers": providers}
+    
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+provider_router = ProviderRouter(provider_registry)
+
 
 class AICounsellorService:
     """AI Counsellor service for intelligent conversation and action execution."""
@@ -16,63 +291,52 @@ class AICounsellorService:
         self.db = db
         self.ai_service = settings.ai_service
         
-        # Initialize AI client
-        try:
-            if self.ai_service == "gemini":
-                if not settings.gemini_api_key:
-                    raise Exception("GEMINI_API_KEY environment variable not set")
-                import google.generativeai as genai
-                genai.configure(api_key=settings.gemini_api_key)
-                self.model = genai.GenerativeModel('gemini-flash-latest')
-            elif self.ai_service == "openai":
-                if not settings.openai_api_key:
-                    raise Exception("OPENAI_API_KEY environment variable not set")
-                from openai import OpenAI
-                self.client = OpenAI(api_key=settings.openai_api_key)
-            else:
-                raise Exception(f"Unsupported AI service: {self.ai_service}")
-        except Exception as e:
-            print(f"AI Service Initialization Error: {str(e)}")
-            self.model = None
-            self.client = None
+        # Process-wide clients created at startup, picked per request by the router
+        self.router = provider_router
     
     def build_context(
         self,
         user_id: str,
         onboarding: Onboarding
     ) -> str:
-        """Build comprehensive context for AI about the user."""
-        
-        # Get current stage
-        shortlisted = self.db.query(UserUniversity).filter(
-            UserUniversity.user_id == user_id,
-            UserUniversity.status == "shortlisted"
-        ).count()
+        """Per-user context section of the prompt (profile, stage, universities)."""
+        return self.get_context_snapshot(user_id, onboarding).context
+    
+    def get_context_snapshot(
+        self,
+        user_id: str,
+        onboarding: Onboarding
+    ) -> UserContextSnapshot:
+        """
+        Get the user's context snapshot, rebuilding it only after onboarding,
+        shortlist/lock changes or AI actions bumped the user's data version.
+        """
+        version = get_user_version(user_id)
+        snapshot = context_cache.get(user_id, version)
+        if snapshot is None:
+            snapshot = self._build_context_snapshot(user_id, onboarding)
+            context_cache.set(user_id, version, snapshot)
+        return snapshot
+    
+    def _build_context_snapshot(
+        self,
+        user_id: str,
+        onboarding: Onboarding
+    ) -> UserContextSnapshot:
+        """Load the user's progress and render the per-user context."""
         
-        locked = self.db.query(UserUniversity).filter(
-            UserUniversity.user_id == user_id,
-            UserUniversity.status == "locked"
-        ).count()
+        # One round trip: both statuses with their universities eagerly joined
+        user_unis = get_user_universities(self.db, uuid.UUID(str(user_id)))
+        shortlisted_unis = [uu for uu in user_unis if uu.status == "shortlisted"]
+        locked_unis = [uu for uu in user_unis if uu.status == "locked"]
+        shortlisted = len(shortlisted_unis)
+        locked = len(locked_unis)
         
-        stage_info = determine_stage(onboarding, shortlisted, locked)
         profile_strength = calculate_profile_strength(onboarding)
+        stage_info = determine_stage(onboarding, shortlisted, locked, profile_strength)
         
-        # Get shortlisted universities
-        shortlisted_unis = self.db.query(UserUniversity).filter(
-            UserUniversity.user_id == user_id,
-            UserUniversity.status == "shortlisted"
-        ).all()
-        
-        # Get locked universities
-        locked_unis = self.db.query(UserUniversity).filter(
-            UserUniversity.user_id == user_id,
-            UserUniversity.status == "locked"
-        ).all()
-        
-        # Build context string
-        context = f"""You are an expert study-abroad counsellor helping a student plan their journey.
-
-STUDENT PROFILE:
+        # Build the per-user section; the shared instructions live in STATIC_SYSTEM_PROMPT
+        context = f"""STUDENT PROFILE:
 - Name: {onboarding.user.full_name}
 - Education: {onboarding.education_level} in {onboarding.major}
 - GPA: {onboarding.gpa if onboarding.gpa else 'Not provided'}
@@ -110,50 +374,30 @@ SHORTLISTED UNIVERSITIES ({len(shortlisted_unis)}):
 
 LOCKED UNIVERSITIES ({len(locked_unis)}):
 {self._format_university_list(locked_unis)}
+"""
+        
+        # No name, scores or universities: many students share this outline, and a reply
+        # generated from it alone can be cached for all of them
+        budget_band = -(-int(onboarding.budget_range_max) // 10000) * 10000
+        outline = f"""STUDENT OUTLINE:
+- Intended Degree: {onboarding.intended_degree}
+- Field of Study: {onboarding.field_of_study}
+- Preferred Countries: {', '.join(sorted(onboarding.preferred_countries))}
+- Budget: up to about ${budget_band:,} per year ({onboarding.funding_type})
+- Profile Strength: Academic {profile_strength['academic']}, Exams {profile_strength['exams']}, SOP {profile_strength['sop']}
 
-YOUR ROLE:
-1. Provide personalized, actionable advice based on current stage
-2. Recommend universities that fit the student's profile
-3. Explain WHY universities fit (or don't fit)
-4. Help shortlist and lock universities
-5. Create relevant tasks and to-dos
-6. Guide through each stage systematically
-
-STAGE-SPECIFIC GUIDANCE:
-- Stage 1 (Profile Building): Focus on improving test scores, GPA, and SOP
-- Stage 2 (University Discovery): Recommend and explain universities (Dream/Target/Safe)
-- Stage 3 (University Finalization): Help lock universities, explain commitment
-- Stage 4 (Application Preparation): Create application tasks, deadlines, document checklists
-
-IMPORTANT RULES:
-- Always consider the student's budget and funding constraints
-- Categorize universities as Dream (reach), Target (match), or Safe (likely)
-- Provide specific, actionable next steps
-- Be encouraging but realistic
-- Never recommend universities outside their budget or field
-- Always explain your reasoning
-
-RESPONSE STYLE & TONE:
-- Be concise and to the point (max 3-4 sentences per response unless detailed info is requested)
-- Use a natural, conversational, and "human-like" tone
-- Avoid robotic or overly formal language
-- Focus on the most important next step rather than overwhelming with information
-
-When you want to take actions (shortlist university, lock university, create todo), include them in a structured JSON format at the end of your response wrapped in [ACTIONS]...[/ACTIONS] tags.
-
-Action format:
-[ACTIONS]
-{{
-  "actions": [
-    {{"type": "shortlist_university", "university_id": "uuid", "category": "dream|target|safe"}},
-    {{"type": "lock_university", "university_id": "uuid"}},
-    {{"type": "create_todo", "title": "Task title", "description": "Details", "category": "exam|document|application|other", "priority": "high|medium|low"}}
-  ]
-}}
-[/ACTIONS]
+CURRENT STAGE: Stage {stage_info['current_stage']} - {stage_info['stage_name']}
+{stage_info['stage_description']}
 """
         
-        return context
+        return UserContextSnapshot(
+            context=context,
+            profile_strength=profile_strength,
+            stage_info=stage_info,
+            shortlisted_count=shortlisted,
+            locked_count=locked,
+            outline=outline
+        )
     
     def _format_university_list(self, user_unis: List[UserUniversity]) -> str:
         """Format university list for context."""
@@ -171,6 +415,54 @@ Action format:
         
         return "\n".join(lines)
     
+    def build_prompt(
+        self,
+        user_id: str,
+        message: str,
+        onboarding: Onboarding
+    ) -> ChatPrompt:
+        """Build the chat prompt: static prefix, user context and conversation (blocking DB work)."""
+        
+        user_id = uuid.UUID(str(user_id))
+        
+        # Build context
+        snapshot = self.get_context_snapshot(user_id, onboarding)
+        
+        # Rolling summary plus the recent messages that fit the history budget,
+        # assembled under the CHAT_PROMPT_MAX_TOKENS ceiling
+        memory = load_memory(self.db, user_id)
+        
+        if self.answers_from_outline(user_id, memory, message):
+            # Shared turns see the outline only, so the reply is valid for everyone who has it
+            prompt = assemble_prompt(STATIC_SYSTEM_PROMPT, snapshot.outline, ConversationMemory("", []), message)
+            prompt.cache_key = (self.outline_fingerprint(snapshot), message)
+        else:
+            prompt = assemble_prompt(STATIC_SYSTEM_PROMPT, snapshot.context, memory, message)
+        
+        # End the read transaction so no pooled connection (or SQLite read lock) is held
+        # while the provider generates; loaded objects stay usable, detached
+        self.db.close()
+        return prompt
+    
+    def answers_from_outline(self, user_id: uuid.UUID, memory: ConversationMemory, message: str) -> bool:
+        """
+        Whether the turn goes through the shared response cache: a short message that
+        opens the conversation or asks a question the last reply suggested. Any other
+        reply depends on the conversation, could never be reused and skips the cache.
+        """
+        
+        if not settings.response_cache_enabled or not response_cache.cacheable(message):
+            return False
+        if not memory.summary and not memory.messages:
+            return True
+        suggested = {normalize_message(question) for question in last_suggested_questions(self.db, user_id)}
+        return normalize_message(message) in suggested
+    
+    def outline_fingerprint(self, snapshot: UserContextSnapshot) -> str:
+        """Hash of the non-personal outline a shared reply was generated from."""
+        
+        return hashlib.blake2b(f"outline|{snapshot.outline}".encode("utf-8"), digest_size=16).hexdigest()
+    
     async def get_ai_response(
         self,
         user_id: str,
@@ -179,56 +471,91 @@ Action format:
     ) -> Dict[str, Any]:
         """
         Get AI response for user message.
+        Database work runs in the threadpool and the provider call is awaited,
+        so the event loop stays free while the model is generating.
         Returns: {message: str, actions: List[Dict]}
         """
         
-        # Build context
-        context = self.build_context(user_id, onboarding)
-        
-        # Get chat history (last 5 messages for context)
-        history = self.db.query(ChatHistory).filter(
-            ChatHistory.user_id == user_id
-        ).order_by(ChatHistory.created_at.desc()).limit(5).all()
-        
-        # Build conversation
-        conversation = []
-        for msg in reversed(history):
-            conversation.append(f"{msg.role.upper()}: {msg.message}")
-        
-        conversation.append(f"USER: {message}")
+        prompt = await run_in_threadpool(
+            self.build_prompt, user_id, message, onboarding
+        )
+        return await self.generate_response(prompt)
+    
+    async def generate_response(self, prompt: ChatPrompt) -> Dict[str, Any]:
+        """Await the provider's reply to a built prompt (no database access)."""
         
-        full_prompt = f"{context}\n\nCONVERSATION HISTORY:\n" + "\n".join(conversation)
+        # Identical turns skip the provider call
+        cached = response_cache.get(*prompt.cache_key) if prompt.cache_key else None
+        if cached is not None:
+            return cached
         
         # Get AI response
         try:
-            if self.ai_service == "gemini":
-                if not hasattr(self, 'model') or self.model is None:
-                    raise Exception("Gemini API key not configured or invalid")
-                response = self.model.generate_content(full_prompt)
-                if not response or not response.text:
-                    raise Exception("Empty response from Gemini API")
-                ai_message = response.text
-            else:  # openai
-                if not hasattr(self, 'client') or self.client is None:
-                    raise Exception("OpenAI API key not configured or invalid")
-                response = self.client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {"role": "system", "content": context},
-                        {"role": "user", "content": message}
-                    ]
-                )
-                ai_message = response.choices[0].message.content
+            ai_message = await self.router.generate(prompt)
         except Exception as e:
             print(f"AI Service Error: {str(e)}")
             return {
-                "message": "I apologize, but I'm currently experiencing technical difficulties. This might be due to API quota limits or configuration issues. Please try again in a moment.",
+                "message": AI_ERROR_MESSAGE,
                 "actions": [],
                 "suggested_questions": []
             }
         
+        response = self._build_response(ai_message, ai_message)
+        if prompt.cache_key:
+            response_cache.set(*prompt.cache_key, response)
+        return response
+    
+    async def stream_ai_response(
+        self,
+        user_id: str,
+        message: str,
+        prompt: ChatPrompt
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream the AI reply as ("token", {...}) events, hiding [DATA]/[ACTIONS] blocks.
+        Once the provider finishes, the turn is persisted, actions are executed and a
+        final ("done", {message, actions, suggested_questions}) event is emitted.
+        A cached reply is sent as a single token event.
+        """
+        
+        parser = StreamingReplyParser()
+        try:
+            response = response_cache.get(*prompt.cache_key) if prompt.cache_key else None
+            if response is not None:
+                yield "token", {"text": response["message"]}
+            else:
+                failed = False
+                try:
+                    async for chunk in self.router.stream(prompt):
+                        text = parser.feed(chunk)
+                        if text:
+                            yield "token", {"text": text}
+                except Exception as e:
+                    print(f"AI Service Error: {str(e)}")
+                    failed = True
+                    if not parser.visible_text.strip():
+                        parser.feed(AI_ERROR_MESSAGE)
+                
+                text = parser.finish()
+                if text:
+                    yield "token", {"text": text}
+                
+                response = self._build_response(parser.visible_text, parser.hidden_text)
+                if prompt.cache_key and not failed:
+                    response_cache.set(*prompt.cache_key, response)
+            
+            await run_in_threadpool(self.save_turn, uuid.UUID(str(user_id)), message, response)
+            
+            yield "done", response
+        finally:
+            # The request-scoped session is released before a streamed body is sent
+            self.db.close()
+    
+    def _build_response(self, visible_message: str, structured_message: str) -> Dict[str, Any]:
+        """Build the response dict from the reply text and its structured blocks."""
+        
         # Extract data (actions + suggestions)
-        data = self._extract_data(ai_message)
+        data = self._extract_data(structured_message)
         actions = []
         suggestions = []
         
@@ -237,7 +564,7 @@ Action format:
             suggestions = data.get("suggestions", [])
         
         # Clean message (remove data tags)
-        clean_message = re.sub(r'\[DATA\].*?\[/DATA\]', '', ai_message, flags=re.DOTALL)
+        clean_message = re.sub(r'\[DATA\].*?\[/DATA\]', '', visible_message, flags=re.DOTALL)
         clean_message = re.sub(r'\[ACTIONS\].*?\[/ACTIONS\]', '', clean_message, flags=re.DOTALL).strip()
         
         # Ensure we always return a valid response
@@ -250,6 +577,43 @@ Action format:
             "suggested_questions": suggestions or []
         }
     
+    def save_turn(
+        self,
+        user_id: uuid.UUID,
+        message: str,
+        response: Dict[str, Any]
+    ) -> None:
+        """Persist the user message and assistant reply, then execute any actions."""
+        
+        # Explicit timestamps keep the reply ordered after the message on the
+        # (created_at, id) history key; now() is the same for both within a transaction
+        sent_at = datetime.utcnow()
+        
+        # Save user message
+        user_msg = ChatHistory(
+            user_id=user_id,
+            role="user",
+            message=message,
+            created_at=sent_at
+        )
+        self.db.add(user_msg)
+        
+        # Save assistant response
+        assistant_msg = ChatHistory(
+            user_id=user_id,
+            role="assistant",
+            message=response["message"],
+            actions=response.get("actions"),
+            suggested_questions=response.get("suggested_questions"),
+            created_at=sent_at + timedelta(microseconds=1)
+        )
+        self.db.add(assistant_msg)
+        self.db.commit()
+        
+        # Execute actions if present
+        if response.get("actions"):
+            self.execute_actions(str(user_id), response["actions"])
+    
     def _extract_data(self, message: str) -> Optional[Dict[str, Any]]:
         """Extract structured data from AI message (supports [DATA] and [ACTIONS])."""
         
@@ -286,6 +650,7 @@ Action format:
         """
         
         results = []
+        user_id = uuid.UUID(str(user_id))
         
         for action in actions:
             action_type = action.get("type")
@@ -299,7 +664,7 @@ Action format:
                         
                     result = self._shortlist_university(
                         user_id,
-                        uid,
+                        uuid.UUID(str(uid)),
                         action.get("category", "target")
                     )
                     results.append(result)
@@ -312,7 +677,7 @@ Action format:
 
                     result = self._lock_university(
                         user_id,
-                        uid
+                        uuid.UUID(str(uid))
                     )
                     results.append(result)
                 
@@ -331,6 +696,7 @@ Action format:
         
         try:
             self.db.commit()
+            bump_user_version(user_id)
         except Exception as e:
             print(f"DB Commit Error: {str(e)}")
             self.db.rollback()
@@ -339,7 +705,6 @@ Action format:
         return results
 
     def _is_valid_uuid(self, val):
-        import uuid
         try:
             uuid.UUID(str(val))
             return True
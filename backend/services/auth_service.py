@@ -1,11 +1,31 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+import asyncio
+import os
+import threading
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from config import settings
 
+
+def build_password_context(rounds: int) -> CryptContext:
+    """
+    PBKDF2 context at exactly `rounds` iterations. Hashes made with any other
+    count are flagged by verify_and_update, so changing the setting rehashes
+    each user's password on their next login.
+    """
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+        pbkdf2_sha256__max_rounds=rounds
+    )
+
+
 # Password hashing context
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+pwd_context = build_password_context(settings.password_hash_rounds)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -13,11 +33,64 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also return a new hash if the stored one uses outdated parameters."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
 
 
+# Dedicated pool for password hashing, so a burst of logins queues here instead
+# of occupying the request threadpool. hashlib's PBKDF2 releases the GIL, so
+# threads hash in parallel; a process pool also isolates the CPU work.
+_hash_executor: Optional[Executor] = None
+_hash_executor_lock = threading.Lock()
+
+
+def password_hash_workers() -> int:
+    return settings.password_hash_workers or os.cpu_count() or 1
+
+
+def get_hash_executor() -> Executor:
+    global _hash_executor
+    if _hash_executor is None:
+        with _hash_executor_lock:
+            if _hash_executor is None:
+                if settings.password_hash_executor == "process":
+                    _hash_executor = ProcessPoolExecutor(max_workers=password_hash_workers())
+                else:
+                    _hash_executor = ThreadPoolExecutor(
+                        max_workers=password_hash_workers(),
+                        thread_name_prefix="password-hash"
+                    )
+    return _hash_executor
+
+
+def shutdown_hash_executor() -> None:
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is not None:
+            _hash_executor.shutdown(wait=False, cancel_futures=True)
+            _hash_executor = None
+
+
+async def hash_password_async(password: str) -> str:
+    """get_password_hash on the hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), get_password_hash, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password on the hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_hash_executor(), verify_and_update_password, plain_password, hashed_password
+    )
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -0,0 +1,79 @@
+from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+import threading
+import time
+
+# Per-user data version. Bumped whenever rows that feed cached views change.
+# Versions live in process memory: each worker invalidates its own caches,
+# and entry TTLs bound how long another worker can serve a stale copy.
+_user_versions: Dict[str, int] = {}
+_versions_lock = threading.Lock()
+
+
+def get_user_version(user_id: Any) -> int:
+    """Current data version for a user."""
+    return _user_versions.get(str(user_id), 0)
+
+
+def bump_user_version(user_id: Any) -> int:
+    """Mark a user's data as changed, invalidating every cache keyed on the version."""
+    key = str(user_id)
+    with _versions_lock:
+        version = _user_versions.get(key, 0) + 1
+        _user_versions[key] = version
+    return version
+
+
+class VersionedCache:
+    """
+    Bounded per-user cache. An entry is only served while the user's version
+    matches the one it was built for and its TTL has not expired.
+    Keys and versions can be anything hashable and comparable, e.g. a profile
+    hash versioned by the catalog snapshot.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: Any, version: Optional[Any] = None) -> Optional[Any]:
+        """Return the cached value for the user's current (or given) version."""
+        key = str(user_id)
+        if version is None:
+            version = get_user_version(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def set(self, user_id: Any, version: Any, value: Any) -> None:
+        """
+        Store a value built from data at `version`. Read the version before
+        loading the data so a concurrent write leaves the entry already stale.
+        """
+        key = str(user_id)
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Any) -> None:
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
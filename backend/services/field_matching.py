@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional, Set
+from bisect import bisect_left
+import re
+from sqlalchemy import func, literal_column
+
+# Canonical field name -> abbreviations students and catalog data use for it.
+# Aliases are replaced wherever they appear as whole words, so keep them unambiguous.
+FIELD_SYNONYMS: Dict[str, List[str]] = {
+    "computer science": ["cs", "cse", "comp sci", "compsci"],
+    "data science": ["ds"],
+    "artificial intelligence": ["ai", "ml", "machine learning"],
+    "business administration": ["mba", "bba"],
+    "electrical engineering": ["ee", "eee", "electrical and electronics engineering"],
+    "mechanical engineering": ["mech"],
+    "economics": ["econ", "econs"],
+}
+
+# Abbreviations that are also common English words: only mapped when they are the whole field ("IT", "ME")
+FIELD_EXACT_ALIASES: Dict[str, str] = {
+    "it": "information technology",
+    "me": "mechanical engineering",
+}
+
+STOPWORDS = {"and", "of", "in", "the", "for", "&"}
+
+_ALIASES = {alias: canonical for canonical, aliases in FIELD_SYNONYMS.items() for alias in aliases}
+# Longest alias first, so "eee" is tried before "ee" and a multi-word alias before any alias it starts with
+_ALIAS_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(a) for a in sorted(_ALIASES, key=len, reverse=True)) + r")\b"
+)
+
+
+def normalize_field(text: Optional[str]) -> str:
+    """Lowercase, strip punctuation and map known aliases to their canonical name."""
+
+    text = re.sub(r"[^a-z0-9&]+", " ", (text or "").lower()).strip()
+    if text in FIELD_EXACT_ALIASES:
+        return FIELD_EXACT_ALIASES[text]
+    return _ALIAS_PATTERN.sub(lambda m: _ALIASES[m.group(1)], text)
+
+
+def field_tokens(text: Optional[str]) -> List[str]:
+    """Normalized tokens of a field name, without stopwords."""
+    return [t for t in normalize_field(text).split() if t not in STOPWORDS]
+
+
+def field_matches(query: Optional[str], field: Optional[str]) -> bool:
+    """
+    Whether a field of study matches a query: every query token must be a
+    token of the field, the last one may be a prefix ("comp" -> "computer").
+    An empty query matches everything.
+    """
+
+    query_tokens = field_tokens(query)
+    if not query_tokens:
+        return True
+    tokens = set(field_tokens(field))
+    *whole, last = query_tokens
+    return all(t in tokens for t in whole) and any(t.startswith(last) for t in tokens)
+
+
+class FieldIndex:
+    """
+    In-process inverted index from normalized token to the ids (e.g. catalog
+    field codes) of the field names containing it. Matches like field_matches.
+    """
+
+    def __init__(self, fields: Dict[str, int]):
+        self.postings: Dict[str, Set[int]] = {}
+        self.all_ids: Set[int] = set(fields.values())
+        for name, field_id in fields.items():
+            for token in field_tokens(name):
+                self.postings.setdefault(token, set()).add(field_id)
+        self.vocabulary = sorted(self.postings)
+
+    def _prefixed(self, prefix: str) -> Set[int]:
+        ids: Set[int] = set()
+        for token in self.vocabulary[bisect_left(self.vocabulary, prefix):]:
+            if not token.startswith(prefix):
+                break
+            ids |= self.postings[token]
+        return ids
+
+    def search(self, query: Optional[str]) -> Set[int]:
+        """Ids of the field names matching the query."""
+
+        query_tokens = field_tokens(query)
+        if not query_tokens:
+            return set(self.all_ids)
+        *whole, last = query_tokens
+        ids = self._prefixed(last)
+        for token in whole:
+            ids &= self.postings.get(token, set())
+        return ids
+
+
+def field_search_terms(query: Optional[str]) -> List[str]:
+    """The normalized query plus the aliases of a canonical field, for SQL matching."""
+
+    normalized = " ".join(field_tokens(query))
+    return [normalized] + FIELD_SYNONYMS.get(normalized, [])
+
+
+def field_exact_terms(query: Optional[str]) -> List[str]:
+    """Whole-field aliases ("it") of a canonical field query, matched as words rather than prefixes."""
+
+    normalized = " ".join(field_tokens(query))
+    return [alias for alias, canonical in FIELD_EXACT_ALIASES.items() if canonical == normalized]
+
+
+def field_of_study_tsquery(column, query: str):
+    """
+    Postgres full-text condition for field matching, served by the GIN index on
+    the column (see models.university). Aliases are OR-ed in so rows storing
+    "CS" match a "Computer Science" query and vice versa.
+    """
+
+    terms = [t for t in field_search_terms(query) if t]
+    # Tokens are [a-z0-9] only after normalization; the last one matches as a prefix
+    tsquery = " | ".join(
+        ["(" + " & ".join(term.split()) + ":*)" for term in terms] + field_exact_terms(query)
+    )
+    # Inline constants so the expression matches the index definition exactly
+    document = func.to_tsvector(literal_column("'simple'"), func.coalesce(column, literal_column("''")))
+    return document.op("@@")(func.to_tsquery(literal_column("'simple'"), tsquery))
@@ -0,0 +1,92 @@
+from typing import Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
+import base64
+import uuid
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.orm import Session
+from models.user import ChatHistory
+from schemas.ai import ChatHistoryCompactResponse, ChatHistoryResponse
+
+# Columns of a compact history entry; the JSON payloads are never read
+COMPACT_COLUMNS = (ChatHistory.id, ChatHistory.role, ChatHistory.message, ChatHistory.created_at)
+FULL_COLUMNS = COMPACT_COLUMNS + (ChatHistory.actions, ChatHistory.suggested_questions)
+
+
+def encode_history_cursor(created_at: datetime, message_id: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{message_id}".encode()).decode().rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """(created_at, id) of the oldest message already seen. Raises ValueError if the cursor is malformed."""
+    
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, message_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(message_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid history cursor")
+
+
+def history_page_statement(
+    user_id: uuid.UUID,
+    limit: int,
+    before: Optional[Tuple[datetime, uuid.UUID]] = None,
+    compact: bool = False
+) -> Select:
+    """
+    Newest messages first, strictly older than `before`. Seeks on
+    ix_chat_history_user_created (user_id, created_at, id), so every page costs the
+    same however deep it is. Fetches one extra row to tell whether more pages exist.
+    """
+    
+    statement = select(*(COMPACT_COLUMNS if compact else FULL_COLUMNS)).where(ChatHistory.user_id == user_id)
+    if before is not None:
+        statement = statement.where(tuple_(ChatHistory.created_at, ChatHistory.id) < tuple_(*before))
+    return statement.order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc()).limit(limit + 1)
+
+
+def get_history_page(
+    db: Session,
+    user_id: uuid.UUID,
+    limit: int,
+    cursor: Optional[str] = None,
+    compact: bool = False
+) -> Tuple[List, Optional[str]]:
+    """
+    One page of a user's history, oldest first, and the cursor for the page before it
+    (None when no older messages exist). Raises ValueError for an invalid cursor.
+    """
+    
+    before = decode_history_cursor(cursor) if cursor else None
+    rows = db.execute(history_page_statement(user_id, limit, before, compact)).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_history_cursor(rows[-1].created_at, rows[-1].id)
+    rows.reverse()
+    return rows, next_cursor
+
+
+def serialize_history(rows: Iterable, compact: bool = False) -> Iterator[bytes]:
+    """Encode history rows as a JSON array, one message per chunk."""
+    
+    schema = ChatHistoryCompactResponse if compact else ChatHistoryResponse
+    yield b"["
+    for index, row in enumerate(rows):
+        if index:
+            yield b","
+        yield schema.model_validate(row).model_dump_json().encode()
+    yield b"]"
+
+
+def last_suggested_questions(db: Session, user_id: uuid.UUID) -> List[str]:
+    """Questions offered with the user's latest assistant reply (one row on the history index)."""
+    
+    suggestions = db.execute(
+        select(ChatHistory.suggested_questions)
+        .where(ChatHistory.user_id == user_id, ChatHistory.role == "assistant")
+        .order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc())
+        .limit(1)
+    ).scalar()
+    return suggestions or []
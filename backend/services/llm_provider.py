@@ -0,0 +1,533 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import timedelta
+import asyncio
+import hashlib
+import threading
+import time
+import weakref
+from config import settings
+from services.resilience import (
+    CircuitBreaker,
+    ProviderUnavailableError,
+    ResiliencePolicy,
+    ResilienceStats,
+    call_with_resilience,
+    stream_with_resilience
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token estimate (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = " [...]") -> str:
+    """Cut text to at most max_tokens by the local estimate, marking the cut."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max(max_tokens * 4 - len(marker), 0)
+    return text[:keep].rstrip() + marker if keep else ""
+
+
+class ChatPrompt:
+    """
+    Prompt for one chat turn, ordered for provider-side prefix caching:
+    a static prefix shared by every user, then the per-user context, then
+    the conversation messages ([{"role": ..., "content": ...}], oldest first).
+    cache_key, when set, is the (outline fingerprint, message) the reply can be
+    cached under.
+    """
+
+    def __init__(
+        self,
+        static_prefix: str,
+        context: str,
+        messages: List[Dict[str, str]],
+        cache_key: Optional[Tuple[str, str]] = None
+    ):
+        self.static_prefix = static_prefix
+        self.context = context
+        self.messages = messages
+        self.cache_key = cache_key
+
+    @property
+    def system_text(self) -> str:
+        return "\n\n".join(part for part in (self.static_prefix, self.context) if part)
+
+
+class PromptTokenStats:
+    """Counters for prompt tokens served from a provider cache vs billed in full."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.estimated_requests = 0
+
+    def record(self, prompt_tokens: int, cached_tokens: int = 0, estimated: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            if estimated:
+                self.estimated_requests += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_prompt_tokens": self.cached_tokens,
+                "uncached_prompt_tokens": self.prompt_tokens - self.cached_tokens,
+                "estimated_requests": self.estimated_requests,
+            }
+
+
+class LLMProvider:
+    """Base class for a long-lived LLM client shared across requests."""
+
+    name = "base"
+
+    def __init__(self):
+        self.healthy = False
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self._semaphores = weakref.WeakKeyDictionary()
+        self.token_stats = PromptTokenStats()
+        self.breaker = CircuitBreaker(settings.ai_breaker_failure_threshold, settings.ai_breaker_reset_seconds)
+        self.resilience_stats = ResilienceStats()
+
+    def startup(self) -> None:
+        """Create the underlying client. Errors mark the provider unhealthy."""
+        try:
+            self._create_client()
+            self.healthy = True
+            self.last_error = None
+        except Exception as e:
+            print(f"AI Provider Initialization Error ({self.name}): {str(e)}")
+            self.healthy = False
+            self.last_error = str(e)
+        self.started_at = time.time()
+
+    def shutdown(self) -> None:
+        """Release pooled connections held by the client."""
+        self._close_client()
+        self.healthy = False
+    
+    async def ashutdown(self) -> None:
+        """Release sync and async pooled connections held by the client."""
+        await self._aclose_client()
+        self.shutdown()
+
+    def generate(self, prompt: ChatPrompt) -> str:
+        """
+        Generate a completion for a chat prompt.
+        """
+        if not self.healthy:
+            raise ProviderUnavailableError(
+                self.last_error or f"{self.name} provider is not available"
+            )
+        try:
+            text = self._generate(prompt)
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        self.last_success_at = time.time()
+        return text
+
+    async def agenerate(self, prompt: ChatPrompt, policy: Optional[ResiliencePolicy] = None) -> str:
+        """
+        Generate a completion without blocking the event loop.
+        In-flight calls per worker are bounded by AI_MAX_CONCURRENT_REQUESTS; each call
+        runs under the timeout, retry, hedging and circuit breaker policy (AI_CALL_*, AI_RETRY_*
+        unless a policy is given).
+        """
+        if not self.healthy:
+            raise ProviderUnavailableError(
+                self.last_error or f"{self.name} provider is not available"
+            )
+        try:
+            async with self._get_semaphore():
+                text = await call_with_resilience(
+                    lambda: self._agenerate(prompt),
+                    self.breaker,
+                    policy or ResiliencePolicy.from_settings(),
+                    self.resilience_stats
+                )
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        self.last_success_at = time.time()
+        return text
+
+    async def astream(self, prompt: ChatPrompt, policy: Optional[ResiliencePolicy] = None) -> AsyncIterator[str]:
+        """
+        Stream completion text chunks as the provider produces them.
+        Failures before the first chunk are retried; every chunk must arrive within AI_CALL_TIMEOUT_SECONDS.
+        """
+        if not self.healthy:
+            raise ProviderUnavailableError(
+                self.last_error or f"{self.name} provider is not available"
+            )
+        try:
+            async with self._get_semaphore():
+                chunks = stream_with_resilience(
+                    lambda: self._astream(prompt),
+                    self.breaker,
+                    policy or ResiliencePolicy.from_settings(),
+                    self.resilience_stats
+                )
+                async for chunk in chunks:
+                    if chunk:
+                        yield chunk
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        self.last_success_at = time.time()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to one event loop, so keep one per loop
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.ai_max_concurrent_requests)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    def health(self) -> Dict[str, object]:
+        """Report provider health state."""
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "circuit": self.breaker.state,
+            "last_error": self.last_error,
+            "last_success_at": self.last_success_at,
+        }
+
+    def _record_usage(self, prompt: ChatPrompt, prompt_tokens: Optional[int], cached_tokens: Optional[int]) -> None:
+        if prompt_tokens is None:
+            text = prompt.system_text + "".join(m["content"] for m in prompt.messages)
+            self.token_stats.record(estimate_tokens(text), estimated=True)
+        else:
+            self.token_stats.record(prompt_tokens, cached_tokens or 0)
+
+    def _create_client(self) -> None:
+        raise NotImplementedError
+
+    def _close_client(self) -> None:
+        pass
+
+    async def _aclose_client(self) -> None:
+        pass
+
+    def _generate(self, prompt: ChatPrompt) -> str:
+        raise NotImplementedError
+
+    async def _agenerate(self, prompt: ChatPrompt) -> str:
+        # Providers without a native async API run in the default executor
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._generate, prompt)
+
+    async def _astream(self, prompt: ChatPrompt) -> AsyncIterator[str]:
+        # Providers without native streaming deliver the whole completion at once
+        yield await self._agenerate(prompt)
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Google Gemini provider. The gRPC channel is created once and reused.
+    With GEMINI_CONTEXT_CACHE_ENABLED the static prompt prefix is uploaded
+    once as Gemini cached content and later turns only send the rest.
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str], model_name: str):
+        super().__init__()
+        self.api_key = api_key
+        self.model_name = model_name
+        self.model = None
+        self._genai = None
+        self._cache_lock = threading.Lock()
+        self._cached_models: Dict[str, Tuple[Any, float]] = {}
+
+    def _create_client(self) -> None:
+        if not self.api_key:
+            raise ProviderUnavailableError("GEMINI_API_KEY environment variable not set")
+        import google.generativeai as genai
+        genai.configure(api_key=self.api_key)
+        self._genai = genai
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def _close_client(self) -> None:
+        self.model = None
+        self._cached_models = {}
+
+    def _prefix_key(self, prefix: str) -> str:
+        return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+    def _fresh_cached_model(self, prefix: str) -> Tuple[bool, Any]:
+        entry = self._cached_models.get(self._prefix_key(prefix))
+        if entry and entry[1] > time.time():
+            return True, entry[0]
+        return False, None
+
+    def _cached_model(self, prefix: str) -> Any:
+        """Model bound to cached content holding the prefix, or None if caching is unavailable."""
+        fresh, model = self._fresh_cached_model(prefix)
+        if fresh:
+            return model
+        
+        with self._cache_lock:
+            fresh, model = self._fresh_cached_model(prefix)
+            if fresh:
+                return model
+            ttl_seconds = settings.gemini_context_cache_ttl_minutes * 60
+            try:
+                from google.generativeai import caching
+                cached_content = caching.CachedContent.create(
+                    model=self.model_name,
+                    system_instruction=prefix,
+                    ttl=timedelta(seconds=ttl_seconds)
+                )
+                model = self._genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+            except Exception as e:
+                # e.g. prefix below the model's minimum cacheable size; retried after the TTL
+                print(f"Gemini context cache unavailable: {str(e)}")
+                model = None
+            # Refresh before the server-side cache expires
+            self._cached_models[self._prefix_key(prefix)] = (model, time.time() + ttl_seconds * 0.9)
+            return model
+
+    def _uses_context_cache(self, prompt: ChatPrompt) -> bool:
+        return settings.gemini_context_cache_enabled and bool(prompt.static_prefix)
+
+    def _model_and_contents(self, prompt: ChatPrompt, cached_model: Any) -> Tuple[Any, str]:
+        conversation = [f"{m['role'].upper()}: {m['content']}" for m in prompt.messages]
+        history = "CONVERSATION HISTORY:\n" + "\n".join(conversation)
+        if cached_model is not None:
+            return cached_model, f"{prompt.context}\n\n{history}"
+        return self.model, f"{prompt.system_text}\n\n{history}"
+
+    async def _amodel_and_contents(self, prompt: ChatPrompt) -> Tuple[Any, str]:
+        cached_model = None
+        if self._uses_context_cache(prompt):
+            fresh, cached_model = self._fresh_cached_model(prompt.static_prefix)
+            if not fresh:
+                loop = asyncio.get_running_loop()
+                cached_model = await loop.run_in_executor(None, self._cached_model, prompt.static_prefix)
+        return self._model_and_contents(prompt, cached_model)
+
+    def _record_response_usage(self, prompt: ChatPrompt, response: Any) -> None:
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None) if usage else None
+        cached_tokens = getattr(usage, "cached_content_token_count", 0) if usage else 0
+        self._record_usage(prompt, prompt_tokens or None, cached_tokens)
+
+    def _generate(self, prompt: ChatPrompt) -> str:
+        cached_model = self._cached_model(prompt.static_prefix) if self._uses_context_cache(prompt) else None
+        model, contents = self._model_and_contents(prompt, cached_model)
+        response = model.generate_content(contents)
+        if not response or not response.text:
+            raise Exception("Empty response from Gemini API")
+        self._record_response_usage(prompt, response)
+        return response.text
+
+    async def _agenerate(self, prompt: ChatPrompt) -> str:
+        model, contents = await self._amodel_and_contents(prompt)
+        response = await model.generate_content_async(contents)
+        if not response or not response.text:
+            raise Exception("Empty response from Gemini API")
+        self._record_response_usage(prompt, response)
+        return response.text
+
+    async def _astream(self, prompt: ChatPrompt) -> AsyncIterator[str]:
+        model, contents = await self._amodel_and_contents(prompt)
+        response = await model.generate_content_async(contents, stream=True)
+        async for chunk in response:
+            yield chunk.text
+        self._record_response_usage(prompt, response)
+
+
+class OpenAIProvider(LLMProvider):
+    """
+    OpenAI provider backed by a pooled keep-alive HTTP client.
+    The static prefix is sent as its own leading system message so that
+    OpenAI's automatic prompt caching can match it across users.
+    """
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str], model_name: str, base_url: Optional[str] = None):
+        super().__init__()
+        self.api_key = api_key
+        self.model_name = model_name
+        self.base_url = base_url
+        self.client = None
+        self.async_client = None
+        self._http_client = None
+        self._async_http_client = None
+
+    def _create_client(self) -> None:
+        if not self.api_key:
+            raise ProviderUnavailableError("OPENAI_API_KEY environment variable not set")
+        import httpx
+        from openai import OpenAI, AsyncOpenAI
+        limits = httpx.Limits(
+            max_connections=settings.ai_http_max_connections,
+            max_keepalive_connections=settings.ai_http_max_keepalive,
+        )
+        self._http_client = httpx.Client(limits=limits, timeout=settings.ai_http_timeout_seconds)
+        self._async_http_client = httpx.AsyncClient(limits=limits, timeout=settings.ai_http_timeout_seconds)
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=self._http_client)
+        self.async_client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, http_client=self._async_http_client)
+
+    def _close_client(self) -> None:
+        if self._http_client is not None:
+            self._http_client.close()
+        self._http_client = None
+        self.client = None
+
+    async def _aclose_client(self) -> None:
+        if self._async_http_client is not None:
+            await self._async_http_client.aclose()
+        self._async_http_client = None
+        self.async_client = None
+
+    def _build_messages(self, prompt: ChatPrompt) -> List[Dict[str, str]]:
+        system = [
+            {"role": "system", "content": part}
+            for part in (prompt.static_prefix, prompt.context) if part
+        ]
+        return system + prompt.messages
+
+    def _record_response_usage(self, prompt: ChatPrompt, response: Any) -> None:
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None) if usage else None
+        if isinstance(details, dict):
+            cached_tokens = details.get("cached_tokens", 0)
+        else:
+            cached_tokens = getattr(details, "cached_tokens", 0) if details else 0
+        self._record_usage(prompt, getattr(usage, "prompt_tokens", None) if usage else None, cached_tokens)
+
+    def _generate(self, prompt: ChatPrompt) -> str:
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._build_messages(prompt)
+        )
+        self._record_response_usage(prompt, response)
+        return response.choices[0].message.content
+
+    async def _agenerate(self, prompt: ChatPrompt) -> str:
+        response = await self.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=self._build_messages(prompt)
+        )
+        self._record_response_usage(prompt, response)
+        return response.choices[0].message.content
+
+    async def _astream(self, prompt: ChatPrompt) -> AsyncIterator[str]:
+        stream = await self.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=self._build_messages(prompt),
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        # Streamed completions carry no usage block, so the prompt size is estimated
+        self._record_usage(prompt, None, None)
+
+
+class LocalProvider(OpenAIProvider):
+    """
+    Self-hosted model behind an OpenAI-compatible endpoint (vLLM, Ollama, llama.cpp server),
+    configured with LOCAL_LLM_BASE_URL.
+    """
+
+    name = "local"
+
+    def __init__(self, base_url: str, model_name: str, api_key: Optional[str] = None):
+        # Most local servers ignore the key, but the OpenAI client requires one
+        super().__init__(api_key or "local", model_name, base_url=base_url)
+
+
+class ProviderRegistry:
+    """
+    Process-wide registry of LLM providers.
+    Built once in the application lifespan; every uvicorn worker process
+    owns one registry and shares it across all of its requests.
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, LLMProvider] = {}
+        self.started = False
+        self._startup_lock = threading.Lock()
+
+    def register(self, provider: LLMProvider) -> None:
+        """Register (or replace) a provider and start it if the registry is live."""
+        previous = self._providers.get(provider.name)
+        if previous is not None and previous is not provider:
+            previous.shutdown()
+        self._providers[provider.name] = provider
+        if self.started:
+            provider.startup()
+
+    def get(self, name: str) -> LLMProvider:
+        """Get a provider by name, starting the registry lazily if needed."""
+        if not self.started:
+            self.startup()
+        provider = self._providers.get(name)
+        if provider is None:
+            raise ProviderUnavailableError(f"Unsupported AI service: {name}")
+        return provider
+
+    def startup(self) -> None:
+        """Create clients for all configured providers."""
+        if self.started:
+            return
+        # get() starts the registry lazily from request threads; only one may build the clients
+        with self._startup_lock:
+            if self.started:
+                return
+            if "gemini" not in self._providers:
+                self.register(GeminiProvider(settings.gemini_api_key, settings.gemini_model))
+            if "openai" not in self._providers:
+                self.register(OpenAIProvider(settings.openai_api_key, settings.openai_model))
+            if settings.local_llm_base_url and "local" not in self._providers:
+                self.register(LocalProvider(settings.local_llm_base_url, settings.local_llm_model, settings.local_llm_api_key))
+            for provider in self._providers.values():
+                provider.startup()
+            self.started = True
+
+    def shutdown(self) -> None:
+        """Close all provider clients."""
+        for provider in self._providers.values():
+            provider.shutdown()
+        self.started = False
+
+    async def ashutdown(self) -> None:
+        """Close all provider clients, including async connection pools."""
+        for provider in self._providers.values():
+            await provider.ashutdown()
+        self.started = False
+
+    def health(self) -> Dict[str, Dict[str, object]]:
+        """Health state of every registered provider."""
+        return {name: p.health() for name, p in self._providers.items()}
+
+    def token_stats(self) -> Dict[str, Dict[str, int]]:
+        """Cached vs uncached prompt token counters of every registered provider."""
+        return {name: p.token_stats.snapshot() for name, p in self._providers.items()}
+
+    def resilience_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Retry, timeout, hedging and circuit breaker counters of every registered provider."""
+        return {
+            name: {**p.resilience_stats.snapshot(), "circuit": p.breaker.state}
+            for name, p in self._providers.items()
+        }
+
+
+provider_registry = ProviderRegistry()
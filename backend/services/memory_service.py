@@ -0,0 +1,280 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+import uuid
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from models.user import ChatHistory, ConversationSummary
+from services.llm_provider import ChatPrompt, estimate_tokens, truncate_to_tokens
+from config import settings
+
+# Role labels and separators the providers add around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_HEADER = "EARLIER CONVERSATION (summary):"
+
+SUMMARY_PROMPT = """You keep a running summary of a conversation between a student and their study-abroad counsellor.
+Merge the new messages into the existing summary. Keep decisions, preferences, universities discussed,
+scores, deadlines and open questions; drop greetings and repetition.
+Reply with the updated summary only, in at most {max_words} words."""
+
+# Users whose summary is being updated in this process; concurrent turns skip instead of racing
+_updating: Set[uuid.UUID] = set()
+
+# Runs fn(session) in a fresh session and returns its result
+SessionRunner = Callable[[Callable[[Session], Any]], Awaitable[Any]]
+
+
+class ConversationMemory:
+    """A user's rolling summary and the recent messages sent verbatim (oldest first)."""
+    
+    def __init__(self, summary: str, messages: List[Dict[str, str]]):
+        self.summary = summary
+        self.messages = messages
+
+
+def unsummarized_statement(
+    user_id: uuid.UUID,
+    summary: Optional[ConversationSummary],
+    limit: int
+) -> Select:
+    """Newest messages after the summary's watermark, on the (user_id, created_at, id) index."""
+    
+    statement = select(
+        ChatHistory.id, ChatHistory.role, ChatHistory.message, ChatHistory.created_at
+    ).where(ChatHistory.user_id == user_id)
+    if summary is not None and summary.summarized_until is not None:
+        statement = statement.where(
+            tuple_(ChatHistory.created_at, ChatHistory.id)
+            > tuple_(summary.summarized_until, summary.summarized_message_id)
+        )
+    return statement.order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc()).limit(limit)
+
+
+def window_size(rows: Sequence) -> int:
+    """
+    How many of the newest rows (newest first) fit the recent-message budget.
+    The newest message is always kept, truncated if it alone is over budget.
+    """
+    
+    used = 0
+    rows = rows[:settings.chat_history_max_messages]
+    for count, row in enumerate(rows):
+        used += estimate_tokens(row.message) + MESSAGE_OVERHEAD_TOKENS
+        if used > settings.chat_history_token_budget:
+            return max(count, 1)
+    return len(rows)
+
+
+def load_memory(db: Session, user_id: uuid.UUID) -> ConversationMemory:
+    """The user's summary and recent-message window (two indexed reads)."""
+    
+    summary = db.get(ConversationSummary, user_id)
+    rows = db.execute(
+        unsummarized_statement(user_id, summary, settings.chat_history_max_messages)
+    ).all()
+    
+    messages = [
+        {"role": row.role, "content": truncate_to_tokens(row.message, settings.chat_history_token_budget)}
+        for row in reversed(rows[:window_size(rows)])
+    ]
+    return ConversationMemory(summary.summary if summary else "", messages)
+
+
+def assemble_prompt(
+    static_prefix: str,
+    context: str,
+    memory: ConversationMemory,
+    message: str,
+    max_tokens: Optional[int] = None
+) -> ChatPrompt:
+    """
+    Build the chat prompt under a hard token ceiling. Parts are admitted in order
+    of importance: static prefix, the new message (at most half of what is left),
+    the user context, the summary, then recent messages newest first.
+    """
+    
+    remaining = (max_tokens or settings.chat_prompt_max_tokens) - estimate_tokens(static_prefix) - MESSAGE_OVERHEAD_TOKENS
+    
+    message = truncate_to_tokens(message, max(remaining // 2 - MESSAGE_OVERHEAD_TOKENS, 0))
+    remaining -= estimate_tokens(message) + MESSAGE_OVERHEAD_TOKENS
+    
+    context = truncate_to_tokens(context, max(remaining, 0))
+    remaining -= estimate_tokens(context) + MESSAGE_OVERHEAD_TOKENS
+    
+    summary = f"{SUMMARY_HEADER}\n{memory.summary}" if memory.summary else ""
+    summary = truncate_to_tokens(summary, max(remaining - MESSAGE_OVERHEAD_TOKENS, 0))
+    if summary:
+        context = f"{context}\n\n{summary}"
+        remaining -= estimate_tokens(summary) + MESSAGE_OVERHEAD_TOKENS
+    
+    history = []
+    for past in reversed(memory.messages):
+        cost = estimate_tokens(past["content"]) + MESSAGE_OVERHEAD_TOKENS
+        if cost > remaining:
+            break
+        history.append(past)
+        remaining -= cost
+    history.reverse()
+    
+    return ChatPrompt(static_prefix, context, history + [{"role": "user", "content": message}])
+
+
+def session_runner(bind: Any) -> SessionRunner:
+    """
+    Run session work off the event loop in a fresh session on the request's engine,
+    for tasks that outlive the request-scoped session.
+    """
+    
+    if isinstance(bind, AsyncEngine):
+        async_factory = async_sessionmaker(bind, autoflush=False, expire_on_commit=False)
+    
+        async def run_async(fn):
+            async with async_factory() as session:
+                return await session.run_sync(fn)
+    
+        return run_async
+    
+    factory = sessionmaker(bind=bind, autoflush=False)
+    
+    def call(fn):
+        with factory() as session:
+            return fn(session)
+    
+    async def run(fn):
+        return await run_in_threadpool(call, fn)
+    
+    return run
+
+
+def backlog_statement(
+    user_id: uuid.UUID,
+    summary: Optional[ConversationSummary],
+    before: Tuple,
+    limit: int
+) -> Select:
+    """Oldest messages after the summary's watermark and before `before`, on the same index."""
+    
+    statement = select(
+        ChatHistory.id, ChatHistory.role, ChatHistory.message, ChatHistory.created_at
+    ).where(
+        ChatHistory.user_id == user_id,
+        tuple_(ChatHistory.created_at, ChatHistory.id) < tuple_(*before)
+    )
+    if summary is not None and summary.summarized_until is not None:
+        statement = statement.where(
+            tuple_(ChatHistory.created_at, ChatHistory.id)
+            > tuple_(summary.summarized_until, summary.summarized_message_id)
+        )
+    return statement.order_by(ChatHistory.created_at, ChatHistory.id).limit(limit)
+
+
+def _pending_summary(db: Session, user_id: uuid.UUID) -> Optional[Tuple[str, Optional[Tuple], List]]:
+    """
+    Previous summary, its watermark and the next batch of messages (oldest first)
+    that left the recent window. None until a full batch has built up.
+    """
+    
+    summary = db.get(ConversationSummary, user_id)
+    recent = db.execute(unsummarized_statement(user_id, summary, settings.chat_history_max_messages)).all()
+    if not recent:
+        return None
+    oldest_kept = recent[window_size(recent) - 1]
+    
+    batch = settings.chat_summary_batch_messages
+    rows = db.execute(backlog_statement(user_id, summary, (oldest_kept.created_at, oldest_kept.id), batch)).all()
+    if len(rows) < batch:
+        return None
+    
+    watermark = (summary.summarized_until, summary.summarized_message_id) if summary else None
+    return (summary.summary if summary else ""), watermark, rows
+
+
+def _store_summary(db: Session, user_id: uuid.UUID, watermark: Optional[Tuple], text: str, rows: List) -> bool:
+    summary = db.get(ConversationSummary, user_id, with_for_update=True)
+    current = (summary.summarized_until, summary.summarized_message_id) if summary else None
+    if current != watermark:
+        # A later turn's update got there first
+        return False
+    
+    if summary is None:
+        summary = ConversationSummary(user_id=user_id, message_count=0)
+        db.add(summary)
+    summary.summary = text
+    summary.summarized_until = rows[-1].created_at
+    summary.summarized_message_id = rows[-1].id
+    summary.message_count += len(rows)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+
+def _extractive_summary(previous: str, rows: List, max_tokens: int) -> str:
+    """Summary without a model: the previous summary plus one clipped line per message, newest kept."""
+    
+    lines = [previous] if previous else []
+    lines += [f"- {row.role}: {truncate_to_tokens(' '.join(row.message.split()), 40)}" for row in rows]
+    text = "\n".join(lines)
+    if estimate_tokens(text) > max_tokens:
+        text = text[-max_tokens * 4:].split("\n", 1)[-1]
+    return text
+
+
+async def summarize_messages(previous: str, rows: List) -> str:
+    """Fold messages into the previous summary with the routed model, bounded to CHAT_SUMMARY_MAX_TOKENS."""
+    # ai_service imports this module for prompt assembly
+    from services.ai_service import provider_router
+    
+    max_tokens = settings.chat_summary_max_tokens
+    instructions = SUMMARY_PROMPT.format(max_words=max_tokens * 3 // 4)
+    transcript = "\n".join(
+        f"{row.role.upper()}: {truncate_to_tokens(row.message, max_tokens)}" for row in rows
+    )
+    content = truncate_to_tokens(
+        f"EXISTING SUMMARY:\n{previous or 'None'}\n\nNEW MESSAGES:\n{transcript}",
+        settings.chat_prompt_max_tokens - estimate_tokens(instructions) - MESSAGE_OVERHEAD_TOKENS
+    )
+    
+    try:
+        text = (await provider_router.generate(ChatPrompt(instructions, "", [{"role": "user", "content": content}]))).strip()
+    except Exception as e:
+        print(f"Conversation summary fallback: {str(e)}")
+        text = ""
+    
+    if not text:
+        text = _extractive_summary(previous, rows, max_tokens)
+    return truncate_to_tokens(text, max_tokens)
+
+
+async def update_conversation_summary(user_id: uuid.UUID, run_db: SessionRunner) -> bool:
+    """
+    Fold messages that have left the recent window into the user's rolling summary,
+    one CHAT_SUMMARY_BATCH_MESSAGES batch at a time. Runs after a turn is saved;
+    returns whether the summary changed.
+    """
+    
+    if user_id in _updating:
+        # The running update or the next turn picks these messages up
+        return False
+    _updating.add(user_id)
+    changed = False
+    try:
+        # Page forward from the watermark so a long backlog is folded in batch by batch
+        while True:
+            pending = await run_db(lambda db: _pending_summary(db, user_id))
+            if pending is None:
+                return changed
+            previous, watermark, rows = pending
+            text = await summarize_messages(previous, rows)
+            if not await run_db(lambda db: _store_summary(db, user_id, watermark, text, rows)):
+                return changed
+            changed = True
+    except Exception as e:
+        print(f"Conversation summary update failed: {str(e)}")
+        return changed
+    finally:
+        _updating.discard(user_id)
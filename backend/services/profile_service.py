@@ -1,5 +1,8 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from decimal import Decimal
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from models.user import Onboarding
 from models.university import UserUniversity
 
@@ -76,55 +79,137 @@ def calculate_profile_strength(onboarding: Onboarding) -> Dict[str, Any]:
     }
 
 
-def determine_stage(
+# Stage details by stage number
+STAGES: Dict[int, Dict[str, Any]] = {
+    1: {
+        "current_stage": 1,
+        "stage_name": "Profile Building",
+        "stage_description": "Strengthen your profile with exams and SOP",
+        "is_locked": False,
+        "next_action": "Complete exams and prepare your SOP"
+    },
+    2: {
+        "current_stage": 2,
+        "stage_name": "University Discovery",
+        "stage_description": "Explore and shortlist universities",
+        "is_locked": False,
+        "next_action": "Talk to AI Counsellor to discover universities"
+    },
+    3: {
+        "current_stage": 3,
+        "stage_name": "University Finalization",
+        "stage_description": "Lock your final university choices",
+        "is_locked": False,
+        "next_action": "Lock at least one university to proceed"
+    },
+    4: {
+        "current_stage": 4,
+        "stage_name": "Application Preparation",
+        "stage_description": "Prepare your applications and complete required documents",
+        "is_locked": False,
+        "next_action": "Work on your application tasks and deadlines"
+    },
+}
+
+
+def stage_number(
     onboarding: Onboarding,
     shortlisted_count: int,
-    locked_count: int
-) -> Dict[str, Any]:
-    """
-    Determine current stage based on user progress.
-    Stage 1: Profile Building
-    Stage 2: University Discovery
-    Stage 3: University Finalization
-    Stage 4: Application Preparation
-    """
+    locked_count: int,
+    profile_strength: Optional[Dict[str, Any]] = None
+) -> int:
+    """Current stage (1-4) from the user's progress; see determine_stage."""
     
     # Stage 4: Application Preparation (locked universities)
     if locked_count > 0:
-        return {
-            "current_stage": 4,
-            "stage_name": "Application Preparation",
-            "stage_description": "Prepare your applications and complete required documents",
-            "is_locked": False,
-            "next_action": "Work on your application tasks and deadlines"
-        }
+        return 4
     
     # Stage 3: University Finalization (shortlisted but not locked)
     if shortlisted_count > 0:
-        return {
-            "current_stage": 3,
-            "stage_name": "University Finalization",
-            "stage_description": "Lock your final university choices",
-            "is_locked": False,
-            "next_action": "Lock at least one university to proceed"
-        }
+        return 3
     
     # Stage 2: University Discovery (profile strong enough)
-    profile_strength = calculate_profile_strength(onboarding)
+    if profile_strength is None:
+        profile_strength = calculate_profile_strength(onboarding)
     if profile_strength["overall_score"] >= 30:  # Basic threshold
-        return {
-            "current_stage": 2,
-            "stage_name": "University Discovery",
-            "stage_description": "Explore and shortlist universities",
-            "is_locked": False,
-            "next_action": "Talk to AI Counsellor to discover universities"
-        }
+        return 2
     
     # Stage 1: Profile Building (default)
-    return {
-        "current_stage": 1,
-        "stage_name": "Profile Building",
-        "stage_description": "Strengthen your profile with exams and SOP",
-        "is_locked": False,
-        "next_action": "Complete exams and prepare your SOP"
-    }
+    return 1
+
+
+def stage_info(stage: int) -> Dict[str, Any]:
+    """Stage details for a stage number."""
+    return dict(STAGES[stage])
+
+
+def determine_stage(
+    onboarding: Onboarding,
+    shortlisted_count: int,
+    locked_count: int,
+    profile_strength: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Determine current stage based on user progress.
+    Stage 1: Profile Building
+    Stage 2: University Discovery
+    Stage 3: University Finalization
+    Stage 4: Application Preparation
+    Pass `profile_strength` when the caller has already calculated it.
+    """
+    return stage_info(stage_number(onboarding, shortlisted_count, locked_count, profile_strength))
+
+
+def user_universities_statement(user_id: Any, status: Optional[str] = None):
+    """A user's shortlisted/locked universities with their University rows eagerly joined."""
+    statement = select(UserUniversity).options(
+        joinedload(UserUniversity.university)
+    ).where(UserUniversity.user_id == user_id)
+    
+    if status:
+        statement = statement.where(UserUniversity.status == status)
+    
+    return statement.order_by(UserUniversity.created_at)
+
+
+def get_user_universities(
+    db: Session,
+    user_id: Any,
+    status: Optional[str] = None
+) -> List[UserUniversity]:
+    """
+    Load a user's shortlisted/locked universities with their University rows
+    eagerly joined, so serializing or formatting them issues no extra SELECTs.
+    """
+    return list(db.scalars(user_universities_statement(user_id, status)).all())
+
+
+async def get_user_universities_async(
+    db: AsyncSession,
+    user_id: Any,
+    status: Optional[str] = None
+) -> List[UserUniversity]:
+    """Async get_user_universities."""
+    return list((await db.scalars(user_universities_statement(user_id, status))).all())
+
+
+def user_university_counts_statement(user_id: Any):
+    """Per-status counts of a user's universities, as one grouped query."""
+    return select(
+        UserUniversity.status,
+        func.count(UserUniversity.id)
+    ).where(
+        UserUniversity.user_id == user_id
+    ).group_by(UserUniversity.status)
+
+
+def _status_counts(rows) -> Dict[str, int]:
+    counts = {"shortlisted": 0, "locked": 0}
+    counts.update({status: count for status, count in rows})
+    return counts
+
+
+def count_user_universities_by_status(db: Session, user_id: Any) -> Dict[str, int]:
+    """Count a user's universities per status in a single grouped query."""
+    return _status_counts(db.execute(user_university_counts_statement(user_id)).all())
+
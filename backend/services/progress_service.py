@@ -0,0 +1,151 @@
+from typing import Any, Dict, Iterable, List
+from itertools import chain
+import uuid
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from models.user import User, Onboarding, Todo, UserProgress
+from models.university import UserUniversity
+from services.profile_service import calculate_profile_strength, stage_number
+
+# Writes to these tables change a user's progress
+TRACKED_MODELS = (Onboarding, Todo, UserUniversity)
+
+# Users whose progress rows are refreshed when the session commits
+_PENDING_KEY = "progress_user_ids"
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING
+_UPSERT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+def _lock_progress_rows(db: Session, user_ids: List[uuid.UUID]) -> Dict[uuid.UUID, UserProgress]:
+    """
+    Create missing progress rows and lock all of them (SELECT ... FOR UPDATE, in key
+    order) before anything is counted. Concurrent commits for the same user queue here,
+    and each one's counts, read after the lock, include the other's committed writes.
+    """
+
+    insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        db.execute(
+            insert(UserProgress)
+            .values([{"user_id": user_id} for user_id in user_ids])
+            .on_conflict_do_nothing(index_elements=[UserProgress.user_id])
+        )
+    progress_rows = {
+        progress.user_id: progress
+        for progress in db.scalars(
+            select(UserProgress)
+            .where(UserProgress.user_id.in_(user_ids))
+            .order_by(UserProgress.user_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+    }
+    for user_id in user_ids:
+        if user_id not in progress_rows:
+            progress_rows[user_id] = UserProgress(user_id=user_id)
+            db.add(progress_rows[user_id])
+    return progress_rows
+
+
+def refresh_user_progress(db: Session, user_ids: Iterable[Any]) -> List[UserProgress]:
+    """
+    Recompute the progress rows of the given users from onboarding,
+    user_universities and todos, creating missing rows. The rows stay locked
+    until the caller commits.
+    """
+
+    user_ids = sorted({uuid.UUID(str(user_id)) for user_id in user_ids})
+    if not user_ids:
+        return []
+
+    progress_rows = _lock_progress_rows(db, user_ids)
+
+    university_counts = db.execute(
+        select(UserUniversity.user_id, UserUniversity.status, UserUniversity.category, func.count())
+        .where(UserUniversity.user_id.in_(user_ids))
+        .group_by(UserUniversity.user_id, UserUniversity.status, UserUniversity.category)
+    ).all()
+    todo_counts = db.execute(
+        select(Todo.user_id, Todo.priority, func.count())
+        .where(Todo.user_id.in_(user_ids), Todo.is_complete.is_not(True))
+        .group_by(Todo.user_id, Todo.priority)
+    ).all()
+    onboardings = {
+        onboarding.user_id: onboarding
+        for onboarding in db.scalars(select(Onboarding).where(Onboarding.user_id.in_(user_ids)))
+    }
+
+    for progress in progress_rows.values():
+        for column in (
+            "shortlisted_count", "locked_count", "dream_count", "target_count", "safe_count",
+            "open_todos_high", "open_todos_medium", "open_todos_low",
+        ):
+            setattr(progress, column, 0)
+
+    for user_id, status, category, count in university_counts:
+        progress = progress_rows[user_id]
+        if status in ("shortlisted", "locked"):
+            setattr(progress, f"{status}_count", getattr(progress, f"{status}_count") + count)
+        if category in ("dream", "target", "safe"):
+            setattr(progress, f"{category}_count", getattr(progress, f"{category}_count") + count)
+
+    for user_id, priority, count in todo_counts:
+        # Todos without a known priority count as medium
+        column = f"open_todos_{priority if priority in ('high', 'low') else 'medium'}"
+        progress = progress_rows[user_id]
+        setattr(progress, column, getattr(progress, column) + count)
+
+    for user_id, progress in progress_rows.items():
+        onboarding = onboardings.get(user_id)
+        if onboarding is None:
+            progress.profile_academic = progress.profile_exams = progress.profile_sop = None
+            progress.profile_score = 0
+            progress.current_stage = 1
+            continue
+        strength = calculate_profile_strength(onboarding)
+        progress.profile_academic = strength["academic"]
+        progress.profile_exams = strength["exams"]
+        progress.profile_sop = strength["sop"]
+        progress.profile_score = strength["overall_score"]
+        progress.current_stage = stage_number(
+            onboarding, progress.shortlisted_count, progress.locked_count, strength
+        )
+
+    return [progress_rows[user_id] for user_id in user_ids]
+
+
+def reconcile_user_progress(db: Session, batch_size: int = 500) -> int:
+    """Rebuild every user's progress row from the underlying tables. Returns the number of users."""
+
+    user_ids = db.scalars(select(User.id).order_by(User.id)).all()
+    for start in range(0, len(user_ids), batch_size):
+        refresh_user_progress(db, user_ids[start:start + batch_size])
+        db.commit()
+    return len(user_ids)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_progress_users(session, flush_context, instances):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, TRACKED_MODELS) and obj.user_id is not None:
+            pending.add(obj.user_id)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_progress_before_commit(session):
+    # Flush first so changes still pending at commit are collected too;
+    # the refreshed rows are flushed by the commit itself, in the same transaction
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    if user_ids:
+        refresh_user_progress(session, user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_progress(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,185 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from decimal import Decimal
+import uuid
+from sqlalchemy.orm import Session
+from models.user import Onboarding
+from models.university import PrecomputedRecommendation
+from services.university_catalog import UniversityCatalog, get_catalog
+from services.recommendation_service import (
+    REASON_BITS,
+    build_recommendations,
+    decode_reason_bits,
+    profile_key,
+    render_fit_analysis,
+    score_profiles,
+    sort_by_category
+)
+
+# Onboarding fields the scorer reads; profiles are copied into plain objects so they pickle
+PROFILE_FIELDS = (
+    "user_id",
+    "gpa",
+    "ielts_score",
+    "gre_score",
+    "intended_degree",
+    "field_of_study",
+    "preferred_countries",
+    "budget_range_max",
+)
+
+# Up to the endpoint's maximum page size, so any requested limit can be served
+PRECOMPUTE_LIMIT = 50
+
+ScoredProfile = Tuple[Any, str, List[Dict[str, Any]]]
+
+
+def profile_snapshot(onboarding: Onboarding) -> SimpleNamespace:
+    return SimpleNamespace(**{field: getattr(onboarding, field) for field in PROFILE_FIELDS})
+
+
+def catalog_version_tag(catalog: UniversityCatalog) -> str:
+    return str(catalog.version)
+
+
+def score_profile_batch(
+    profiles: List[Any],
+    catalog: UniversityCatalog,
+    limit: int = PRECOMPUTE_LIMIT
+) -> List[ScoredProfile]:
+    """
+    Score a batch of profiles in one matrix operation and build each one's
+    recommendations. Universities are returned by id to keep results small.
+    """
+
+    scores = score_profiles(profiles, catalog)
+    results = []
+    for p, profile in enumerate(profiles):
+        recommendations = build_recommendations(profile, catalog, scores.row(p), limit)
+        for rec in recommendations:
+            rec["university_id"] = rec.pop("university").id
+        results.append((profile.user_id, profile_key(profile), recommendations))
+    return results
+
+
+_worker_catalog: Optional[UniversityCatalog] = None
+
+
+def _init_worker(catalog: UniversityCatalog) -> None:
+    # The catalog is sent once per worker process instead of once per chunk
+    global _worker_catalog
+    _worker_catalog = catalog
+
+
+def _score_chunk(profiles: List[Any], limit: int) -> List[ScoredProfile]:
+    return score_profile_batch(profiles, _worker_catalog, limit)
+
+
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def save_precomputed(db: Session, results: List[ScoredProfile], version_tag: str) -> None:
+    """Replace the stored recommendations of every user in `results`."""
+
+    user_ids = [user_id for user_id, _, _ in results]
+    db.query(PrecomputedRecommendation).filter(
+        PrecomputedRecommendation.user_id.in_(user_ids)
+    ).delete(synchronize_session=False)
+
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "university_id": rec["university_id"],
+            "position": rec["position"],
+            "category": rec["category"],
+            "acceptance_likelihood": rec["acceptance_likelihood"],
+            "acceptance_score": Decimal(str(rec["acceptance_score"])),
+            "reason_bits": sum(REASON_BITS[code] for code in rec["fit_codes"] + rec["risk_codes"]),
+            "profile_key": key,
+            "catalog_version": version_tag,
+        }
+        for user_id, key, recommendations in results
+        for rec in recommendations
+    ]
+    if rows:
+        db.bulk_insert_mappings(PrecomputedRecommendation, rows)
+    db.commit()
+
+
+def precompute_recommendations(
+    db: Session,
+    chunk_size: int = 256,
+    workers: int = 1,
+    limit: int = PRECOMPUTE_LIMIT
+) -> int:
+    """
+    Recompute recommendations for every onboarded user against the current catalog.
+    Profiles are scored `chunk_size` at a time, across `workers` processes when
+    workers > 1. Returns the number of users processed.
+    """
+
+    catalog = get_catalog(db)
+    version_tag = catalog_version_tag(catalog)
+    profiles = [
+        profile_snapshot(onboarding)
+        for onboarding in db.query(Onboarding).filter(Onboarding.is_complete == True).all()
+    ]
+    chunks = list(_chunks(profiles, chunk_size))
+
+    if workers <= 1:
+        for chunk in chunks:
+            save_precomputed(db, score_profile_batch(chunk, catalog, limit), version_tag)
+        return len(profiles)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(catalog,)) as pool:
+        for results in pool.map(_score_chunk, chunks, [limit] * len(chunks)):
+            save_precomputed(db, results, version_tag)
+    return len(profiles)
+
+
+def get_precomputed_recommendations(
+    db: Session,
+    user_profile: Onboarding,
+    catalog: UniversityCatalog,
+    limit: int = 20,
+    details: bool = False
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Stored recommendations for the user, or None if the job has not run since
+    the profile or the catalog last changed.
+    """
+
+    if limit > PRECOMPUTE_LIMIT:
+        return None
+
+    rows = db.query(PrecomputedRecommendation).filter(
+        PrecomputedRecommendation.user_id == user_profile.user_id,
+        PrecomputedRecommendation.profile_key == profile_key(user_profile),
+        PrecomputedRecommendation.catalog_version == catalog_version_tag(catalog),
+        PrecomputedRecommendation.position < limit
+    ).order_by(PrecomputedRecommendation.position).all()
+
+    if not rows:
+        return None
+
+    recommendations = []
+    for row in rows:
+        university = catalog.get(row.university_id)
+        fit_codes, risk_codes = decode_reason_bits(row.reason_bits)
+        rec = {
+            "university": university,
+            "position": row.position,
+            "category": row.category,
+            "acceptance_likelihood": row.acceptance_likelihood,
+            "acceptance_score": float(row.acceptance_score),
+            "fit_codes": list(fit_codes),
+            "risk_codes": list(risk_codes)
+        }
+        if details:
+            rec.update(render_fit_analysis(user_profile, university, fit_codes, risk_codes))
+        recommendations.append(rec)
+    return sort_by_category(recommendations)
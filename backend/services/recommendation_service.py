@@ -1,8 +1,16 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from decimal import Decimal
+import base64
+from functools import lru_cache
+import hashlib
+import numpy as np
 from sqlalchemy.orm import Session
 from models.user import Onboarding
 from models.university import University, UserUniversity
+from services.university_catalog import UniversityCatalog, get_catalog, COMPETITIVENESS_CODES
+from services.cache_service import VersionedCache
+from services.field_matching import field_matches
+from config import settings
 
 
 def calculate_acceptance_likelihood(
@@ -101,52 +109,86 @@ def categorize_university(
     return category, acceptance
 
 
-def generate_fit_analysis(
+# Structured reasons behind a recommendation; prose is rendered from them on demand
+FIT_CODES = ["FIELD_MATCH", "COUNTRY_MATCH", "DEGREE_MATCH", "WITHIN_BUDGET"]
+RISK_CODES = ["OVER_BUDGET", "GPA_BELOW", "IELTS_BELOW", "HIGHLY_COMPETITIVE"]
+REASON_BITS = {code: 1 << i for i, code in enumerate(FIT_CODES + RISK_CODES)}
+
+
+def fit_reason_codes(
     user_profile: Onboarding,
-    university: University,
-    category: str,
-    acceptance: str
-) -> Dict[str, str]:
+    university: University
+) -> Tuple[List[str], List[str]]:
     """
-    Generate fit reason and risk factors for a university.
+    Reason codes for a university.
+    Returns: (fit_codes, risk_codes)
     """
     
-    fit_reasons = []
-    risk_factors = []
+    fit_codes = []
+    risk_codes = []
     
     # Field match
-    if user_profile.field_of_study.lower() in (university.field_of_study or "").lower():
-        fit_reasons.append(f"Matches your field of study: {user_profile.field_of_study}")
+    if field_matches(user_profile.field_of_study, university.field_of_study):
+        fit_codes.append("FIELD_MATCH")
     
     # Country preference
-    if university.country in user_profile.preferred_countries:
-        fit_reasons.append(f"Located in your preferred country: {university.country}")
+    if university.country in (user_profile.preferred_countries or []):
+        fit_codes.append("COUNTRY_MATCH")
     
     # Degree match
     if user_profile.intended_degree == university.degree_type:
-        fit_reasons.append(f"Offers {university.degree_type} programs")
+        fit_codes.append("DEGREE_MATCH")
     
     # Budget analysis
-    if university.estimated_cost_max:
+    if university.estimated_cost_max and user_profile.budget_range_max:
         if university.estimated_cost_max <= user_profile.budget_range_max:
-            fit_reasons.append("Within your budget range")
+            fit_codes.append("WITHIN_BUDGET")
         else:
-            risk_factors.append(f"Cost may exceed budget (${university.estimated_cost_max:,}/year)")
+            risk_codes.append("OVER_BUDGET")
     
     # GPA analysis
     if university.avg_gpa_required and user_profile.gpa:
         gpa_diff = float(user_profile.gpa) - float(university.avg_gpa_required)
         if gpa_diff < -0.2:
-            risk_factors.append(f"Your GPA ({user_profile.gpa}) is below average requirement ({university.avg_gpa_required})")
+            risk_codes.append("GPA_BELOW")
     
     # Test score analysis
     if university.min_ielts_required and user_profile.ielts_score:
         if user_profile.ielts_score < university.min_ielts_required:
-            risk_factors.append(f"IELTS score below requirement ({user_profile.ielts_score} < {university.min_ielts_required})")
+            risk_codes.append("IELTS_BELOW")
     
     # Competitiveness
     if university.competitiveness == "high":
-        risk_factors.append("Highly competitive program with low acceptance rate")
+        risk_codes.append("HIGHLY_COMPETITIVE")
+    
+    return fit_codes, risk_codes
+
+
+def render_fit_analysis(
+    user_profile: Onboarding,
+    university: University,
+    fit_codes: List[str],
+    risk_codes: List[str]
+) -> Dict[str, str]:
+    """
+    Render reason codes as the fit reason and risk factor text shown to users.
+    """
+    
+    fit_text = {
+        "FIELD_MATCH": lambda: f"Matches your field of study: {user_profile.field_of_study}",
+        "COUNTRY_MATCH": lambda: f"Located in your preferred country: {university.country}",
+        "DEGREE_MATCH": lambda: f"Offers {university.degree_type} programs",
+        "WITHIN_BUDGET": lambda: "Within your budget range",
+    }
+    risk_text = {
+        "OVER_BUDGET": lambda: f"Cost may exceed budget (${university.estimated_cost_max:,}/year)",
+        "GPA_BELOW": lambda: f"Your GPA ({user_profile.gpa}) is below average requirement ({university.avg_gpa_required})",
+        "IELTS_BELOW": lambda: f"IELTS score below requirement ({user_profile.ielts_score} < {university.min_ielts_required})",
+        "HIGHLY_COMPETITIVE": lambda: "Highly competitive program with low acceptance rate",
+    }
+    
+    fit_reasons = [fit_text[code]() for code in fit_codes]
+    risk_factors = [risk_text[code]() for code in risk_codes]
     
     # Default messages
     if not fit_reasons:
@@ -161,46 +203,406 @@ def generate_fit_analysis(
     }
 
 
-def recommend_universities(
-    db: Session,
+def generate_fit_analysis(
     user_profile: Onboarding,
-    limit: int = 20
-) -> List[Dict[str, Any]]:
+    university: University,
+    category: str,
+    acceptance: str
+) -> Dict[str, str]:
     """
-    Recommend universities based on user profile.
-    Returns list of universities with categorization and analysis.
+    Generate fit reason and risk factors for a university.
     """
     
-    # Query universities matching user preferences
-    query = db.query(University).filter(
-        University.degree_type == user_profile.intended_degree
-    )
+    fit_codes, risk_codes = fit_reason_codes(user_profile, university)
+    return render_fit_analysis(user_profile, university, fit_codes, risk_codes)
+
+
+ACCEPTANCE_LABELS = np.array(["low", "medium", "high"])
+CATEGORY_LABELS = np.array(["dream", "target", "safe"])
+LOW, MEDIUM, HIGH = 0, 1, 2
+DREAM, TARGET, SAFE = 0, 1, 2
+
+
+def _profile_float(value: Any) -> float:
+    """Profile value as float; None and zero count as 'not provided' like the scalar checks."""
+    return float(value) if value else 0.0
+
+
+class CatalogScores:
+    """
+    Vectorized scoring result over every catalog row: shape (n,) for one profile,
+    or (profiles, n) when several profiles are scored together.
+    """
+    
+    def __init__(self, acceptance_score: np.ndarray, acceptance: np.ndarray, category: np.ndarray):
+        self.acceptance_score = acceptance_score  # 0-100
+        self.acceptance = acceptance  # LOW / MEDIUM / HIGH codes
+        self.category = category  # DREAM / TARGET / SAFE codes
+    
+    def row(self, p: int) -> "CatalogScores":
+        """Scores of the p-th profile of a batch."""
+        return CatalogScores(self.acceptance_score[p], self.acceptance[p], self.category[p])
+    
+    def acceptance_label(self, i: int) -> str:
+        return str(ACCEPTANCE_LABELS[self.acceptance[i]])
+    
+    def category_label(self, i: int) -> str:
+        return str(CATEGORY_LABELS[self.category[i]])
+
+
+def score_catalog(user_profile: Onboarding, catalog: UniversityCatalog) -> CatalogScores:
+    """
+    Vectorized equivalent of calculate_acceptance_likelihood + categorize_university
+    for every university in the catalog at once.
+    """
+    
+    return score_profiles([user_profile], catalog).row(0)
+
+
+def _profile_column(profiles: List[Onboarding], attribute: str) -> np.ndarray:
+    """One profile value per row, shaped (profiles, 1) to broadcast against the catalog."""
+    return np.array([_profile_float(getattr(p, attribute)) for p in profiles])[:, None]
+
+
+def score_profiles(profiles: List[Onboarding], catalog: UniversityCatalog) -> CatalogScores:
+    """
+    Score many profiles against the catalog as one (profiles x universities) matrix.
+    Point tiers are built by summing threshold masks,
+    e.g. GPA 5/15/30/40 = 5 + 10*(diff >= -0.2) + 15*(diff >= 0) + 10*(diff >= 0.3).
+    A criterion only counts when both the profile value and the requirement are set.
+    """
+    
+    shape = (len(profiles), len(catalog))
+    score = np.zeros(shape)
+    max_score = np.zeros(shape)
+    
+    # GPA comparison (weight: 40%)
+    gpa = _profile_column(profiles, "gpa")
+    applies = (gpa != 0) & (catalog.gpa_required != 0)
+    gpa_diff = gpa - catalog.gpa_required
+    score += (5 + 10 * (gpa_diff >= -0.2) + 15 * (gpa_diff >= 0) + 10 * (gpa_diff >= 0.3)) * applies
+    max_score += 40 * applies
+    
+    # IELTS comparison (weight: 30%)
+    ielts = _profile_column(profiles, "ielts_score")
+    applies = (ielts != 0) & (catalog.ielts_required != 0)
+    ielts_diff = ielts - catalog.ielts_required
+    score += (10 * (ielts_diff >= -0.5) + 15 * (ielts_diff >= 0) + 5 * (ielts_diff >= 1)) * applies
+    max_score += 30 * applies
+    
+    # GRE comparison (weight: 30%)
+    gre = _profile_column(profiles, "gre_score")
+    applies = (gre != 0) & (catalog.gre_required != 0)
+    gre_diff = gre - catalog.gre_required
+    score += (10 * (gre_diff >= -10) + 15 * (gre_diff >= 0) + 5 * (gre_diff >= 20)) * applies
+    max_score += 30 * applies
+    
+    has_criteria = max_score > 0
+    percentage = np.divide(score, max_score, out=np.zeros(shape), where=has_criteria) * 100
+    measured = (percentage >= 50).astype(np.int8) + (percentage >= 75)
+    
+    # If no criteria matched, use competitiveness (low -> high, medium -> medium, else low)
+    by_competitiveness = HIGH * catalog.low_competitiveness + MEDIUM * (catalog.competitiveness == COMPETITIVENESS_CODES["medium"])
+    acceptance = np.where(has_criteria, measured, by_competitiveness)
+    acceptance_score = np.where(has_criteria, percentage, 25.0 + 25.0 * by_competitiveness)
+    
+    # Consider competitiveness and acceptance
+    dream = catalog.highly_competitive | (acceptance == LOW)
+    safe = ~dream & (catalog.low_competitiveness | (acceptance == HIGH))
+    category = np.where(dream, DREAM, np.where(safe, SAFE, TARGET))
+    
+    return CatalogScores(acceptance_score, acceptance, category)
+
+
+# Continuous fit score weights (sum to 1)
+ACADEMIC_WEIGHT = 0.5
+BUDGET_WEIGHT = 0.3
+RANKING_WEIGHT = 0.2
+
+# Requirement gap that moves the academic score from 0.5 to 1.0 (or 0.0)
+GPA_SCALE = 0.6
+IELTS_SCALE = 1.5
+GRE_SCALE = 30.0
+
+
+def fit_scores(user_profile: Onboarding, catalog: UniversityCatalog, scores: CatalogScores) -> np.ndarray:
+    """
+    Continuous 0-100 fit score per university, used to rank the eligible catalog.
+    Unlike the dream/target/safe buckets it grows smoothly with how far the
+    profile clears each requirement, how well the cost fits the budget and the ranking.
+    """
+    
+    n = len(catalog)
+    margin_sum = np.zeros(n)
+    criteria = np.zeros(n)
+    
+    for value, required, scale in (
+        (_profile_float(user_profile.gpa), catalog.gpa_required, GPA_SCALE),
+        (_profile_float(user_profile.ielts_score), catalog.ielts_required, IELTS_SCALE),
+        (_profile_float(user_profile.gre_score), catalog.gre_required, GRE_SCALE),
+    ):
+        if value:
+            applies = required != 0
+            margin_sum += np.clip(0.5 + (value - required) / (2 * scale), 0, 1) * applies
+            criteria += applies
+    
+    # Without comparable scores fall back to the competitiveness-based likelihood
+    academic = np.divide(margin_sum, criteria, out=scores.acceptance_score / 100, where=criteria > 0)
+    
+    # 1.0 within budget, decreasing linearly to 0 at twice the budget; unknown cost is neutral
+    budget_max = _profile_float(user_profile.budget_range_max)
+    if budget_max:
+        overrun = np.clip((catalog.cost_max - budget_max) / budget_max, 0, 1)
+        budget = np.where(np.isnan(catalog.cost_max), 0.5, 1 - overrun)
+    else:
+        budget = np.full(n, 0.5)
+    
+    # Rank 1 -> 1.0, rank 1000 -> 0.25; unranked universities get no prestige credit
+    ranking = np.where(np.isnan(catalog.ranking), 0.0, 1 / (1 + np.log10(np.fmax(catalog.ranking, 1))))
+    
+    return (ACADEMIC_WEIGHT * academic + BUDGET_WEIGHT * budget + RANKING_WEIGHT * ranking) * 100
+
+
+def top_k(candidates: np.ndarray, values: np.ndarray, k: int) -> np.ndarray:
+    """
+    The k candidates with the highest values, best first, using a partial sort
+    (O(n + k log k)). Ties keep catalog order so pages are stable.
+    """
+    
+    if k <= 0 or len(candidates) == 0:
+        return candidates[:0]
+    if k < len(candidates):
+        candidates = candidates[np.argpartition(-values[candidates], k - 1)[:k]]
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order]
+
+
+def reason_bits(user_profile: Onboarding, catalog: UniversityCatalog) -> np.ndarray:
+    """
+    Vectorized fit_reason_codes: one bit set per REASON_BITS code, for every catalog row.
+    """
+    
+    bits = np.zeros(len(catalog), dtype=np.uint16)
+    
+    def flag(code: str, mask: np.ndarray) -> None:
+        bits[mask] |= REASON_BITS[code]
+    
+    flag("FIELD_MATCH", catalog.field_mask(user_profile.field_of_study))
+    flag("COUNTRY_MATCH", catalog.country_mask(user_profile.preferred_countries))
+    flag("DEGREE_MATCH", catalog.degree_mask(user_profile.intended_degree))
+    
+    budget_max = _profile_float(user_profile.budget_range_max)
+    if budget_max:
+        has_cost = catalog.cost_max > 0  # False for NaN
+        flag("WITHIN_BUDGET", has_cost & (catalog.cost_max <= budget_max))
+        flag("OVER_BUDGET", has_cost & (catalog.cost_max > budget_max))
+    
+    gpa = _profile_float(user_profile.gpa)
+    if gpa:
+        flag("GPA_BELOW", (catalog.gpa_required != 0) & (gpa - catalog.gpa_required < -0.2))
+    
+    ielts = _profile_float(user_profile.ielts_score)
+    if ielts:
+        flag("IELTS_BELOW", ielts < catalog.ielts_required)
+    
+    flag("HIGHLY_COMPETITIVE", catalog.highly_competitive)
+    return bits
+
+
+@lru_cache(maxsize=None)
+def decode_reason_bits(bits: int) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """(fit_codes, risk_codes) for a reason bitmask."""
+    fit_codes = tuple(code for code in FIT_CODES if bits & REASON_BITS[code])
+    risk_codes = tuple(code for code in RISK_CODES if bits & REASON_BITS[code])
+    return fit_codes, risk_codes
+
+
+def eligible_mask(user_profile: Onboarding, catalog: UniversityCatalog) -> np.ndarray:
+    """Universities matching the profile's degree, preferred countries and field."""
+    
+    mask = catalog.degree_mask(user_profile.intended_degree)
     
     # Filter by country preference
     if user_profile.preferred_countries:
-        query = query.filter(University.country.in_(user_profile.preferred_countries))
+        mask &= catalog.country_mask(user_profile.preferred_countries)
     
     # Filter by field (if specified)
     if user_profile.field_of_study:
-        query = query.filter(University.field_of_study.ilike(f"%{user_profile.field_of_study}%"))
+        mask &= catalog.field_mask(user_profile.field_of_study)
+    
+    return mask
+
+
+def recommend_universities(
+    db: Session,
+    user_profile: Onboarding,
+    limit: int = 20,
+    details: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Recommend universities based on user profile.
+    Scores the in-memory catalog snapshot in one vectorized pass.
+    Returns list of universities with categorization and reason codes
+    (plus fit_reason / risk_factors text when details=True).
+    """
+    
+    catalog = get_catalog(db)
+    scores = score_catalog(user_profile, catalog)
+    return build_recommendations(user_profile, catalog, scores, limit, catalog_reasons(user_profile, catalog), details)
+
+
+def build_recommendations(
+    user_profile: Onboarding,
+    catalog: UniversityCatalog,
+    scores: CatalogScores,
+    limit: int = 20,
+    reasons: Optional[np.ndarray] = None,
+    details: bool = False
+) -> List[Dict[str, Any]]:
+    """Take the first `limit` eligible universities, describe them and sort by category."""
     
-    universities = query.limit(limit).all()
+    indices = np.flatnonzero(eligible_mask(user_profile, catalog))[:limit]
+    if reasons is None:
+        reasons = reason_bits(user_profile, catalog)
     
     recommendations = []
-    for uni in universities:
-        category, acceptance = categorize_university(user_profile, uni)
-        analysis = generate_fit_analysis(user_profile, uni, category, acceptance)
-        
-        recommendations.append({
-            "university": uni,
-            "category": category,
-            "acceptance_likelihood": acceptance,
-            "fit_reason": analysis["fit_reason"],
-            "risk_factors": analysis["risk_factors"]
-        })
+    for position, i in enumerate(indices):
+        rec = describe_recommendation(user_profile, catalog.universities[i], scores, i, reasons[i], details)
+        rec["position"] = position
+        recommendations.append(rec)
+    
+    return sort_by_category(recommendations)
+
+
+def describe_recommendation(
+    user_profile: Onboarding,
+    university: Any,
+    scores: CatalogScores,
+    i: int,
+    bits: int,
+    details: bool = False
+) -> Dict[str, Any]:
+    """Recommendation entry for catalog row i; prose is only rendered when asked for."""
     
+    fit_codes, risk_codes = decode_reason_bits(int(bits))
+    rec = {
+        "university": university,
+        "category": scores.category_label(i),
+        "acceptance_likelihood": scores.acceptance_label(i),
+        "acceptance_score": round(float(scores.acceptance_score[i]), 1),
+        "fit_codes": list(fit_codes),
+        "risk_codes": list(risk_codes)
+    }
+    if details:
+        rec.update(render_fit_analysis(user_profile, university, fit_codes, risk_codes))
+    return rec
+
+
+def sort_by_category(recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     # Sort by category priority (safe, target, dream)
     category_order = {"safe": 1, "target": 2, "dream": 3}
     recommendations.sort(key=lambda x: category_order.get(x["category"], 99))
-    
     return recommendations
+
+
+class RankedCandidates:
+    """Eligible indices and fit scores for one profile against one catalog version."""
+    
+    def __init__(self, candidates: np.ndarray, fit: np.ndarray, scores: CatalogScores, reasons: np.ndarray):
+        self.candidates = candidates
+        self.fit = fit
+        self.scores = scores
+        self.reasons = reasons
+        self.ordered: np.ndarray = candidates[:0]  # best-first prefix selected so far
+
+
+# Keyed by profile hash, versioned by the catalog version, so later pages reuse the scores
+ranking_cache = VersionedCache(ttl_seconds=settings.recommendation_cache_ttl_seconds, max_entries=1000)
+reason_cache = VersionedCache(ttl_seconds=settings.recommendation_cache_ttl_seconds, max_entries=1000)
+
+
+def catalog_reasons(user_profile: Onboarding, catalog: UniversityCatalog) -> np.ndarray:
+    """Reason bits for every catalog row, cached per profile and catalog version."""
+    
+    key = profile_key(user_profile)
+    reasons = reason_cache.get(key, catalog.version)
+    if reasons is None:
+        reasons = reason_bits(user_profile, catalog)
+        reason_cache.set(key, catalog.version, reasons)
+    return reasons
+
+
+def profile_key(user_profile: Onboarding) -> str:
+    """Hash of the profile fields that affect ranking."""
+    
+    fields = (
+        user_profile.intended_degree,
+        sorted(user_profile.preferred_countries or []),
+        user_profile.field_of_study,
+        user_profile.gpa,
+        user_profile.ielts_score,
+        user_profile.gre_score,
+        user_profile.budget_range_max,
+    )
+    return hashlib.sha256(repr(fields).encode()).hexdigest()[:16]
+
+
+def encode_cursor(key: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{key}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str) -> int:
+    """Offset stored in a cursor. Raises ValueError if it is malformed or was issued for another profile."""
+    
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_key, offset = base64.urlsafe_b64decode(padded.encode()).decode().rsplit(":", 1)
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid recommendation cursor")
+    if cursor_key != key or offset < 0:
+        raise ValueError("Recommendation cursor has expired, please reload the first page")
+    return offset
+
+
+def rank_universities(
+    db: Session,
+    user_profile: Onboarding,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    details: bool = False
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Rank the whole eligible catalog by continuous fit score and return one page.
+    Returns (recommendations, next_cursor); next_cursor is None on the last page.
+    """
+    
+    catalog = get_catalog(db)
+    key = profile_key(user_profile)
+    offset = decode_cursor(cursor, key) if cursor else 0
+    
+    ranked = ranking_cache.get(key, catalog.version)
+    if ranked is None:
+        if cursor:
+            # The catalog changed (or the entry expired) since the cursor was issued
+            raise ValueError("Recommendation cursor has expired, please reload the first page")
+        scores = score_catalog(user_profile, catalog)
+        candidates = np.flatnonzero(eligible_mask(user_profile, catalog))
+        fit = fit_scores(user_profile, catalog, scores)
+        ranked = RankedCandidates(candidates, fit, scores, catalog_reasons(user_profile, catalog))
+        ranking_cache.set(key, catalog.version, ranked)
+    
+    end = min(offset + limit, len(ranked.candidates))
+    if len(ranked.ordered) < end:
+        # Extend the selected prefix; no rescoring, just a larger partial sort
+        ranked.ordered = top_k(ranked.candidates, ranked.fit, max(end, 2 * len(ranked.ordered)))
+    
+    recommendations = []
+    for i in ranked.ordered[offset:end]:
+        uni = catalog.universities[i]
+        rec = describe_recommendation(user_profile, uni, ranked.scores, i, ranked.reasons[i], details)
+        rec["fit_score"] = round(float(ranked.fit[i]), 1)
+        recommendations.append(rec)
+    
+    next_cursor = encode_cursor(key, end) if end < len(ranked.candidates) else None
+    return recommendations, next_cursor
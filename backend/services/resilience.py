@@ -0,0 +1,342 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import random
+import threading
+import time
+from config import settings
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: rate limits and server-side failures
+TRANSIENT_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+# SDK exceptions that carry no status code but are transient
+TRANSIENT_ERROR_NAMES = {
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+    "ServiceUnavailable", "DeadlineExceeded", "ResourceExhausted", "TooManyRequests",
+    "ConnectError", "ReadTimeout", "RemoteProtocolError",
+}
+
+
+class ProviderUnavailableError(Exception):
+    """Raised when an LLM provider is not configured or failed to initialize."""
+    pass
+
+
+class ProviderTimeoutError(ProviderUnavailableError):
+    """Raised when a provider call misses its per-attempt timeout or overall deadline."""
+    pass
+
+
+class CircuitOpenError(ProviderUnavailableError):
+    """Raised without calling the provider while its circuit breaker is open."""
+    pass
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP-like status of a provider SDK error (openai status_code, google api_core code)."""
+    for attribute in ("status_code", "code", "status"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether retrying the call could succeed: timeouts, connection errors, 429 and 5xx."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (ProviderTimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = error_status(error)
+    if status is not None:
+        return status in TRANSIENT_STATUSES
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Delay requested by the provider through a Retry-After header, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ResiliencePolicy:
+    """Timeouts, retry schedule and hedging for one provider call."""
+
+    def __init__(
+        self,
+        timeout: float,
+        deadline: float,
+        attempts: int,
+        base_delay: float,
+        max_delay: float,
+        hedge_delay: float = 0.0
+    ):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_delay = hedge_delay
+
+    @classmethod
+    def from_settings(cls) -> "ResiliencePolicy":
+        return cls(
+            timeout=settings.ai_call_timeout_seconds,
+            deadline=settings.ai_call_deadline_seconds,
+            attempts=settings.ai_retry_attempts,
+            base_delay=settings.ai_retry_base_delay_seconds,
+            max_delay=settings.ai_retry_max_delay_seconds,
+            hedge_delay=settings.ai_hedge_delay_seconds,
+        )
+
+    def limited(self, deadline: float, attempts: Optional[int] = None) -> "ResiliencePolicy":
+        """Copy of this policy within a shorter overall deadline and, optionally, fewer attempts."""
+        return ResiliencePolicy(
+            timeout=self.timeout,
+            deadline=min(self.deadline, deadline),
+            attempts=self.attempts if attempts is None else attempts,
+            base_delay=self.base_delay,
+            max_delay=self.max_delay,
+            hedge_delay=self.hedge_delay,
+        )
+
+    def backoff(self, retry: int, error: Optional[BaseException] = None) -> float:
+        """Full-jitter exponential delay before the given retry (1-based), or the provider's Retry-After."""
+        requested = retry_after_seconds(error) if error is not None else None
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. After `failure_threshold` transient failures
+    calls fail fast for `reset_seconds`, then a single probe call decides whether
+    the circuit closes again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.rejections = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out now. In half-open state only one probe is let through."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejections += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Let another probe through after a call ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            self._probing = False
+
+
+class ResilienceStats:
+    """Counters for retries, timeouts, hedges and fast failures of one provider."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {
+            "attempts": 0, "retries": 0, "timeouts": 0, "failures": 0,
+            "hedges": 0, "hedge_wins": 0, "rejected": 0,
+        }
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+async def _with_timeout(call: Awaitable[T], timeout: float) -> T:
+    try:
+        return await asyncio.wait_for(call, timeout)
+    except asyncio.TimeoutError:
+        raise ProviderTimeoutError(f"Provider call timed out after {timeout:.1f}s")
+
+
+async def _hedged(fn: Callable[[], Awaitable[T]], timeout: float, hedge_delay: float, stats: ResilienceStats) -> T:
+    """
+    Run fn; if it has not finished after hedge_delay, start a second identical call
+    and return whichever succeeds first. The loser is cancelled.
+    """
+    if not hedge_delay or hedge_delay >= timeout:
+        return await _with_timeout(fn(), timeout)
+
+    loop = asyncio.get_running_loop()
+    ends_at = loop.time() + timeout
+    primary = asyncio.ensure_future(fn())
+    tasks = {primary}
+    hedge = None
+    error: Optional[BaseException] = None
+    try:
+        while tasks:
+            wait = ends_at - loop.time() if hedge else min(hedge_delay, ends_at - loop.time())
+            done, _ = await asyncio.wait(tasks, timeout=max(wait, 0), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                tasks.discard(task)
+                if task.exception() is None:
+                    if task is hedge:
+                        stats.incr("hedge_wins")
+                    return task.result()
+                error = task.exception()
+            if done:
+                continue
+            if hedge is None and loop.time() < ends_at:
+                hedge = asyncio.ensure_future(fn())
+                tasks.add(hedge)
+                stats.incr("hedges")
+                continue
+            raise ProviderTimeoutError(f"Provider call timed out after {timeout:.1f}s")
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def call_with_resilience(
+    fn: Callable[[], Awaitable[T]],
+    breaker: CircuitBreaker,
+    policy: ResiliencePolicy,
+    stats: ResilienceStats
+) -> T:
+    """
+    Call fn under a per-attempt timeout and an overall deadline, retrying transient
+    failures with jittered exponential backoff, hedging slow attempts and failing
+    fast while the circuit breaker is open.
+    """
+    loop = asyncio.get_running_loop()
+    ends_at = loop.time() + policy.deadline
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            stats.incr("rejected")
+            raise CircuitOpenError("Provider circuit is open after repeated failures")
+        remaining = ends_at - loop.time()
+        attempt += 1
+        stats.incr("attempts")
+        try:
+            result = await _hedged(fn, min(policy.timeout, remaining), policy.hedge_delay, stats)
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+        except Exception as e:
+            if isinstance(e, ProviderTimeoutError):
+                stats.incr("timeouts")
+            if not is_transient(e):
+                # The provider answered; the request itself was bad
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            stats.incr("failures")
+            delay = policy.backoff(attempt, e)
+            if attempt >= policy.attempts or loop.time() + delay >= ends_at:
+                raise
+            stats.incr("retries")
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+async def stream_with_resilience(
+    open_stream: Callable[[], AsyncIterator[str]],
+    breaker: CircuitBreaker,
+    policy: ResiliencePolicy,
+    stats: ResilienceStats
+) -> AsyncIterator[str]:
+    """
+    Stream chunks with the per-attempt timeout applied to every chunk. Attempts are
+    retried like call_with_resilience until the first chunk arrives; after that a
+    failure is raised to the caller, since text already sent cannot be taken back.
+    """
+    loop = asyncio.get_running_loop()
+    ends_at = loop.time() + policy.deadline
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            stats.incr("rejected")
+            raise CircuitOpenError("Provider circuit is open after repeated failures")
+        attempt += 1
+        stats.incr("attempts")
+        stream = open_stream().__aiter__()
+        started = False
+        try:
+            while True:
+                timeout = policy.timeout if started else min(policy.timeout, ends_at - loop.time())
+                try:
+                    chunk = await _with_timeout(stream.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                started = True
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            # Cancelled, or the consumer stopped reading (client disconnected)
+            breaker.release_probe()
+            raise
+        except Exception as e:
+            if isinstance(e, ProviderTimeoutError):
+                stats.incr("timeouts")
+            if not is_transient(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            stats.incr("failures")
+            delay = policy.backoff(attempt, e)
+            if started or attempt >= policy.attempts or loop.time() + delay >= ends_at:
+                raise
+            stats.incr("retries")
+            await asyncio.sleep(delay)
+            continue
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        breaker.record_success()
+        return
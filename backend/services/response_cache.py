@@ -0,0 +1,186 @@
+from typing import Any, Dict, Optional, Set, Tuple
+from collections import OrderedDict
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+import numpy as np
+from services.llm_provider import estimate_tokens
+from config import settings
+
+# MinHash over normalized word tokens: NUM_PERM permutations in BANDS bands for LSH lookup
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+_PRIME = np.uint64(4294967311)  # > 2**32; a < 2**31 keeps a * x + b inside uint64
+_rng = np.random.default_rng(20261018)
+_PERM_A = _rng.integers(1, 2 ** 31, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2 ** 32, NUM_PERM, dtype=np.uint64)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_message(message: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a chat message."""
+    text = unicodedata.normalize("NFKC", message).lower()
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def minhash_signature(normalized: str) -> Optional[np.ndarray]:
+    """MinHash signature of the message's word set, or None for an empty message."""
+    tokens = set(normalized.split())
+    if not tokens:
+        return None
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=4).digest(), "little") for t in tokens],
+        dtype=np.uint64
+    )
+    return ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+
+def _band_keys(fingerprint: str, signature: np.ndarray):
+    for band in range(BANDS):
+        yield fingerprint, band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of counsellor replies keyed on (context fingerprint, normalized message).
+    With the similarity tier on, a miss falls back to near-duplicate messages under the same
+    fingerprint whose estimated Jaccard similarity reaches the threshold.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int = 5000,
+        similarity_threshold: Optional[float] = None,
+        max_message_tokens: int = 64
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.max_message_tokens = max_message_tokens
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any], Optional[np.ndarray]]]" = OrderedDict()
+        self._bands: Dict[Tuple[str, int, bytes], Set[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.evictions = 0
+
+    def _cacheable(self, normalized: str) -> bool:
+        return bool(normalized) and estimate_tokens(normalized) <= self.max_message_tokens
+
+    def cacheable(self, message: str) -> bool:
+        """Whether a reply to this message could be stored; counts the ones that could not."""
+        if self._cacheable(normalize_message(message)):
+            return True
+        with self._lock:
+            self.uncacheable += 1
+        return False
+
+    def get(self, fingerprint: str, message: str) -> Optional[Dict[str, Any]]:
+        """Cached reply for the message (or a near-duplicate) under this context fingerprint."""
+        normalized = normalize_message(message)
+        if not self._cacheable(normalized):
+            with self._lock:
+                self.uncacheable += 1
+            return None
+
+        signature = minhash_signature(normalized) if self.similarity_threshold else None
+        now = time.monotonic()
+        with self._lock:
+            key = (fingerprint, normalized)
+            entry = self._live_entry(key, now)
+            if entry is not None:
+                self.exact_hits += 1
+                return dict(entry[1])
+
+            if signature is not None:
+                best, best_similarity = None, self.similarity_threshold
+                candidates = set().union(*(self._bands.get(band, ()) for band in _band_keys(fingerprint, signature)))
+                for candidate in candidates:
+                    entry = self._live_entry(candidate, now)
+                    if entry is None:
+                        continue
+                    similarity = float(np.mean(entry[2] == signature))
+                    if similarity >= best_similarity:
+                        best, best_similarity = entry, similarity
+                if best is not None:
+                    self.similar_hits += 1
+                    return dict(best[1])
+
+            self.misses += 1
+            return None
+
+    def set(self, fingerprint: str, message: str, response: Dict[str, Any]) -> bool:
+        """Store a reply. Replies that carry actions are per-user side effects and are never stored."""
+        normalized = normalize_message(message)
+        if response.get("actions") or not self._cacheable(normalized):
+            return False
+
+        key = (fingerprint, normalized)
+        signature = minhash_signature(normalized) if self.similarity_threshold else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(response), signature)
+            if signature is not None:
+                for band in _band_keys(fingerprint, signature):
+                    self._bands.setdefault(band, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def _live_entry(self, key: Tuple[str, str], now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[2] is None:
+            return
+        for band in _band_keys(key[0], entry[2]):
+            bucket = self._bands.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._bands[band]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bands.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache(
+    ttl_seconds=settings.response_cache_ttl_seconds,
+    max_entries=settings.response_cache_max_entries,
+    similarity_threshold=(
+        settings.response_cache_similarity_threshold if settings.response_cache_similarity_enabled else None
+    ),
+    max_message_tokens=settings.response_cache_max_message_tokens
+)
@@ -0,0 +1,102 @@
+from typing import List, Tuple
+
+# Structured blocks the model appends to its reply. They are hidden from the user.
+HIDDEN_BLOCKS: List[Tuple[str, str]] = [
+    ("[DATA]", "[/DATA]"),
+    ("[ACTIONS]", "[/ACTIONS]"),
+]
+
+
+class StreamingReplyParser:
+    """
+    Incrementally split a streamed AI reply into visible text and hidden blocks.
+
+    Text inside [DATA]...[/DATA] and [ACTIONS]...[/ACTIONS] is withheld from the
+    visible stream, even when a tag is split across chunks. Hidden blocks are
+    kept with their tags so they can be parsed once the stream completes.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._closing_tag = None
+        self.visible_parts: List[str] = []
+        self.hidden_parts: List[str] = []
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk and return the text that is safe to show now."""
+        self._buffer += chunk
+        emitted = []
+
+        while self._buffer:
+            if self._closing_tag:
+                end = self._buffer.find(self._closing_tag)
+                if end == -1:
+                    # Keep a possible partial closing tag, the rest is block content
+                    keep = self._partial_suffix_length(self._buffer, [self._closing_tag])
+                    self.hidden_parts.append(self._buffer[:len(self._buffer) - keep])
+                    self._buffer = self._buffer[len(self._buffer) - keep:]
+                    break
+                end += len(self._closing_tag)
+                self.hidden_parts.append(self._buffer[:end])
+                self._buffer = self._buffer[end:]
+                self._closing_tag = None
+                continue
+
+            start, opening, closing = self._find_opening_tag(self._buffer)
+            if start == -1:
+                # Hold back a trailing "[" or "[ACT" that may become a tag
+                keep = self._partial_suffix_length(self._buffer, [tag for tag, _ in HIDDEN_BLOCKS])
+                emitted.append(self._buffer[:len(self._buffer) - keep])
+                self._buffer = self._buffer[len(self._buffer) - keep:]
+                break
+
+            emitted.append(self._buffer[:start])
+            self.hidden_parts.append(opening)
+            self._buffer = self._buffer[start + len(opening):]
+            self._closing_tag = closing
+
+        text = "".join(emitted)
+        if text:
+            self.visible_parts.append(text)
+        return text
+
+    def finish(self) -> str:
+        """Flush held-back text at the end of the stream."""
+        text = ""
+        if self._closing_tag:
+            # Unterminated block, usually a payload cut off by the output token limit.
+            # Its opening tag and earlier content were withheld as they streamed, so
+            # releasing only this tail would show a fragment; keep it hidden too.
+            self.hidden_parts.append(self._buffer)
+        else:
+            text = self._buffer
+            if text:
+                self.visible_parts.append(text)
+        self._buffer = ""
+        self._closing_tag = None
+        return text
+
+    @property
+    def visible_text(self) -> str:
+        return "".join(self.visible_parts)
+
+    @property
+    def hidden_text(self) -> str:
+        return "".join(self.hidden_parts)
+
+    def _find_opening_tag(self, text: str) -> Tuple[int, str, str]:
+        best = (-1, "", "")
+        for opening, closing in HIDDEN_BLOCKS:
+            index = text.find(opening)
+            if index != -1 and (best[0] == -1 or index < best[0]):
+                best = (index, opening, closing)
+        return best
+
+    def _partial_suffix_length(self, text: str, tags: List[str]) -> int:
+        longest = 0
+        for tag in tags:
+            for length in range(min(len(tag) - 1, len(text)), 0, -1):
+                if text.endswith(tag[:length]):
+                    longest = max(longest, length)
+                    break
+        return longest
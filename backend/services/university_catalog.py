@@ -0,0 +1,166 @@
+from typing import Any, Dict, List, Optional, Sequence
+import threading
+import time
+import numpy as np
+from sqlalchemy import func, true
+from sqlalchemy.orm import Session
+from models.university import University
+from schemas.university import UniversityResponse
+from services.field_matching import FieldIndex, field_of_study_tsquery, field_tokens
+from config import settings
+
+COMPETITIVENESS_CODES = {"low": 0, "medium": 1, "high": 2}
+NO_CODE = -1
+
+
+def _float_array(values: Sequence[Any], missing: float = np.nan) -> np.ndarray:
+    """Float column (Decimal converted once here) with `missing` for NULLs."""
+    return np.array([float(v) if v is not None else missing for v in values], dtype=np.float64)
+
+
+def _lookup_mask(codes: np.ndarray, allowed: Sequence[int], size: int) -> np.ndarray:
+    """Rows whose code is in `allowed`, via a lookup table (NO_CODE maps to the spare last slot)."""
+    table = np.zeros(size + 1, dtype=bool)
+    table[list(allowed)] = True
+    return table[codes]
+
+
+def _encode(values: Sequence[Optional[str]], codes: Dict[str, int]) -> np.ndarray:
+    """Integer-encode a categorical column, growing the code table as needed."""
+    encoded = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        if value is None:
+            encoded[i] = NO_CODE
+        else:
+            encoded[i] = codes.setdefault(value, len(codes))
+    return encoded
+
+
+class UniversityCatalog:
+    """
+    Immutable snapshot of the university catalog as NumPy feature arrays.
+    Row i of every array describes universities[i].
+    """
+
+    def __init__(self, universities: List[Any], version: Any = None):
+        self.universities = universities
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+        self.ids = [str(u.id) for u in universities]
+        self.index = {university_id: i for i, university_id in enumerate(self.ids)}
+        # Requirements use 0 for "not set": the scorer skips a criterion when it is 0 or NULL
+        self.gpa_required = _float_array([u.avg_gpa_required for u in universities], 0.0)
+        self.ielts_required = _float_array([u.min_ielts_required for u in universities], 0.0)
+        self.toefl_required = _float_array([u.min_toefl_required for u in universities], 0.0)
+        self.gre_required = _float_array([u.min_gre_required for u in universities], 0.0)
+        self.cost_min = _float_array([u.estimated_cost_min for u in universities])
+        self.cost_max = _float_array([u.estimated_cost_max for u in universities])
+        self.ranking = _float_array([u.ranking for u in universities])
+        self.competitiveness = np.array(
+            [COMPETITIVENESS_CODES.get(u.competitiveness, NO_CODE) for u in universities],
+            dtype=np.int32
+        )
+
+        self.highly_competitive = self.competitiveness == COMPETITIVENESS_CODES["high"]
+        self.low_competitiveness = self.competitiveness == COMPETITIVENESS_CODES["low"]
+
+        self.country_codes: Dict[str, int] = {}
+        self.degree_codes: Dict[str, int] = {}
+        self.field_codes: Dict[str, int] = {}
+        self.cost_level_codes: Dict[str, int] = {}
+        self.country = _encode([u.country for u in universities], self.country_codes)
+        self.cost_level = _encode([u.cost_level for u in universities], self.cost_level_codes)
+        self.degree_type = _encode([u.degree_type for u in universities], self.degree_codes)
+        self.field_of_study = _encode([(u.field_of_study or "").lower() for u in universities], self.field_codes)
+        # Inverted index over the distinct field names (synonym-normalized tokens)
+        self.field_index = FieldIndex(self.field_codes)
+
+    def __len__(self) -> int:
+        return len(self.universities)
+
+    def get(self, university_id: Any) -> Optional[Any]:
+        """University by id, or None if it is not in this snapshot."""
+        i = self.index.get(str(university_id))
+        return self.universities[i] if i is not None else None
+
+    def country_mask(self, countries: Optional[Sequence[str]]) -> np.ndarray:
+        """Rows located in any of the given countries."""
+        codes = [self.country_codes[c] for c in countries or [] if c in self.country_codes]
+        return _lookup_mask(self.country, codes, len(self.country_codes))
+
+    def degree_mask(self, degree_type: Optional[str]) -> np.ndarray:
+        """Rows offering the given degree type."""
+        code = self.degree_codes.get(degree_type, None)
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return self.degree_type == code
+
+    def field_mask(self, field: Optional[str]) -> np.ndarray:
+        """Rows whose field matches the given text (see field_matching.field_matches)."""
+        if not field:
+            return np.ones(len(self), dtype=bool)
+        # Search the distinct field names only, then broadcast by code
+        codes = self.field_index.search(field)
+        return _lookup_mask(self.field_of_study, codes, len(self.field_codes))
+
+
+_catalog: Optional[UniversityCatalog] = None
+_catalog_checked_at = 0.0
+_catalog_lock = threading.Lock()
+
+
+def _catalog_version(db: Session) -> tuple:
+    """Changes on any insert, delete or in-place update of a university."""
+    count, last_created, last_updated = db.query(
+        func.count(University.id), func.max(University.created_at), func.max(University.updated_at)
+    ).one()
+    return (count, str(last_created), str(last_updated))
+
+
+def get_catalog(db: Session) -> UniversityCatalog:
+    """
+    Get the process-wide catalog snapshot. It is loaded once and re-validated with
+    a single aggregate query every CATALOG_REFRESH_SECONDS.
+    """
+    global _catalog, _catalog_checked_at
+
+    now = time.monotonic()
+    catalog = _catalog
+    if catalog is not None and now - _catalog_checked_at < settings.catalog_refresh_seconds:
+        return catalog
+
+    with _catalog_lock:
+        if _catalog is not None and time.monotonic() - _catalog_checked_at < settings.catalog_refresh_seconds:
+            return _catalog
+
+        version = _catalog_version(db)
+        if _catalog is None or _catalog.version != version:
+            rows = db.query(University).order_by(University.created_at, University.id).all()
+            # Plain response objects, so the snapshot never touches a closed session
+            universities = [UniversityResponse.model_validate(u) for u in rows]
+            _catalog = UniversityCatalog(universities, version)
+        _catalog_checked_at = time.monotonic()
+        return _catalog
+
+
+def invalidate_catalog() -> None:
+    """Drop the snapshot so the next get_catalog() call reloads it (e.g. after seeding)."""
+    global _catalog, _catalog_checked_at
+    with _catalog_lock:
+        _catalog = None
+        _catalog_checked_at = 0.0
+
+
+def field_of_study_condition(db: Session, field: str):
+    """
+    Index-backed SQL filter for universities matching a field of study: the
+    full-text GIN index on Postgres, the catalog's inverted index elsewhere.
+    """
+    if not field_tokens(field):
+        return true()
+    if db.bind.dialect.name == "postgresql":
+        return field_of_study_tsquery(University.field_of_study, field)
+    catalog = get_catalog(db)
+    ids = [catalog.universities[i].id for i in np.flatnonzero(catalog.field_mask(field))]
+    return University.id.in_(ids)
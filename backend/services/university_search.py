@@ -0,0 +1,164 @@
+from typing import Any, Dict, List, Optional, Sequence
+import threading
+import numpy as np
+from services.university_catalog import UniversityCatalog, COMPETITIVENESS_CODES
+
+FACETS = ("country", "cost_level", "competitiveness")
+
+# Set bits per byte value, for counting packed bitmaps
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def _pack(mask: np.ndarray) -> np.ndarray:
+    return np.packbits(mask)
+
+
+def _count(bits: np.ndarray) -> int:
+    return int(_POPCOUNT[bits].sum())
+
+
+class UniversitySearchIndex:
+    """
+    Bitmap index over a catalog snapshot: one packed bitmap per facet value.
+    Filters are combined with bitwise AND and facet counts are popcounts, so a
+    search never needs a GROUP BY per facet.
+    """
+
+    def __init__(self, catalog: UniversityCatalog):
+        self.catalog = catalog
+        self.size = len(catalog)
+        self.all = _pack(np.ones(self.size, dtype=bool))
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {
+            "country": self._value_bitmaps(catalog.country, catalog.country_codes),
+            "cost_level": self._value_bitmaps(catalog.cost_level, catalog.cost_level_codes),
+            "competitiveness": self._value_bitmaps(catalog.competitiveness, COMPETITIVENESS_CODES),
+        }
+        # Unranked universities sort last
+        self.sort_key = np.where(np.isnan(catalog.ranking), np.inf, catalog.ranking)
+
+    def _value_bitmaps(self, column: np.ndarray, codes: Dict[str, int]) -> Dict[str, np.ndarray]:
+        return {value: _pack(column == code) for value, code in codes.items()}
+
+    def facet_filter(self, facet: str, values: Optional[Sequence[str]]) -> Optional[np.ndarray]:
+        """OR of the bitmaps of the selected values, or None when nothing is selected."""
+        if not values:
+            return None
+        bits = np.zeros_like(self.all)
+        for value in values:
+            bitmap = self.bitmaps[facet].get(value)
+            if bitmap is not None:
+                bits |= bitmap
+        return bits
+
+    def search(
+        self,
+        base: np.ndarray,
+        selected: Dict[str, Optional[Sequence[str]]],
+        offset: int = 0,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Apply facet selections on top of the `base` bitmap (all non-facet filters).
+        Each facet's counts ignore that facet's own selection, so the UI can show
+        how many results every alternative value would give.
+        """
+
+        filters = {facet: self.facet_filter(facet, selected.get(facet)) for facet in FACETS}
+
+        facets = {}
+        for facet in FACETS:
+            bits = base.copy()
+            for other, other_bits in filters.items():
+                if other != facet and other_bits is not None:
+                    bits &= other_bits
+            counts = {value: _count(bits & bitmap) for value, bitmap in self.bitmaps[facet].items()}
+            facets[facet] = {value: count for value, count in counts.items() if count}
+
+        bits = base.copy()
+        for other_bits in filters.values():
+            if other_bits is not None:
+                bits &= other_bits
+
+        matches = np.flatnonzero(np.unpackbits(bits, count=self.size))
+        ordered = matches[np.lexsort((matches, self.sort_key[matches]))]
+        return {
+            "total": len(matches),
+            "results": [self.catalog.universities[i] for i in ordered[offset:offset + limit]],
+            "facets": facets
+        }
+
+
+def range_filter(
+    catalog: UniversityCatalog,
+    degree_type: Optional[str] = None,
+    field: Optional[str] = None,
+    cost_min: Optional[int] = None,
+    cost_max: Optional[int] = None,
+    ranking_max: Optional[int] = None,
+    gpa: Optional[float] = None,
+    ielts: Optional[float] = None,
+    toefl: Optional[int] = None,
+    gre: Optional[int] = None
+) -> np.ndarray:
+    """
+    Packed bitmap of the non-facet filters. Score filters keep universities whose
+    requirement is at most the given score (or that have no requirement); cost
+    filters keep universities whose cost range overlaps [cost_min, cost_max].
+    """
+
+    mask = np.ones(len(catalog), dtype=bool)
+    if degree_type:
+        mask &= catalog.degree_mask(degree_type)
+    if field:
+        mask &= catalog.field_mask(field)
+    # NaN costs/rankings compare False, so unknown values are excluded by these filters.
+    # A university with only one end of its cost range set uses it for both ends.
+    if cost_min is not None:
+        mask &= np.fmax(catalog.cost_min, catalog.cost_max) >= cost_min
+    if cost_max is not None:
+        mask &= np.fmin(catalog.cost_min, catalog.cost_max) <= cost_max
+    if ranking_max is not None:
+        mask &= catalog.ranking <= ranking_max
+    for score, required in (
+        (gpa, catalog.gpa_required),
+        (ielts, catalog.ielts_required),
+        (toefl, catalog.toefl_required),
+        (gre, catalog.gre_required),
+    ):
+        if score is not None:
+            mask &= required <= score
+    return _pack(mask)
+
+
+_index: Optional[UniversitySearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_search_index(catalog: UniversityCatalog) -> UniversitySearchIndex:
+    """Bitmap index for the current catalog snapshot, rebuilt when the snapshot changes."""
+    global _index
+
+    index = _index
+    if index is not None and index.catalog is catalog:
+        return index
+    with _index_lock:
+        if _index is None or _index.catalog is not catalog:
+            _index = UniversitySearchIndex(catalog)
+        return _index
+
+
+def search_universities(
+    catalog: UniversityCatalog,
+    countries: Optional[List[str]] = None,
+    cost_levels: Optional[List[str]] = None,
+    competitiveness: Optional[List[str]] = None,
+    offset: int = 0,
+    limit: int = 20,
+    **filters: Any
+) -> Dict[str, Any]:
+    """Faceted search over the catalog. `filters` are passed to range_filter."""
+
+    index = get_search_index(catalog)
+    base = range_filter(catalog, **filters)
+    selected = {"country": countries, "cost_level": cost_levels, "competitiveness": competitiveness}
+    return index.search(base, selected, offset=offset, limit=limit)
@@ -0,0 +1,174 @@
+import pytest
+from contextlib import contextmanager
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from database import Base, get_db
+from main import app
+from models.university import University
+from services.ai_service import provider_router
+from services.response_cache import response_cache
+from services.university_catalog import invalidate_catalog
+
+
+ONBOARDING_DATA = {
+    "education_level": "Bachelors",
+    "degree": "B.Tech",
+    "major": "CS",
+    "graduation_year": 2024,
+    "gpa": 3.8,
+    "intended_degree": "masters",
+    "field_of_study": "Computer Science",
+    "target_intake_year": 2026,
+    "preferred_countries": ["USA"],
+    "budget_range_min": 10000,
+    "budget_range_max": 50000,
+    "funding_type": "self_funded",
+    "ielts_status": "completed",
+    "ielts_score": 7.5,
+    "sop_status": "draft"
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-benchmarks", action="store_true", default=False,
+        help="also run the throughput benchmarks (tests marked benchmark)"
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: throughput measurement, skipped unless --run-benchmarks is given")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="benchmark; run with --run-benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+class QueryCounter:
+    """Records SQL statements sent to the database while active."""
+    
+    def __init__(self):
+        self.statements = []
+    
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+    
+    def assert_at_most(self, budget: int) -> None:
+        assert self.count <= budget, (
+            f"{self.count} queries exceed the budget of {budget}:\n" + "\n\n".join(self.statements)
+        )
+
+
+@pytest.fixture(autouse=True, scope="module")
+def fresh_catalog():
+    """Each test module has its own database, so never reuse another module's catalog snapshot."""
+    invalidate_catalog()
+    yield
+    invalidate_catalog()
+
+
+@pytest.fixture(autouse=True, scope="module")
+def fresh_response_cache():
+    """Test users share profiles, so replies cached by one module must not answer another's chats."""
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_provider_routes():
+    """Fake providers reuse names across tests, so latency and errors seen by one must not route another."""
+    provider_router.reset()
+    yield
+
+
+@pytest.fixture(scope="module")
+def session_factory(tmp_path_factory):
+    """Module-scoped SQLite database wired into the app's get_db dependency."""
+    db_path = tmp_path_factory.mktemp("db") / "test.db"
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    
+    db = TestingSessionLocal()
+    db.add(University(
+        name="Test University",
+        country="USA",
+        degree_type="masters",
+        competitiveness="medium",
+        estimated_cost_max=50000,
+        field_of_study="Computer Science"
+    ))
+    db.commit()
+    db.close()
+    
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestingSessionLocal
+    
+    if previous is not None:
+        app.dependency_overrides[get_db] = previous
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def count_queries(session_factory):
+    """Context manager counting SQL statements, for asserting per-request query budgets."""
+    engine = session_factory.kw["bind"]
+    
+    @contextmanager
+    def _count_queries():
+        counter = QueryCounter()
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            counter.statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    
+    return _count_queries
+
+
+@pytest.fixture(scope="module")
+def api_client(session_factory):
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="module")
+def make_user(api_client):
+    """Factory that signs up and onboards a user, returning auth headers."""
+    
+    def _make_user(email: str) -> dict:
+        response = api_client.post("/api/auth/signup", json={
+            "email": email,
+            "password": "password123",
+            "full_name": "Test User"
+        })
+        assert response.status_code == 201
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = api_client.post("/api/onboarding/", json=ONBOARDING_DATA, headers=headers)
+        assert response.status_code == 201
+        return headers
+    
+    return _make_user
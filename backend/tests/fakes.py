@@ -0,0 +1,124 @@
+import asyncio
+import time
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import AsyncIterator
+from services.llm_provider import ChatPrompt, LLMProvider
+
+
+class FakeProvider(LLMProvider):
+    """Local stand-in for an LLM provider with a fixed reply and latency."""
+
+    def __init__(self, name: str = "fake", reply: str = "Here is my advice.", latency: float = 0.0, chunk_size: int = 7):
+        super().__init__()
+        self.name = name
+        self.reply = reply
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.last_prompt = None
+        self.prompts = []
+
+    def _create_client(self) -> None:
+        pass
+
+    def _generate(self, prompt: ChatPrompt) -> str:
+        self.calls += 1
+        self.last_prompt = prompt
+        self.prompts.append(prompt)
+        time.sleep(self.latency)
+        return self.reply
+
+    async def _agenerate(self, prompt: ChatPrompt) -> str:
+        self.calls += 1
+        self.last_prompt = prompt
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.latency)
+        self._record_usage(prompt, None, None)
+        return self.reply
+
+    async def _astream(self, prompt: ChatPrompt) -> AsyncIterator[str]:
+        self.calls += 1
+        self.last_prompt = prompt
+        self.prompts.append(prompt)
+        for start in range(0, len(self.reply), self.chunk_size):
+            await asyncio.sleep(self.latency)
+            yield self.reply[start:start + self.chunk_size]
+
+
+class FakeStatusError(Exception):
+    """Provider SDK error carrying an HTTP status, like openai.APIStatusError."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FaultyProvider(FakeProvider):
+    """
+    Fake provider that injects one scripted fault per call: an int raises a
+    FakeStatusError with that status, a float hangs for that many seconds before
+    answering, None answers normally. Calls past the end of the script answer normally.
+    """
+
+    def __init__(self, faults=(), **kwargs):
+        super().__init__(**kwargs)
+        self.faults = list(faults)
+
+    async def _fault(self):
+        fault = self.faults.pop(0) if self.faults else None
+        if isinstance(fault, int):
+            raise FakeStatusError(fault)
+        if isinstance(fault, float):
+            await asyncio.sleep(fault)
+
+    async def _agenerate(self, prompt: ChatPrompt) -> str:
+        self.calls += 1
+        self.prompts.append(prompt)
+        await self._fault()
+        await asyncio.sleep(self.latency)
+        return self.reply
+
+    async def _astream(self, prompt: ChatPrompt) -> AsyncIterator[str]:
+        self.calls += 1
+        self.prompts.append(prompt)
+        await self._fault()
+        for start in range(0, len(self.reply), self.chunk_size):
+            yield self.reply[start:start + self.chunk_size]
+
+
+def _maybe(rng, value):
+    return value if rng.random() > 0.2 else None
+
+
+def random_university(rng):
+    """Synthetic catalog row with the University attributes the scorers read."""
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        name="Synthetic University",
+        country=rng.choice(["USA", "UK", "Canada", "Germany"]),
+        degree_type=rng.choice(["masters", "bachelors", "phd"]),
+        field_of_study=rng.choice(["Computer Science", "Data Science", "Business", None]),
+        cost_level=rng.choice(["low", "medium", "high", None]),
+        estimated_cost_min=_maybe(rng, rng.randrange(5000, 40000, 1000)),
+        estimated_cost_max=_maybe(rng, rng.randrange(20000, 80000, 1000)),
+        competitiveness=rng.choice(["low", "medium", "high", None]),
+        avg_gpa_required=_maybe(rng, Decimal(rng.randrange(250, 400)) / 100),
+        min_ielts_required=_maybe(rng, Decimal(rng.randrange(55, 80, 5)) / 10),
+        min_toefl_required=_maybe(rng, rng.randrange(80, 110)),
+        min_gre_required=_maybe(rng, rng.randrange(300, 330)),
+        ranking=_maybe(rng, rng.randrange(1, 500)),
+    )
+
+
+def random_profile(rng):
+    """Synthetic onboarding profile for a masters in Computer Science."""
+    return SimpleNamespace(
+        gpa=_maybe(rng, Decimal(rng.randrange(200, 400)) / 100),
+        ielts_score=_maybe(rng, Decimal(rng.randrange(50, 90, 5)) / 10),
+        gre_score=_maybe(rng, rng.randrange(290, 340)),
+        intended_degree="masters",
+        field_of_study="Computer Science",
+        preferred_countries=["USA", "Canada"],
+    )
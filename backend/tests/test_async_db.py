@@ -0,0 +1,196 @@
+import asyncio
+import inspect
+import time
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from config import settings
+from database import Base, async_database_url, create_async_db_engine, get_async_db, get_db
+from main import include_api_routers
+from models.university import University
+from services.llm_provider import provider_registry
+from conftest import ONBOARDING_DATA
+from fakes import FakeProvider
+
+CHAT_REPLY = (
+    "Start with your exams.\n"
+    "[DATA]\n"
+    '{"actions": [{"type": "create_todo", "title": "Book IELTS", "category": "exam"}], "suggestions": []}\n'
+    "[/DATA]"
+)
+
+BENCH_REQUESTS = 200
+BENCH_CONCURRENCY = 20
+
+
+@pytest.fixture(scope="module")
+def apps(tmp_path_factory):
+    """The API mounted in sync and in async mode, both over the same SQLite file."""
+    db_path = tmp_path_factory.mktemp("async_db") / "test.db"
+    url = f"sqlite:///{db_path}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = SessionLocal()
+    university = University(
+        name="Async University",
+        country="USA",
+        degree_type="masters",
+        competitiveness="medium",
+        estimated_cost_max=40000,
+        field_of_study="Computer Science"
+    )
+    db.add(university)
+    db.commit()
+    university_id = str(university.id)
+    db.close()
+
+    async_engine = create_async_db_engine(url)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    built = {}
+    for mode in ("sync", "async"):
+        app = FastAPI()
+        include_api_routers(app, async_db=mode == "async")
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        built[mode] = app
+    built["university_id"] = university_id
+
+    yield built
+
+    asyncio.run(async_engine.dispose())
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=30)
+
+
+async def _signup(client, email):
+    response = await client.post("/api/auth/signup", json={
+        "email": email,
+        "password": "password123",
+        "full_name": "Async User"
+    })
+    assert response.status_code == 201
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = await client.post("/api/onboarding/", json=ONBOARDING_DATA, headers=headers)
+    assert response.status_code == 201
+    return headers
+
+
+def test_async_database_url():
+    assert async_database_url("postgresql://u:p@db:5432/app") == "postgresql+asyncpg://u:p@db:5432/app"
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert async_database_url("postgresql+asyncpg://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+
+
+def test_async_mode_mounts_async_handlers_first(apps):
+    routes = {}
+    for route in apps["async"].routes:
+        routes.setdefault((route.path, tuple(sorted(route.methods or ()))), route.endpoint)
+    for path, method in (
+        ("/api/dashboard/", "GET"),
+        ("/api/counsellor/chat", "POST"),
+        ("/api/universities/shortlist", "POST"),
+        ("/api/todos/", "GET"),
+        ("/api/todos/{todo_id}", "PATCH"),
+    ):
+        assert inspect.iscoroutinefunction(routes[(path, (method,))]), path
+
+
+def test_async_hot_routes(apps, monkeypatch):
+    fake = FakeProvider(name="fake-async", reply=CHAT_REPLY)
+    provider_registry.register(fake)
+    monkeypatch.setattr(settings, "ai_service", "fake-async")
+
+    async def run():
+        async with _client(apps["async"]) as client:
+            headers = await _signup(client, "async-routes@example.com")
+
+            response = await client.post(
+                "/api/universities/shortlist",
+                json={"university_id": apps["university_id"], "category": "target"},
+                headers=headers
+            )
+            assert response.status_code == 201
+            response = await client.post(
+                "/api/universities/shortlist",
+                json={"university_id": apps["university_id"], "category": "target"},
+                headers=headers
+            )
+            assert response.status_code == 400
+
+            shortlisted = (await client.get("/api/universities/shortlisted", headers=headers)).json()
+            assert [u["university"]["name"] for u in shortlisted] == ["Async University"]
+
+            # Chat actions run through the async session too
+            response = await client.post("/api/counsellor/chat", json={"message": "What next?"}, headers=headers)
+            assert response.status_code == 200
+            assert response.json()["message"] == "Start with your exams."
+
+            todos = (await client.get("/api/todos/", headers=headers)).json()
+            assert [t["title"] for t in todos] == ["Book IELTS"]
+            todo_id = todos[0]["id"]
+
+            response = await client.post(f"/api/todos/{todo_id}/complete", headers=headers)
+            assert response.json()["is_complete"] is True
+            response = await client.patch(f"/api/todos/{todo_id}", json={"priority": "high"}, headers=headers)
+            assert response.json()["priority"] == "high"
+
+            dashboard = (await client.get("/api/dashboard/", headers=headers)).json()
+            assert dashboard["shortlisted_count"] == 1
+            assert dashboard["stage_info"]["current_stage"] == 3
+            assert [t["title"] for t in dashboard["todos"]] == ["Book IELTS"]
+
+            response = await client.delete(f"/api/todos/{todo_id}", headers=headers)
+            assert response.status_code == 200
+            response = await client.get(f"/api/todos/{todo_id}", headers=headers)
+            assert response.status_code == 404
+
+    asyncio.run(run())
+
+
+@pytest.mark.benchmark
+def test_dashboard_throughput_sync_vs_async(apps):
+    """Benchmark: dashboard requests/s with the sync (threadpool) and async route variants."""
+
+    async def run(mode):
+        async with _client(apps[mode]) as client:
+            headers = await _signup(client, f"bench-{mode}@example.com")
+            await client.get("/api/dashboard/", headers=headers)
+
+            semaphore = asyncio.Semaphore(BENCH_CONCURRENCY)
+
+            async def request():
+                async with semaphore:
+                    return await client.get("/api/dashboard/", headers=headers)
+
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(request() for _ in range(BENCH_REQUESTS)))
+            elapsed = time.perf_counter() - started
+            assert all(r.status_code == 200 for r in responses)
+            return BENCH_REQUESTS / elapsed
+
+    throughput = {mode: asyncio.run(run(mode)) for mode in ("sync", "async")}
+    print(
+        f"\ndashboard, {BENCH_REQUESTS} requests at concurrency {BENCH_CONCURRENCY}: "
+        f"sync {throughput['sync']:.0f} req/s, async {throughput['async']:.0f} req/s"
+    )
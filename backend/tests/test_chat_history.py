@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from models.user import ChatHistory, User
+from services.ai_service import AICounsellorService
+
+MESSAGES = 7
+
+
+def _seed_history(session_factory, email):
+    db = session_factory()
+    try:
+        user_id = db.query(User.id).filter(User.email == email).scalar()
+        started = datetime(2026, 1, 1)
+        for index in range(MESSAGES):
+            db.add(ChatHistory(
+                user_id=user_id,
+                role="user" if index % 2 == 0 else "assistant",
+                message=f"message {index}",
+                actions=[{"type": "create_todo", "title": f"todo {index}"}],
+                suggested_questions=["What next?"],
+                # Pairs share a timestamp, so the id breaks ties
+                created_at=started + timedelta(minutes=index // 2)
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_history_pages_walk_back_without_gaps(api_client, make_user, session_factory, count_queries):
+    headers = make_user("history-pages@example.com")
+    _seed_history(session_factory, "history-pages@example.com")
+
+    seen, before = [], None
+    while True:
+        params = {"limit": 3, **({"before": before} if before else {})}
+        with count_queries() as counter:
+            response = api_client.get("/api/counsellor/history", params=params, headers=headers)
+        assert response.status_code == 200
+        counter.assert_at_most(2)
+
+        page = response.json()
+        # Each page reads oldest first, and older pages come later
+        seen = page + seen
+        before = response.headers.get("x-next-cursor")
+        if not before:
+            break
+
+    assert len(seen) == MESSAGES
+    assert len({message["id"] for message in seen}) == MESSAGES
+    keys = [(message["created_at"], message["id"]) for message in seen]
+    assert keys == sorted(keys)
+    assert seen[-1]["actions"] == [{"type": "create_todo", "title": f"todo {MESSAGES - 1}"}]
+
+
+def test_compact_history_omits_json_payloads(api_client, make_user, session_factory):
+    headers = make_user("history-compact@example.com")
+    _seed_history(session_factory, "history-compact@example.com")
+
+    response = api_client.get("/api/counsellor/history", params={"compact": True}, headers=headers)
+    assert response.status_code == 200
+    assert "x-next-cursor" not in response.headers
+    messages = response.json()
+    assert len(messages) == MESSAGES
+    assert set(messages[0]) == {"id", "role", "message", "created_at"}
+
+
+def test_history_schema_documents_both_shapes(api_client):
+    responses = api_client.get("/openapi.json").json()["paths"]["/api/counsellor/history"]["get"]["responses"]
+    shapes = responses["200"]["content"]["application/json"]["schema"]["anyOf"]
+    assert {shape["items"]["$ref"].rsplit("/", 1)[-1] for shape in shapes} == {
+        "ChatHistoryResponse", "ChatHistoryCompactResponse"
+    }
+    assert "X-Next-Cursor" in responses["200"]["headers"]
+
+
+def test_invalid_history_cursor_is_rejected(api_client, make_user):
+    headers = make_user("history-cursor@example.com")
+    for cursor in ("not-a-cursor", "bm90fGE"):
+        response = api_client.get("/api/counsellor/history", params={"before": cursor}, headers=headers)
+        assert response.status_code == 400
+
+
+def test_saved_turn_orders_reply_after_message(api_client, make_user, session_factory):
+    make_user("history-turn@example.com")
+    db = session_factory()
+    try:
+        user_id = db.query(User.id).filter(User.email == "history-turn@example.com").scalar()
+        AICounsellorService(db).save_turn(user_id, "Hello", {"message": "Hi there", "actions": []})
+        rows = db.query(ChatHistory).filter(ChatHistory.user_id == user_id).order_by(
+            ChatHistory.created_at, ChatHistory.id
+        ).all()
+    finally:
+        db.close()
+    assert [row.role for row in rows] == ["user", "assistant"]
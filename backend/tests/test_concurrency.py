@@ -0,0 +1,68 @@
+import asyncio
+import time
+import httpx
+import pytest
+from main import app
+from config import settings
+from services.llm_provider import provider_registry
+from fakes import FakeProvider
+
+CHAT_LATENCY = 1.0
+CONCURRENT_CHATS = 20
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[int(round(pct / 100 * (len(ordered) - 1)))]
+
+
+@pytest.mark.benchmark
+def test_inflight_chats_do_not_stall_other_endpoints(make_user, monkeypatch):
+    """Benchmark: p99 of an unrelated endpoint stays low while chats wait on a slow provider."""
+    headers = make_user("concurrency@example.com")
+    fake = FakeProvider(name="fake", latency=CHAT_LATENCY)
+    provider_registry.register(fake)
+    monkeypatch.setattr(settings, "ai_service", "fake")
+    # Keep every turn in the recent window so no summary updates share the provider
+    monkeypatch.setattr(settings, "chat_history_max_messages", 4 * CONCURRENT_CHATS)
+    
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            started = time.perf_counter()
+            chats = [
+                asyncio.create_task(client.post(
+                    "/api/counsellor/chat", json={"message": f"Question {i}"}, headers=headers
+                ))
+                for i in range(CONCURRENT_CHATS)
+            ]
+            await asyncio.sleep(0.1)
+            
+            latencies = []
+            while not all(task.done() for task in chats):
+                request_start = time.perf_counter()
+                response = await client.get("/api/dashboard/", headers=headers)
+                latencies.append(time.perf_counter() - request_start)
+                assert response.status_code == 200
+            
+            responses = await asyncio.gather(*chats)
+            return latencies, responses, time.perf_counter() - started
+    
+    latencies, responses, elapsed = asyncio.run(run())
+    
+    assert all(r.status_code == 200 for r in responses)
+    assert all(r.json()["message"] == fake.reply for r in responses)
+    assert fake.calls == CONCURRENT_CHATS
+    
+    p99 = _percentile(latencies, 99)
+    print(
+        f"\n{CONCURRENT_CHATS} chats x {CHAT_LATENCY}s provider latency finished in {elapsed:.2f}s; "
+        f"dashboard p50={_percentile(latencies, 50) * 1000:.1f}ms p99={p99 * 1000:.1f}ms "
+        f"over {len(latencies)} requests"
+    )
+    
+    # Chats overlap instead of running one after another on the worker
+    assert elapsed < CHAT_LATENCY * 3
+    # Unrelated requests are served while chats are in flight
+    assert len(latencies) >= 5
+    assert p99 < CHAT_LATENCY / 2
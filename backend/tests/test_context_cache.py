@@ -0,0 +1,40 @@
+from config import settings
+from services.ai_service import context_cache
+from services.llm_provider import provider_registry
+from fakes import FakeProvider
+
+
+def test_context_snapshot_reused_until_shortlist_changes(api_client, make_user, monkeypatch):
+    headers = make_user("context-cache@example.com")
+    fake = FakeProvider(name="fake-context")
+    provider_registry.register(fake)
+    monkeypatch.setattr(settings, "ai_service", "fake-context")
+    # Opening turns are answered from the outline; this test is about the full context
+    monkeypatch.setattr(settings, "response_cache_enabled", False)
+    
+    def chat():
+        response = api_client.post("/api/counsellor/chat", json={"message": "Hi"}, headers=headers)
+        assert response.status_code == 200
+        return fake.last_prompt.context
+    
+    before = context_cache.stats()
+    first = chat()
+    second = chat()
+    after = context_cache.stats()
+    
+    assert second == first
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    assert "SHORTLISTED UNIVERSITIES (0)" in first
+    
+    university_id = api_client.get("/api/universities/recommendations", headers=headers).json()[0]["university"]["id"]
+    response = api_client.post("/api/universities/shortlist", json={
+        "university_id": university_id,
+        "category": "target"
+    }, headers=headers)
+    assert response.status_code == 201
+    
+    third = chat()
+    assert "SHORTLISTED UNIVERSITIES (1)" in third
+    assert "Test University" in third
+    assert "Stage 3" in third
@@ -0,0 +1,145 @@
+import asyncio
+from datetime import datetime, timedelta
+from config import settings
+from models.user import ChatHistory, ConversationSummary, User
+from services.llm_provider import estimate_tokens, provider_registry
+from services.memory_service import (
+    SUMMARY_HEADER,
+    ConversationMemory,
+    assemble_prompt,
+    session_runner,
+    update_conversation_summary
+)
+from fakes import FakeProvider
+
+SUMMARY = "Student prefers Canada and is booking IELTS."
+
+
+def _prompt_tokens(prompt):
+    # Same estimate the providers record when usage is not reported
+    return estimate_tokens(prompt.system_text + "".join(m["content"] for m in prompt.messages))
+
+
+def _seed_history(session_factory, email, count, length=400):
+    db = session_factory()
+    try:
+        user_id = db.query(User.id).filter(User.email == email).scalar()
+        started = datetime(2026, 1, 1)
+        db.add_all([
+            ChatHistory(
+                user_id=user_id,
+                role="user" if index % 2 == 0 else "assistant",
+                message=f"message {index} " + "x" * length,
+                created_at=started + timedelta(minutes=index)
+            )
+            for index in range(count)
+        ])
+        db.commit()
+        return user_id
+    finally:
+        db.close()
+
+
+def _summary(session_factory, user_id):
+    db = session_factory()
+    try:
+        return db.get(ConversationSummary, user_id)
+    finally:
+        db.close()
+
+
+def test_prompt_stays_flat_as_the_conversation_grows(api_client, make_user, session_factory, monkeypatch):
+    headers = make_user("memory-flat@example.com")
+    user_id = _seed_history(session_factory, "memory-flat@example.com", 60)
+    fake = FakeProvider(name="fake-memory", reply=SUMMARY)
+    provider_registry.register(fake)
+    monkeypatch.setattr(settings, "ai_service", "fake-memory")
+    monkeypatch.setattr(settings, "chat_history_token_budget", 400)
+    monkeypatch.setattr(settings, "chat_prompt_max_tokens", 3000)
+
+    sizes = []
+    for turn in range(4):
+        fake.prompts.clear()
+        question = f"Question {turn} " + "y" * 400
+        response = api_client.post("/api/counsellor/chat", json={"message": question}, headers=headers)
+        assert response.status_code == 200
+
+        # The chat prompt, then the background summary update as messages leave the window
+        chat_prompt, *summary_prompts = fake.prompts
+        sizes.append(_prompt_tokens(chat_prompt))
+        assert sizes[-1] <= settings.chat_prompt_max_tokens
+        history_tokens = sum(estimate_tokens(m["content"]) for m in chat_prompt.messages[:-1])
+        assert history_tokens <= settings.chat_history_token_budget
+        assert chat_prompt.messages[-1]["content"] == question
+        # The seeded backlog fills one batch on the first turn; later turns wait for the next one
+        assert [("NEW MESSAGES" in p.messages[0]["content"]) for p in summary_prompts] == ([True] if turn == 0 else [])
+        if turn:
+            assert f"{SUMMARY_HEADER}\n{SUMMARY}" in chat_prompt.context
+
+    assert max(sizes) - min(sizes) < 200
+
+    summary = _summary(session_factory, user_id)
+    assert summary.summary == SUMMARY
+    # Only whole batches are folded in
+    assert summary.message_count == settings.chat_summary_batch_messages
+
+    # Clearing the history drops the summary built from it
+    assert api_client.delete("/api/counsellor/history", headers=headers).status_code == 200
+    assert _summary(session_factory, user_id) is None
+
+
+def test_prompt_ceiling_is_hard():
+    memory = ConversationMemory(
+        "s" * 20000,
+        [{"role": "user", "content": "m" * 4000} for _ in range(10)]
+    )
+    prompt = assemble_prompt("STATIC " * 200, "CONTEXT " * 2000, memory, "question " * 5000, max_tokens=1500)
+    assert _prompt_tokens(prompt) <= 1500
+    assert prompt.messages[-1]["content"].startswith("question")
+    assert prompt.system_text.startswith("STATIC")
+
+    # Small prompts pass through unchanged
+    memory = ConversationMemory("", [{"role": "assistant", "content": "Hello"}])
+    prompt = assemble_prompt("STATIC", "CONTEXT", memory, "Hi", max_tokens=1500)
+    assert prompt.context == "CONTEXT"
+    assert prompt.messages == [{"role": "assistant", "content": "Hello"}, {"role": "user", "content": "Hi"}]
+
+
+def test_summary_falls_back_to_extractive_without_a_provider(make_user, session_factory, monkeypatch):
+    make_user("memory-fallback@example.com")
+    user_id = _seed_history(session_factory, "memory-fallback@example.com", 30)
+    monkeypatch.setattr(settings, "ai_service", "missing-provider")
+    monkeypatch.setattr(settings, "chat_history_token_budget", 400)
+    monkeypatch.setattr(settings, "chat_summary_batch_messages", 10)
+    run_db = session_runner(session_factory.kw["bind"])
+
+    assert asyncio.run(update_conversation_summary(user_id, run_db)) is True
+    summary = _summary(session_factory, user_id)
+    assert "- assistant: message" in summary.summary
+    assert summary.message_count == 20
+    assert estimate_tokens(summary.summary) <= settings.chat_summary_max_tokens
+
+    # Nothing new has left the window, so a second pass is a no-op
+    assert asyncio.run(update_conversation_summary(user_id, run_db)) is False
+
+
+def test_long_backlog_is_summarized_from_the_watermark(make_user, session_factory, monkeypatch):
+    make_user("memory-backlog@example.com")
+    user_id = _seed_history(session_factory, "memory-backlog@example.com", 200)
+    fake = FakeProvider(name="fake-backlog", reply=SUMMARY)
+    provider_registry.register(fake)
+    monkeypatch.setattr(settings, "ai_service", "fake-backlog")
+    monkeypatch.setattr(settings, "chat_history_token_budget", 400)
+    run_db = session_runner(session_factory.kw["bind"])
+
+    assert asyncio.run(update_conversation_summary(user_id, run_db)) is True
+
+    # 197 messages left the window: four full batches, oldest first, the rest waits
+    transcripts = [p.messages[0]["content"] for p in fake.prompts]
+    assert len(transcripts) == 4
+    assert "USER: message 0 " in transcripts[0]
+    assert "ASSISTANT: message 39 " in transcripts[0]
+    assert "message 40 " in transcripts[1]
+    summary = _summary(session_factory, user_id)
+    assert summary.message_count == 160
+    assert summary.summarized_until == datetime(2026, 1, 1) + timedelta(minutes=159)
@@ -0,0 +1,38 @@
+def test_repeated_polls_cost_no_queries(api_client, make_user, count_queries):
+    headers = make_user("dashboard-cache@example.com")
+    first = api_client.get("/api/dashboard/", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    with count_queries() as counter:
+        again = api_client.get("/api/dashboard/", headers=headers)
+        not_modified = api_client.get("/api/dashboard/", headers={**headers, "If-None-Match": etag})
+
+    assert again.status_code == 200
+    assert again.json() == first.json()
+    assert again.headers["etag"] == etag
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    counter.assert_at_most(0)
+
+
+def test_writes_change_the_etag(api_client, make_user):
+    headers = make_user("dashboard-etag@example.com")
+    etag = api_client.get("/api/dashboard/", headers=headers).headers["etag"]
+
+    todo = api_client.post("/api/todos/", json={"title": "Book IELTS", "category": "exam"}, headers=headers).json()
+    response = api_client.get("/api/dashboard/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()["todos"]] == ["Book IELTS"]
+    assert response.headers["etag"] != etag
+    etag = response.headers["etag"]
+
+    api_client.post(f"/api/todos/{todo['id']}/complete", headers=headers)
+    response = api_client.get("/api/dashboard/", headers={**headers, "If-None-Match": f"W/{etag}"})
+    assert response.status_code == 200
+    assert response.json()["todos"][0]["is_complete"] is True
+
+    # Weak and listed validators match too
+    etag = response.headers["etag"]
+    response = api_client.get("/api/dashboard/", headers={**headers, "If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
@@ -0,0 +1,57 @@
+import random
+from services.field_matching import FieldIndex, field_matches, normalize_field
+from models.university import University
+
+
+def test_synonyms_are_normalized():
+    assert normalize_field("MS in CS") == "ms in computer science"
+    assert normalize_field("Comp. Sci.") == "computer science"
+    assert normalize_field("MBA") == "business administration"
+    assert normalize_field("Economics") == "economics"
+    # Common words are only aliases when they are the whole field
+    assert normalize_field("IT") == "information technology"
+    assert normalize_field("ME") == "mechanical engineering"
+    assert normalize_field("Teach Me Spanish") == "teach me spanish"
+    assert normalize_field("Art and IT Management") == "art and it management"
+
+
+def test_field_matching():
+    assert field_matches("CS", "Computer Science and Engineering")
+    assert field_matches("Computer Science", "CS")
+    assert field_matches("comp", "Computer Science")
+    assert field_matches(None, "Business Administration")
+    assert not field_matches("Data Science", "Computer Science")
+    # No accidental substring hits
+    assert not field_matches("CS", "Economics")
+
+
+def test_inverted_index_matches_scalar_matching():
+    fields = [
+        "computer science", "cs", "computer science & engineering", "data science",
+        "business administration", "economics", "electrical engineering", "physics", ""
+    ]
+    index = FieldIndex({name: i for i, name in enumerate(fields)})
+    rng = random.Random(1)
+    queries = ["CS", "Computer Science", "science", "eng", "MBA", "EE", "Physics", "econ", "", "AI"]
+    queries += [rng.choice(fields)[:rng.randrange(1, 10)] for _ in range(30)]
+    
+    for query in queries:
+        expected = {i for i, name in enumerate(fields) if field_matches(query, name)}
+        assert index.search(query) == expected, query
+
+
+def test_discover_filters_by_field_synonyms(api_client, session_factory, make_user):
+    db = session_factory()
+    db.add_all([
+        University(name="Abbrev University", country="USA", degree_type="masters", field_of_study="CS"),
+        University(name="Econ University", country="USA", degree_type="masters", field_of_study="Economics"),
+    ])
+    db.commit()
+    db.close()
+    headers = make_user("field-search@example.com")
+    
+    response = api_client.get("/api/universities/discover?field=Computer%20Science", headers=headers)
+    assert response.status_code == 200
+    names = {u["name"] for u in response.json()}
+    assert {"Test University", "Abbrev University"} <= names
+    assert "Econ University" not in names
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import time
+import httpx
+import pytest
+from main import app
+from models.user import User
+from services import auth_service
+
+BENCH_LOGINS = 64
+
+
+def _stored_hash(session_factory, email):
+    db = session_factory()
+    try:
+        return db.query(User).filter(User.email == email).first().password_hash
+    finally:
+        db.close()
+
+
+def test_login_rehashes_when_rounds_change(api_client, session_factory, monkeypatch):
+    credentials = {"email": "rehash@example.com", "password": "password123"}
+    monkeypatch.setattr(auth_service, "pwd_context", auth_service.build_password_context(1000))
+    response = api_client.post("/api/auth/signup", json={**credentials, "full_name": "Rehash User"})
+    assert response.status_code == 201
+    assert _stored_hash(session_factory, credentials["email"]).startswith("$pbkdf2-sha256$1000$")
+
+    monkeypatch.setattr(auth_service, "pwd_context", auth_service.build_password_context(2000))
+    assert api_client.post("/api/auth/login", json=credentials).status_code == 200
+    assert _stored_hash(session_factory, credentials["email"]).startswith("$pbkdf2-sha256$2000$")
+
+    # The upgraded hash still verifies, and a wrong password is still rejected
+    assert api_client.post("/api/auth/login", json=credentials).status_code == 200
+    wrong = {**credentials, "password": "wrong-password"}
+    assert api_client.post("/api/auth/login", json=wrong).status_code == 401
+    assert api_client.post("/api/auth/login", json={**wrong, "email": "nobody@example.com"}).status_code == 401
+
+
+@pytest.mark.benchmark
+def test_login_throughput_per_core(api_client):
+    """Benchmark: logins/second with the configured rounds, per hashing worker."""
+    credentials = {"email": "bench-login@example.com", "password": "password123"}
+    response = api_client.post("/api/auth/signup", json={**credentials, "full_name": "Bench User"})
+    assert response.status_code == 201
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.post("/api/auth/login", json=credentials) for _ in range(BENCH_LOGINS)
+            ))
+            return responses, time.perf_counter() - started
+
+    responses, elapsed = asyncio.run(run())
+    assert all(r.status_code == 200 for r in responses)
+
+    cores = min(auth_service.password_hash_workers(), os.cpu_count() or 1)
+    rate = BENCH_LOGINS / elapsed
+    print(
+        f"\n{BENCH_LOGINS} logins at {auth_service.pwd_context.handler().default_rounds} rounds: "
+        f"{rate:.0f} logins/s over {cores} hashing worker(s), {rate / cores:.0f} logins/s per core"
+    )
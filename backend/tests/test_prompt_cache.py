@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+from config import settings
+from services.ai_service import STATIC_SYSTEM_PROMPT
+from services.llm_provider import ChatPrompt, OpenAIProvider, provider_registry
+from fakes import FakeProvider
+
+
+def test_prompt_starts_with_shared_static_prefix(api_client, make_user, monkeypatch):
+    fake = FakeProvider(name="fake-prefix")
+    provider_registry.register(fake)
+    monkeypatch.setattr(settings, "ai_service", "fake-prefix")
+    # Both users render the same context; measure the provider, not the reply cache
+    monkeypatch.setattr(settings, "response_cache_enabled", False)
+    
+    prompts = []
+    for email in ("prefix-a@example.com", "prefix-b@example.com"):
+        headers = make_user(email)
+        response = api_client.post("/api/counsellor/chat", json={"message": "Hi"}, headers=headers)
+        assert response.status_code == 200
+        prompts.append(fake.last_prompt)
+    
+    assert all(p.static_prefix is STATIC_SYSTEM_PROMPT for p in prompts)
+    assert all(p.system_text.startswith(STATIC_SYSTEM_PROMPT) for p in prompts)
+    assert "STUDENT PROFILE" in prompts[0].context
+    assert "STUDENT PROFILE" not in STATIC_SYSTEM_PROMPT
+    
+    stats = api_client.get("/api/counsellor/metrics").json()["prompt_tokens"]["fake-prefix"]
+    assert stats["requests"] == 2
+    assert stats["uncached_prompt_tokens"] == stats["prompt_tokens"] > 0
+
+
+def test_openai_orders_static_prefix_first_and_counts_cached_tokens():
+    provider = OpenAIProvider(api_key=None, model_name="gpt-4")
+    prompt = ChatPrompt("STATIC", "USER CONTEXT", [{"role": "user", "content": "Hi"}])
+    
+    assert provider._build_messages(prompt) == [
+        {"role": "system", "content": "STATIC"},
+        {"role": "system", "content": "USER CONTEXT"},
+        {"role": "user", "content": "Hi"},
+    ]
+    
+    usage = SimpleNamespace(prompt_tokens=1500, prompt_tokens_details={"cached_tokens": 1024})
+    provider._record_response_usage(prompt, SimpleNamespace(usage=usage))
+    assert provider.token_stats.snapshot() == {
+        "requests": 1,
+        "prompt_tokens": 1500,
+        "cached_prompt_tokens": 1024,
+        "uncached_prompt_tokens": 476,
+        "estimated_requests": 0,
+    }
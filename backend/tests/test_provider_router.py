@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+import pytest
+from config import settings
+from services.ai_service import ProviderRouter
+from services.llm_provider import ChatPrompt, ProviderRegistry, provider_registry
+from services.resilience import ProviderTimeoutError, ProviderUnavailableError
+from fakes import FakeProvider, FakeStatusError, FaultyProvider
+
+PROMPT = ChatPrompt("STATIC", "CONTEXT", [{"role": "user", "content": "Hi"}])
+
+
+@pytest.fixture
+def routing(monkeypatch):
+    monkeypatch.setattr(settings, "ai_retry_attempts", 1)
+    monkeypatch.setattr(settings, "ai_router_enabled", True)
+    monkeypatch.setattr(settings, "ai_fallback_providers", "backup")
+    monkeypatch.setattr(settings, "ai_service", "primary")
+
+
+def _router(*providers):
+    registry = ProviderRegistry()
+    for provider in providers:
+        provider.startup()
+        registry.register(provider)
+    registry.started = True
+    return ProviderRouter(registry)
+
+
+async def _stream(router):
+    return "".join([chunk async for chunk in router.stream(PROMPT)])
+
+
+def test_fails_over_when_the_primary_is_out_of_quota(routing, monkeypatch):
+    primary = FaultyProvider(name="primary", faults=[429])
+    backup = FakeProvider(name="backup", reply="From the backup.")
+    router = _router(primary, backup)
+
+    assert asyncio.run(router.generate(PROMPT)) == "From the backup."
+    assert (primary.calls, backup.calls) == (1, 1)
+    stats = router.stats()["providers"]
+    assert stats["primary"]["failures"] == 1
+    assert stats["backup"]["failures"] == 0
+
+    # Without fallbacks the primary's error surfaces
+    routing_off = _router(FaultyProvider(name="primary", faults=[429]), backup)
+    monkeypatch.setattr(settings, "ai_router_enabled", False)
+    with pytest.raises(FakeStatusError):
+        asyncio.run(routing_off.generate(PROMPT))
+
+
+def test_routes_to_the_fastest_healthy_provider(routing):
+    primary = FakeProvider(name="primary", latency=0.05)
+    backup = FakeProvider(name="backup", latency=0.0)
+    router = _router(primary, backup)
+
+    # Fallbacks are not sent live traffic just to measure them
+    assert [p.name for p in router.candidates()] == ["primary", "backup"]
+    asyncio.run(router.generate(PROMPT))
+    assert [p.name for p in router.candidates()] == ["primary", "backup"]
+    assert backup.calls == 0
+
+    # Once both have answered, the faster one wins
+    router.record("backup", 0.01, True)
+    for _ in range(3):
+        asyncio.run(router.generate(PROMPT))
+    assert backup.calls == 3
+    assert [p.name for p in router.candidates()] == ["backup", "primary"]
+
+    # A provider that keeps failing is skipped for its cooldown even if it was fastest
+    for _ in range(5):
+        router.record("backup", 0.0, False)
+    assert [p.name for p in router.candidates()] == ["primary"]
+
+    # Unconfigured providers are never candidates
+    backup.healthy = False
+    primary.healthy = False
+    with pytest.raises(ProviderUnavailableError):
+        asyncio.run(router.generate(PROMPT))
+
+
+def test_fallbacks_are_off_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "ai_service", "primary")
+    assert settings.ai_fallback_providers == ""
+    router = _router(FakeProvider(name="primary"), FakeProvider(name="openai"))
+    assert [p.name for p in router.candidates()] == ["primary"]
+
+
+def test_failover_skips_retries_and_shares_one_deadline(routing, monkeypatch):
+    monkeypatch.setattr(settings, "ai_retry_attempts", 3)
+    monkeypatch.setattr(settings, "ai_retry_base_delay_seconds", 1.0)
+    monkeypatch.setattr(settings, "ai_retry_max_delay_seconds", 1.0)
+    monkeypatch.setattr(settings, "ai_call_timeout_seconds", 0.3)
+    monkeypatch.setattr(settings, "ai_call_deadline_seconds", 0.5)
+
+    # Quota exhausted: fail over at once instead of backing off on the primary
+    primary = FaultyProvider(name="primary", faults=[429] * 10)
+    backup = FakeProvider(name="backup", reply="From the backup.")
+    router = _router(primary, backup)
+    started = time.perf_counter()
+    assert asyncio.run(router.generate(PROMPT)) == "From the backup."
+    assert time.perf_counter() - started < 0.2
+    assert primary.calls == 1
+
+    # Every provider hangs: the whole call ends at one deadline, not one per provider
+    router = _router(
+        FaultyProvider(name="primary", faults=[5.0] * 10),
+        FaultyProvider(name="backup", faults=[5.0] * 10)
+    )
+    started = time.perf_counter()
+    with pytest.raises(ProviderTimeoutError):
+        asyncio.run(router.generate(PROMPT))
+    assert time.perf_counter() - started < 0.8
+
+
+def test_stream_fails_over_before_the_first_chunk(routing):
+    primary = FaultyProvider(name="primary", faults=[503])
+    backup = FakeProvider(name="backup", reply="Streamed by the backup.", chunk_size=5)
+    router = _router(primary, backup)
+    assert asyncio.run(_stream(router)) == "Streamed by the backup."
+    assert router.stats()["providers"]["primary"]["failures"] == 1
+
+
+def test_chat_answers_from_the_fallback_when_the_primary_is_down(api_client, make_user, monkeypatch):
+    headers = make_user("router@example.com")
+    down = FaultyProvider(name="fake-router-down", faults=[429] * 100)
+    backup = FakeProvider(name="fake-router-backup", reply="Shortlist two safe universities.")
+    provider_registry.register(down)
+    provider_registry.register(backup)
+    monkeypatch.setattr(settings, "ai_service", "fake-router-down")
+    monkeypatch.setattr(settings, "ai_fallback_providers", "fake-router-backup")
+    monkeypatch.setattr(settings, "ai_retry_attempts", 1)
+    monkeypatch.setattr(settings, "response_cache_enabled", False)
+
+    response = api_client.post("/api/counsellor/chat", json={"message": "What next?"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["message"] == "Shortlist two safe universities."
+
+    # The failing primary is now ranked last
+    routing = api_client.get("/api/counsellor/metrics").json()["routing"]
+    assert routing["order"] == ["fake-router-backup", "fake-router-down"]
+    assert routing["providers"]["fake-router-down"]["failures"] == 1
+
+
+class SlowStartProvider(FakeProvider):
+    def __init__(self):
+        super().__init__(name="slow-start")
+        self.clients_created = 0
+
+    def _create_client(self) -> None:
+        self.clients_created += 1
+        time.sleep(0.05)
+
+
+def test_lazy_startup_runs_once_across_threads():
+    registry = ProviderRegistry()
+    provider = SlowStartProvider()
+    registry.register(provider)
+    
+    threads = [threading.Thread(target=registry.get, args=("slow-start",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert registry.started
+    assert provider.clients_created == 1
+    registry.shutdown()
@@ -0,0 +1,118 @@
+from models.user import User, Onboarding
+from models.university import University
+from services.ai_service import AICounsellorService, context_cache
+from conftest import ONBOARDING_DATA
+
+
+def _shortlist_universities(api_client, session_factory, headers, count):
+    db = session_factory()
+    universities = [
+        University(
+            name=f"Budget University {i}",
+            country="USA",
+            degree_type="masters",
+            competitiveness="medium",
+            estimated_cost_max=40000,
+            field_of_study="Computer Science"
+        )
+        for i in range(count)
+    ]
+    db.add_all(universities)
+    db.commit()
+    university_ids = [str(u.id) for u in universities]
+    db.close()
+    
+    for university_id in university_ids:
+        response = api_client.post("/api/universities/shortlist", json={
+            "university_id": university_id,
+            "category": "target"
+        }, headers=headers)
+        assert response.status_code == 201
+    return university_ids
+
+
+def test_chat_context_query_budget(api_client, session_factory, make_user, count_queries):
+    headers = make_user("budget-context@example.com")
+    university_ids = _shortlist_universities(api_client, session_factory, headers, 4)
+    api_client.post("/api/universities/lock", json={"university_id": university_ids[0]}, headers=headers)
+    
+    db = session_factory()
+    user = db.query(User).filter(User.email == "budget-context@example.com").first()
+    onboarding = db.query(Onboarding).filter(Onboarding.user_id == user.id).first()
+    context_cache.invalidate(user.id)
+    
+    with count_queries() as cold:
+        context = AICounsellorService(db).build_context(str(user.id), onboarding)
+    with count_queries() as warm:
+        AICounsellorService(db).build_context(str(user.id), onboarding)
+    db.close()
+    
+    assert "SHORTLISTED UNIVERSITIES (3)" in context
+    assert "LOCKED UNIVERSITIES (1)" in context
+    cold.assert_at_most(2)
+    warm.assert_at_most(0)
+
+
+def test_shortlisted_endpoint_query_budget_is_independent_of_list_size(api_client, session_factory, make_user, count_queries):
+    headers = make_user("budget-shortlist@example.com")
+    _shortlist_universities(api_client, session_factory, headers, 5)
+    
+    with count_queries() as counter:
+        response = api_client.get("/api/universities/shortlisted", headers=headers)
+    
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+    # principal (reloaded after the shortlist writes) + one joined SELECT for all rows
+    counter.assert_at_most(2)
+
+
+def test_cached_principal_skips_auth_queries(api_client, make_user, count_queries):
+    headers = make_user("budget-principal@example.com")
+    api_client.get("/api/todos/", headers=headers)
+    
+    with count_queries() as counter:
+        response = api_client.get("/api/todos/", headers=headers)
+    
+    assert response.status_code == 200
+    # Only the handler's own SELECT: no user or onboarding lookup
+    counter.assert_at_most(1)
+
+
+def test_onboarding_submission_refreshes_cached_principal(api_client):
+    response = api_client.post("/api/auth/signup", json={
+        "email": "budget-onboarding@example.com",
+        "password": "password123",
+        "full_name": "Test User"
+    })
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    
+    assert api_client.get("/api/todos/", headers=headers).status_code == 403
+    assert api_client.post("/api/onboarding/", json=ONBOARDING_DATA, headers=headers).status_code == 201
+    assert api_client.get("/api/todos/", headers=headers).status_code == 200
+
+
+def test_dashboard_is_one_round_trip(api_client, session_factory, make_user, count_queries):
+    headers = make_user("budget-dashboard@example.com")
+    university_ids = _shortlist_universities(api_client, session_factory, headers, 3)
+    api_client.post("/api/universities/lock", json={"university_id": university_ids[0]}, headers=headers)
+    for i in range(12):
+        api_client.post("/api/todos/", json={
+            "title": f"Task {i}",
+            "category": "other",
+            "priority": "high" if i % 3 == 0 else "low"
+        }, headers=headers)
+    api_client.get("/api/dashboard/", headers=headers)
+    
+    with count_queries() as counter:
+        response = api_client.get("/api/dashboard/", headers=headers)
+    
+    assert response.status_code == 200
+    dashboard = response.json()
+    assert dashboard["shortlisted_count"] == 2
+    assert dashboard["locked_count"] == 1
+    assert dashboard["stage_info"]["current_stage"] == 4
+    counter.assert_at_most(1)
+    
+    # Same order as the todo list
+    todos = api_client.get("/api/todos/", headers=headers).json()
+    assert [t["id"] for t in dashboard["todos"]] == [t["id"] for t in todos[:10]]
@@ -0,0 +1,262 @@
+import random
+import time
+from decimal import Decimal
+import numpy as np
+import pytest
+from services import recommendation_service
+from services.recommendation_service import (
+    categorize_university,
+    eligible_mask,
+    fit_scores,
+    decode_reason_bits,
+    fit_reason_codes,
+    rank_universities,
+    reason_bits,
+    recommend_universities,
+    score_catalog,
+    score_profiles,
+    top_k
+)
+from services.recommendation_batch import precompute_recommendations
+from models.university import University, PrecomputedRecommendation
+from config import settings
+from services.university_catalog import UniversityCatalog, get_catalog, invalidate_catalog
+from fakes import random_profile, random_university
+
+
+def test_vectorized_scores_match_scalar_categorization():
+    rng = random.Random(7)
+    universities = [random_university(rng) for _ in range(2000)]
+    catalog = UniversityCatalog(universities)
+    
+    for _ in range(20):
+        profile = random_profile(rng)
+        scores = score_catalog(profile, catalog)
+        for i, uni in enumerate(universities):
+            assert (scores.category_label(i), scores.acceptance_label(i)) == categorize_university(profile, uni)
+
+
+def test_vectorized_scoring_scales_to_large_catalogs():
+    rng = random.Random(11)
+    catalog = UniversityCatalog([random_university(rng) for _ in range(50000)])
+    profile = random_profile(rng)
+    
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        scores = score_catalog(profile, catalog)
+        eligible_mask(profile, catalog)
+    per_profile = (time.perf_counter() - start) / runs
+    print(f"\nScored {len(catalog)} universities in {per_profile * 1000:.2f}ms per profile")
+    
+    assert scores.acceptance_score.shape == (50000,)
+    assert ((scores.acceptance_score >= 0) & (scores.acceptance_score <= 100)).all()
+
+
+def _ranking_profile(rng):
+    profile = random_profile(rng)
+    profile.budget_range_max = rng.randrange(20000, 80000, 5000)
+    return profile
+
+
+def test_top_k_matches_full_sort():
+    rng = random.Random(3)
+    catalog = UniversityCatalog([random_university(rng) for _ in range(3000)])
+    profile = _ranking_profile(rng)
+    fit = fit_scores(profile, catalog, score_catalog(profile, catalog))
+    candidates = np.flatnonzero(eligible_mask(profile, catalog))
+    
+    full = candidates[np.lexsort((candidates, -fit[candidates]))]
+    for k in (1, 20, 57, len(candidates), len(candidates) + 10):
+        assert top_k(candidates, fit, k).tolist() == full[:k].tolist()
+    assert ((fit >= 0) & (fit <= 100)).all()
+
+
+def test_ranked_pages_follow_cursor(monkeypatch):
+    rng = random.Random(5)
+    catalog = UniversityCatalog([random_university(rng) for _ in range(1500)], version="v1")
+    monkeypatch.setattr(recommendation_service, "get_catalog", lambda db: catalog)
+    profile = _ranking_profile(rng)
+    
+    pages, cursor = [], None
+    while True:
+        page, cursor = rank_universities(None, profile, limit=25, cursor=cursor)
+        pages.extend(page)
+        if cursor is None:
+            break
+    
+    eligible = int(eligible_mask(profile, catalog).sum())
+    scores = [rec["fit_score"] for rec in pages]
+    assert len(pages) == eligible
+    assert len({rec["university"].id for rec in pages}) == eligible
+    assert scores == sorted(scores, reverse=True)
+    
+    # A cursor issued for one profile is rejected for another
+    _, cursor = rank_universities(None, profile, limit=5)
+    other = _ranking_profile(rng)
+    other.gpa = Decimal("1.00")
+    with pytest.raises(ValueError):
+        rank_universities(None, other, limit=5, cursor=cursor)
+
+
+def test_ranked_recommendations_endpoint(api_client, session_factory, make_user):
+    db = session_factory()
+    db.add_all([
+        University(
+            name=f"Ranked University {i}",
+            country="USA",
+            degree_type="masters",
+            field_of_study="Computer Science",
+            competitiveness="medium",
+            avg_gpa_required=Decimal("3.0") + Decimal(i) / 10,
+            estimated_cost_max=40000,
+            ranking=10 + i
+        )
+        for i in range(7)
+    ])
+    db.commit()
+    db.close()
+    invalidate_catalog()
+    headers = make_user("ranked@example.com")
+    
+    first = api_client.get("/api/universities/recommendations?ranked=true&limit=5", headers=headers)
+    assert first.status_code == 200
+    cursor = first.headers["X-Next-Cursor"]
+    second = api_client.get(f"/api/universities/recommendations?limit=5&cursor={cursor}", headers=headers)
+    assert second.status_code == 200
+    assert "X-Next-Cursor" not in second.headers
+    
+    results = first.json() + second.json()
+    assert len({r["university"]["id"] for r in results}) == len(results) >= 7
+    assert [r["fit_score"] for r in results] == sorted((r["fit_score"] for r in results), reverse=True)
+    
+    response = api_client.get("/api/universities/recommendations?cursor=garbage", headers=headers)
+    assert response.status_code == 400
+
+
+def test_in_place_university_update_refreshes_the_catalog(session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "catalog_refresh_seconds", 0)
+    invalidate_catalog()
+    db = session_factory()
+    try:
+        university = db.query(University).filter(University.name == "Test University").one()
+        before = get_catalog(db)
+        assert before.get(university.id).estimated_cost_max == 50000
+        
+        # Same row count and creation times; only the updated_at moves
+        university.estimated_cost_max = 65000
+        university.competitiveness = "high"
+        db.commit()
+        
+        after = get_catalog(db)
+        assert after.version != before.version
+        assert after.get(university.id).estimated_cost_max == 65000
+        assert after.get(university.id).competitiveness == "high"
+        
+        university.estimated_cost_max = 50000
+        university.competitiveness = "medium"
+        db.commit()
+    finally:
+        db.close()
+        invalidate_catalog()
+
+
+def test_matrix_scoring_matches_per_profile_scoring():
+    rng = random.Random(13)
+    catalog = UniversityCatalog([random_university(rng) for _ in range(1000)])
+    profiles = [random_profile(rng) for _ in range(30)]
+    
+    batch = score_profiles(profiles, catalog)
+    for p, profile in enumerate(profiles):
+        single = score_catalog(profile, catalog)
+        assert np.array_equal(batch.row(p).category, single.category)
+        assert np.array_equal(batch.row(p).acceptance, single.acceptance)
+        assert np.allclose(batch.row(p).acceptance_score, single.acceptance_score)
+
+
+def test_precomputed_recommendations_are_served(api_client, session_factory, make_user):
+    headers = make_user("precompute@example.com")
+    live = api_client.get("/api/universities/recommendations", headers=headers).json()
+    
+    db = session_factory()
+    try:
+        users = precompute_recommendations(db, chunk_size=1, workers=2)
+        stored = db.query(PrecomputedRecommendation).count()
+    finally:
+        db.close()
+    assert users >= 1
+    assert stored >= len(live) > 0
+    
+    served = api_client.get("/api/universities/recommendations", headers=headers).json()
+    assert served == live
+    
+    # Mark the stored rows to prove the endpoint reads them
+    db = session_factory()
+    db.query(PrecomputedRecommendation).update({"acceptance_score": 12.5})
+    db.commit()
+    db.close()
+    served = api_client.get("/api/universities/recommendations", headers=headers).json()
+    assert {r["acceptance_score"] for r in served} == {12.5}
+    
+    # Stale rows (profile changed since the job ran) are ignored
+    db = session_factory()
+    db.query(PrecomputedRecommendation).update({"profile_key": "stale"})
+    db.commit()
+    db.close()
+    assert api_client.get("/api/universities/recommendations", headers=headers).json() == live
+
+
+def test_vectorized_reason_codes_match_scalar():
+    rng = random.Random(17)
+    universities = [random_university(rng) for _ in range(2000)]
+    catalog = UniversityCatalog(universities)
+    
+    for _ in range(10):
+        profile = _ranking_profile(rng)
+        bits = reason_bits(profile, catalog)
+        for i, uni in enumerate(universities):
+            fit_codes, risk_codes = decode_reason_bits(int(bits[i]))
+            assert (list(fit_codes), list(risk_codes)) == fit_reason_codes(profile, uni)
+
+
+def test_recommendation_text_is_rendered_on_demand(api_client, make_user):
+    headers = make_user("details@example.com")
+    
+    compact = api_client.get("/api/universities/recommendations?details=false", headers=headers).json()
+    assert compact
+    assert "fit_reason" not in compact[0]
+    assert "FIELD_MATCH" in compact[0]["fit_codes"]
+    
+    # The text stays in the default response for existing clients
+    detailed = api_client.get("/api/universities/recommendations", headers=headers).json()
+    assert [r["fit_codes"] for r in detailed] == [r["fit_codes"] for r in compact]
+    assert "Matches your field of study" in detailed[0]["fit_reason"]
+    
+    university_id = compact[0]["university"]["id"]
+    fit = api_client.get(f"/api/universities/{university_id}/fit", headers=headers).json()
+    assert fit["fit_reason"] == detailed[0]["fit_reason"]
+    assert fit["risk_factors"] == detailed[0]["risk_factors"]
+    
+    response = api_client.get("/api/universities/not-a-uuid/fit", headers=headers)
+    assert response.status_code == 404
+
+
+def test_recommend_universities_reads_the_stored_catalog(session_factory):
+    invalidate_catalog()
+    profile = _ranking_profile(random.Random(19))
+    db = session_factory()
+    try:
+        compact = recommend_universities(db, profile, limit=5)
+        detailed = recommend_universities(db, profile, limit=5, details=True)
+    finally:
+        db.close()
+    
+    names = [r["university"].name for r in compact]
+    assert "Test University" in names
+    assert "fit_reason" not in compact[0]
+    order = {"safe": 1, "target": 2, "dream": 3}
+    assert [order[r["category"]] for r in compact] == sorted(order[r["category"]] for r in compact)
+    
+    # details=True only adds the rendered text on top of the same codes
+    assert [r["fit_codes"] for r in detailed] == [r["fit_codes"] for r in compact]
+    assert "Matches your field of study" in detailed[names.index("Test University")]["fit_reason"]
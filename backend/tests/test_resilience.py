@@ -0,0 +1,165 @@
+import asyncio
+import time
+import pytest
+from config import settings
+from services.ai_service import AI_ERROR_MESSAGE
+from services.llm_provider import ChatPrompt, provider_registry
+from services.resilience import CircuitOpenError, ProviderTimeoutError, is_transient
+from fakes import FakeStatusError, FaultyProvider
+
+PROMPT = ChatPrompt("STATIC", "CONTEXT", [{"role": "user", "content": "Hi"}])
+
+
+@pytest.fixture
+def fast_policy(monkeypatch):
+    for name, value in {
+        "ai_call_timeout_seconds": 0.2,
+        "ai_call_deadline_seconds": 2.0,
+        "ai_retry_attempts": 3,
+        "ai_retry_base_delay_seconds": 0.01,
+        "ai_retry_max_delay_seconds": 0.05,
+        "ai_hedge_delay_seconds": 0.0,
+        "ai_breaker_failure_threshold": 3,
+        "ai_breaker_reset_seconds": 0.3,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+def _provider(faults=(), **kwargs):
+    provider = FaultyProvider(faults=faults, **kwargs)
+    provider.startup()
+    return provider
+
+
+async def _stream(provider):
+    return "".join([chunk async for chunk in provider.astream(PROMPT)])
+
+
+def test_transient_errors_are_retried_with_backoff(fast_policy):
+    provider = _provider(faults=[503, 429])
+    assert asyncio.run(provider.agenerate(PROMPT)) == provider.reply
+    assert provider.calls == 3
+    stats = provider.resilience_stats.snapshot()
+    assert stats["retries"] == 2
+    assert stats["failures"] == 2
+
+    # Client errors are not retried
+    provider = _provider(faults=[400])
+    with pytest.raises(FakeStatusError):
+        asyncio.run(provider.agenerate(PROMPT))
+    assert provider.calls == 1
+    assert not is_transient(FakeStatusError(401))
+
+
+def test_hung_call_times_out_and_is_retried(fast_policy):
+    provider = _provider(faults=[5.0])
+    started = time.perf_counter()
+    assert asyncio.run(provider.agenerate(PROMPT)) == provider.reply
+    assert time.perf_counter() - started < 1.0
+    assert provider.resilience_stats.snapshot()["timeouts"] == 1
+
+    # Every attempt hangs: the call gives up at the overall deadline, not after the hangs
+    provider = _provider(faults=[5.0] * 10)
+    started = time.perf_counter()
+    with pytest.raises(ProviderTimeoutError):
+        asyncio.run(provider.agenerate(PROMPT))
+    assert time.perf_counter() - started < settings.ai_call_deadline_seconds
+    assert provider.calls == settings.ai_retry_attempts
+
+
+def test_circuit_opens_fails_fast_then_recovers(fast_policy):
+    provider = _provider(faults=[503] * 3)
+    with pytest.raises(FakeStatusError):
+        asyncio.run(provider.agenerate(PROMPT))
+    assert provider.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(provider.agenerate(PROMPT))
+    assert provider.calls == 3
+    assert provider.health()["circuit"] == "open"
+
+    # After the reset period one probe goes through and closes the circuit
+    time.sleep(settings.ai_breaker_reset_seconds)
+    assert provider.breaker.state == "half_open"
+    assert asyncio.run(provider.agenerate(PROMPT)) == provider.reply
+    assert provider.breaker.state == "closed"
+
+
+def test_hedged_request_cuts_tail_latency(fast_policy, monkeypatch):
+    monkeypatch.setattr(settings, "ai_call_timeout_seconds", 2.0)
+    monkeypatch.setattr(settings, "ai_hedge_delay_seconds", 0.05)
+    provider = _provider(faults=[1.5])
+
+    started = time.perf_counter()
+    assert asyncio.run(provider.agenerate(PROMPT)) == provider.reply
+    assert time.perf_counter() - started < 0.5
+    stats = provider.resilience_stats.snapshot()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+
+
+def test_stream_retries_until_the_first_chunk(fast_policy):
+    provider = _provider(faults=[502, 5.0], reply="Book your IELTS.", chunk_size=4)
+    assert asyncio.run(_stream(provider)) == "Book your IELTS."
+    assert provider.calls == 3
+    assert provider.resilience_stats.snapshot()["retries"] == 2
+
+
+def test_chat_degrades_to_the_error_message_when_the_provider_is_down(api_client, make_user, fast_policy, monkeypatch):
+    headers = make_user("resilience@example.com")
+    provider = FaultyProvider(name="fake-down", faults=[503] * 100)
+    provider_registry.register(provider)
+    monkeypatch.setattr(settings, "ai_service", "fake-down")
+    monkeypatch.setattr(settings, "response_cache_enabled", False)
+
+    for _ in range(2):
+        response = api_client.post("/api/counsellor/chat", json={"message": "What next?"}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["message"] == AI_ERROR_MESSAGE
+
+    # The second turn failed fast on the open circuit
+    assert provider.calls == 3
+    stats = api_client.get("/api/counsellor/metrics").json()["resilience"]["fake-down"]
+    assert stats["circuit"] == "open"
+    assert stats["rejected"] >= 1
+
+
+def test_cancelled_probe_does_not_lock_the_circuit(fast_policy, monkeypatch):
+    monkeypatch.setattr(settings, "ai_breaker_failure_threshold", 1)
+    monkeypatch.setattr(settings, "ai_retry_attempts", 1)
+    provider = _provider(faults=[503, 5.0], reply="Back again.")
+    with pytest.raises(FakeStatusError):
+        asyncio.run(provider.agenerate(PROMPT))
+    time.sleep(settings.ai_breaker_reset_seconds)
+    assert provider.breaker.state == "half_open"
+
+    async def cancel_probe():
+        task = asyncio.ensure_future(provider.agenerate(PROMPT))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert provider.breaker.state == "half_open"
+    assert asyncio.run(provider.agenerate(PROMPT)) == "Back again."
+    assert provider.breaker.state == "closed"
+
+
+def test_abandoned_stream_probe_does_not_lock_the_circuit(fast_policy, monkeypatch):
+    monkeypatch.setattr(settings, "ai_breaker_failure_threshold", 1)
+    monkeypatch.setattr(settings, "ai_retry_attempts", 1)
+    provider = _provider(faults=[503], reply="Back again.", chunk_size=2)
+    with pytest.raises(FakeStatusError):
+        asyncio.run(provider.agenerate(PROMPT))
+    time.sleep(settings.ai_breaker_reset_seconds)
+
+    async def read_one_chunk():
+        stream = provider.astream(PROMPT)
+        await stream.__anext__()
+        # The client disconnects after the first chunk
+        await stream.aclose()
+
+    asyncio.run(read_one_chunk())
+    assert asyncio.run(_stream(provider)) == "Back again."
+    assert provider.breaker.state == "closed"
@@ -0,0 +1,128 @@
+import json
+from config import settings
+from services.llm_provider import provider_registry
+from services.response_cache import ResponseCache, normalize_message, response_cache
+from fakes import FakeProvider
+
+REPLY = {"message": "Book your IELTS first.", "actions": [], "suggested_questions": ["Which universities fit me?"]}
+
+
+def test_exact_tier_normalizes_and_bounds_entries():
+    cache = ResponseCache(ttl_seconds=60, max_entries=2)
+    assert normalize_message("  What should I do NEXT?! ") == "what should i do next"
+
+    assert cache.set("ctx", "What should I do next?", REPLY)
+    assert cache.get("ctx", "what should i do next") == REPLY
+    assert cache.get("other-ctx", "What should I do next?") is None
+
+    # Replies with actions are per-user side effects
+    assert not cache.set("ctx", "Shortlist MIT", {**REPLY, "actions": [{"type": "shortlist_university"}]})
+    assert cache.get("ctx", "Shortlist MIT") is None
+
+    # Least recently used entry goes first
+    cache.set("ctx", "Which exams?", REPLY)
+    cache.get("ctx", "What should I do next?")
+    cache.set("ctx", "Which universities fit me?", REPLY)
+    assert cache.get("ctx", "Which exams?") is None
+    assert cache.get("ctx", "What should I do next?") == REPLY
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["exact_hits"] == 3
+    assert stats["hit_rate"] == 0.5
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(ttl_seconds=0)
+    cache.set("ctx", "What should I do next?", REPLY)
+    assert cache.get("ctx", "What should I do next?") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_similarity_tier_matches_near_duplicates_only():
+    cache = ResponseCache(ttl_seconds=60, similarity_threshold=0.8)
+    cache.set("ctx", "What should I do next for my applications?", REPLY)
+
+    assert cache.get("ctx", "So what should I do next for my applications") == REPLY
+    assert cache.get("ctx", "Which universities should I apply to?") is None
+    assert cache.get("other-ctx", "So what should I do next for my applications") is None
+    assert cache.stats()["similar_hits"] == 1
+
+    # The exact tier alone does not match near-duplicates
+    exact_only = ResponseCache(ttl_seconds=60)
+    exact_only.set("ctx", "What should I do next for my applications?", REPLY)
+    assert exact_only.get("ctx", "So what should I do next for my applications") is None
+
+
+def _chat(api_client, headers, message):
+    response = api_client.post("/api/counsellor/chat", json={"message": message}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_opening_question_is_shared_across_students(api_client, make_user, monkeypatch):
+    fake = FakeProvider(name="fake-response-cache", reply="Start with your SOP.")
+    provider_registry.register(fake)
+    monkeypatch.setattr(settings, "ai_service", "fake-response-cache")
+    before = response_cache.stats()
+
+    # Both students share the onboarding outline; neither has any history
+    first = make_user("response-cache-a@example.com")
+    second = make_user("response-cache-b@example.com")
+    assert _chat(api_client, first, "What should I do next?")["message"] == "Start with your SOP."
+    assert _chat(api_client, second, "what should I do next")["message"] == "Start with your SOP."
+    assert fake.calls == 1
+
+    # The reply was generated without anything personal in the prompt
+    assert "STUDENT OUTLINE" in fake.last_prompt.context
+    assert "Test User" not in fake.last_prompt.system_text
+    assert "3.8" not in fake.last_prompt.system_text
+    assert fake.last_prompt.messages == [{"role": "user", "content": "What should I do next?"}]
+
+    # The streamed variant answers from the cache too
+    third = make_user("response-cache-c@example.com")
+    response = api_client.post("/api/counsellor/chat/stream", json={"message": "What should I do next"}, headers=third)
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [event[0] for event in events] == ["event: token", "event: done"]
+    assert json.loads(events[-1][1][len("data: "):])["message"] == "Start with your SOP."
+    assert fake.calls == 1
+
+    # Cached turns are still saved to history
+    history = api_client.get("/api/counsellor/history", params={"compact": True}, headers=second).json()
+    assert [m["role"] for m in history] == ["user", "assistant"]
+
+    stats = api_client.get("/api/counsellor/metrics").json()["response_cache"]
+    assert stats["exact_hits"] - before["exact_hits"] == 2
+    assert stats["misses"] - before["misses"] == 1
+
+
+def test_only_suggested_follow_ups_use_the_cache(api_client, make_user, monkeypatch):
+    suggestion = "Which exams do I need?"
+    fake = FakeProvider(
+        name="fake-response-cache-follow-up",
+        reply=f'Because of your budget. [DATA]{json.dumps({"suggestions": [suggestion]})}[/DATA]'
+    )
+    provider_registry.register(fake)
+    monkeypatch.setattr(settings, "ai_service", "fake-response-cache-follow-up")
+
+    first = make_user("response-cache-follow-up-a@example.com")
+    second = make_user("response-cache-follow-up-b@example.com")
+    assert _chat(api_client, first, "Should I apply to MIT?")["suggested_questions"] == [suggestion]
+    assert _chat(api_client, second, "Should I apply to MIT?")["suggested_questions"] == [suggestion]
+    assert fake.calls == 1
+
+    # Free-form follow-ups depend on the conversation and never touch the cache
+    before = response_cache.stats()
+    _chat(api_client, first, "Why?")
+    _chat(api_client, second, "Why?")
+    assert fake.calls == 3
+    assert len(fake.last_prompt.messages) > 1
+    after = response_cache.stats()
+    assert (after["exact_hits"], after["misses"]) == (before["exact_hits"], before["misses"])
+
+    # A question the last reply suggested is answered from the outline, so one reply serves both
+    _chat(api_client, first, suggestion)
+    assert fake.last_prompt.messages == [{"role": "user", "content": suggestion}]
+    _chat(api_client, second, suggestion)
+    assert fake.calls == 4
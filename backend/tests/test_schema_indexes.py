@@ -0,0 +1,107 @@
+import uuid
+from datetime import datetime
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.orm import Session
+from models.user import ChatHistory, Todo
+from models.university import UserUniversity, PrecomputedRecommendation
+from database import Base
+from services.history_service import history_page_statement
+
+HOT_INDEXES = {
+    "user_universities": {"uq_user_universities_user_university", "ix_user_universities_user_status"},
+    "todos": {"ix_todos_user_order"},
+    "chat_history": {"ix_chat_history_user_created"},
+    "precomputed_recommendations": {"ix_precomputed_recommendations_lookup"},
+}
+
+
+def _alembic_config(url):
+    config = Config("alembic.ini")
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def _query_plan(engine, statement):
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+@pytest.fixture(scope="module")
+def migrated_engine(tmp_path_factory):
+    url = f"sqlite:///{tmp_path_factory.mktemp('migrations') / 'schema.db'}"
+    command.upgrade(_alembic_config(url), "head")
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+def test_migrations_create_the_model_indexes(migrated_engine):
+    inspector = inspect(migrated_engine)
+    for table, expected in HOT_INDEXES.items():
+        assert expected <= {index["name"] for index in inspector.get_indexes(table)}
+        # Models declare the same indexes, so create_all and migrations agree
+        assert expected <= {index.name for index in Base.metadata.tables[table].indexes}
+
+
+def test_hot_queries_use_index_scans(migrated_engine):
+    user_id = uuid.uuid4()
+    queries = [
+        ("ix_user_universities_user_status", select(UserUniversity).where(
+            UserUniversity.user_id == user_id, UserUniversity.status == "shortlisted"
+        ).order_by(UserUniversity.created_at)),
+        ("uq_user_universities_user_university", select(UserUniversity).where(
+            UserUniversity.user_id == user_id, UserUniversity.university_id == uuid.uuid4()
+        )),
+        ("ix_todos_user_order", select(Todo).where(Todo.user_id == user_id).order_by(
+            Todo.is_complete.asc(), Todo.priority.desc(), Todo.created_at.desc()
+        ).limit(10)),
+        ("ix_chat_history_user_created", select(ChatHistory).where(
+            ChatHistory.user_id == user_id
+        ).order_by(ChatHistory.created_at.desc()).limit(5)),
+        # History pages seek to the cursor instead of scanning past it
+        ("ix_chat_history_user_created", history_page_statement(
+            user_id, 50, before=(datetime(2026, 1, 1), uuid.uuid4()), compact=True
+        )),
+        ("ix_precomputed_recommendations_lookup", select(PrecomputedRecommendation).where(
+            PrecomputedRecommendation.user_id == user_id,
+            PrecomputedRecommendation.profile_key == "key",
+            PrecomputedRecommendation.catalog_version == "v1",
+            PrecomputedRecommendation.position < 20
+        ).order_by(PrecomputedRecommendation.position)),
+    ]
+    
+    for index, statement in queries:
+        plan = _query_plan(migrated_engine, statement)
+        assert f"INDEX {index}" in plan, plan
+        # The index also provides the ordering: no separate sort step
+        assert "TEMP B-TREE" not in plan, plan
+
+
+def test_duplicate_shortlist_rows_are_removed_before_the_unique_index(tmp_path):
+    url = f"sqlite:///{tmp_path / 'dedupe.db'}"
+    config = _alembic_config(url)
+    command.upgrade(config, "0002")
+    
+    engine = create_engine(url)
+    user_id, university_id = uuid.uuid4(), uuid.uuid4()
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA foreign_keys = OFF"))
+        for status, created_at in (("shortlisted", "2024-01-01"), ("locked", "2024-02-01"), ("shortlisted", "2024-03-01")):
+            conn.execute(
+                text("INSERT INTO user_universities (id, user_id, university_id, status, created_at) "
+                     "VALUES (:id, :user_id, :university_id, :status, :created_at)"),
+                {"id": uuid.uuid4().hex, "user_id": user_id.hex, "university_id": university_id.hex,
+                 "status": status, "created_at": created_at}
+            )
+    
+    command.upgrade(config, "head")
+    with Session(engine) as session:
+        rows = session.execute(text("SELECT status FROM user_universities")).fetchall()
+    engine.dispose()
+    assert [row.status for row in rows] == ["locked"]
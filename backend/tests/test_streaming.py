@@ -0,0 +1,77 @@
+import json
+from config import settings
+from services.llm_provider import provider_registry
+from services.stream_parser import StreamingReplyParser
+from fakes import FakeProvider
+
+REPLY = (
+    "Start with your IELTS prep this month. "
+    "[DATA]\n"
+    '{"actions": [{"type": "create_todo", "title": "Book IELTS", "category": "exam", "priority": "high"}], '
+    '"suggestions": ["Which universities fit me?"]}\n'
+    "[/DATA]"
+)
+
+
+def _parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_parser_hides_blocks_split_across_chunks():
+    reply = "Lock one school. [ACTIONS]{\"actions\": []}[/ACTIONS] Then apply. [DATA]{}[/DATA]"
+    for chunk_size in (1, 3, 8, len(reply)):
+        parser = StreamingReplyParser()
+        emitted = [parser.feed(reply[i:i + chunk_size]) for i in range(0, len(reply), chunk_size)]
+        emitted.append(parser.finish())
+        
+        assert "".join(emitted) == "Lock one school.  Then apply. "
+        assert parser.hidden_text == "[ACTIONS]{\"actions\": []}[/ACTIONS][DATA]{}[/DATA]"
+
+
+def test_parser_hides_an_unterminated_block():
+    reply = "Book your IELTS. [ACTIONS]{\"actions\": [{\"type\": \"create_"
+    for chunk_size in (1, 5, len(reply)):
+        parser = StreamingReplyParser()
+        emitted = [parser.feed(reply[i:i + chunk_size]) for i in range(0, len(reply), chunk_size)]
+        emitted.append(parser.finish())
+        
+        assert "".join(emitted) == "Book your IELTS. "
+        assert parser.hidden_text == reply[len("Book your IELTS. "):]
+
+
+def test_parser_keeps_plain_brackets_visible():
+    parser = StreamingReplyParser()
+    text = parser.feed("Scores [approx] are fine [") + parser.feed("see below]") + parser.finish()
+    assert text == "Scores [approx] are fine [see below]"
+
+
+def test_chat_stream_emits_tokens_then_structured_done_event(api_client, make_user, monkeypatch):
+    headers = make_user("stream@example.com")
+    provider_registry.register(FakeProvider(name="fake-stream", reply=REPLY, chunk_size=5))
+    monkeypatch.setattr(settings, "ai_service", "fake-stream")
+    
+    response = api_client.post("/api/counsellor/chat/stream", json={"message": "What next?"}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    
+    events = _parse_sse(response.text)
+    tokens = [data["text"] for event, data in events if event == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "Start with your IELTS prep this month. "
+    
+    event, done = events[-1]
+    assert event == "done"
+    assert done["message"] == "Start with your IELTS prep this month."
+    assert done["actions"][0]["title"] == "Book IELTS"
+    assert done["suggested_questions"] == ["Which universities fit me?"]
+    
+    history = api_client.get("/api/counsellor/history", headers=headers).json()
+    messages = {m["role"]: m["message"] for m in history}
+    assert messages == {"user": "What next?", "assistant": done["message"]}
+    
+    todos = api_client.get("/api/dashboard/", headers=headers).json()["todos"]
+    assert [t["title"] for t in todos] == ["Book IELTS"]
@@ -0,0 +1,76 @@
+import random
+from collections import Counter
+from services.university_catalog import UniversityCatalog
+from services.university_search import search_universities
+from models.university import University
+from fakes import random_university
+
+
+def _brute_force(universities, countries, competitiveness, ielts):
+    def passes(u, skip=None):
+        return (
+            u.degree_type == "masters"
+            and (not u.min_ielts_required or u.min_ielts_required <= ielts)
+            and (skip == "country" or not countries or u.country in countries)
+            and (skip == "competitiveness" or not competitiveness or u.competitiveness in competitiveness)
+        )
+    
+    matches = [u for u in universities if passes(u)]
+    facets = {
+        "country": Counter(u.country for u in universities if passes(u, "country")),
+        "cost_level": Counter(u.cost_level for u in matches if u.cost_level),
+        "competitiveness": Counter(u.competitiveness for u in universities if passes(u, "competitiveness") and u.competitiveness),
+    }
+    return matches, facets
+
+
+def test_facet_counts_match_brute_force():
+    rng = random.Random(21)
+    universities = [random_university(rng) for _ in range(3000)]
+    catalog = UniversityCatalog(universities)
+    
+    for countries, competitiveness in ((None, None), (["USA", "UK"], None), (["Canada"], ["high", "low"])):
+        result = search_universities(
+            catalog,
+            countries=countries,
+            competitiveness=competitiveness,
+            limit=50,
+            degree_type="masters",
+            ielts=7.0
+        )
+        matches, facets = _brute_force(universities, countries, competitiveness, 7)
+        
+        assert result["total"] == len(matches)
+        assert result["facets"] == {facet: dict(counts) for facet, counts in facets.items()}
+        
+        # Best ranked first, unranked last
+        rankings = [u.ranking if u.ranking is not None else float("inf") for u in result["results"]]
+        assert rankings == sorted(rankings)
+        assert {u.id for u in result["results"]} <= {u.id for u in matches}
+
+
+def test_search_endpoint(api_client, session_factory, make_user):
+    db = session_factory()
+    db.add_all([
+        University(name="Cheap UK", country="UK", degree_type="masters", cost_level="low",
+                   estimated_cost_min=10000, estimated_cost_max=15000, competitiveness="low", ranking=80),
+        University(name="Pricey UK", country="UK", degree_type="masters", cost_level="high",
+                   estimated_cost_min=60000, estimated_cost_max=70000, competitiveness="high", ranking=5),
+    ])
+    db.commit()
+    db.close()
+    headers = make_user("search@example.com")
+    
+    response = api_client.get("/api/universities/search?country=UK&cost_max=20000", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 1
+    assert data["results"][0]["name"] == "Cheap UK"
+    # Country counts ignore the country selection itself
+    assert data["facets"]["country"] == {"UK": 1}
+    
+    response = api_client.get("/api/universities/search?country=UK&cost_max=60000", headers=headers)
+    data = response.json()
+    assert [u["name"] for u in data["results"]] == ["Pricey UK", "Cheap UK"]
+    assert data["facets"]["country"] == {"UK": 2, "USA": 1}
+    assert data["facets"]["competitiveness"] == {"low": 1, "high": 1}
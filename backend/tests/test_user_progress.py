@@ -0,0 +1,116 @@
+import asyncio
+import httpx
+from main import app
+from models.user import User, UserProgress
+from models.university import University
+from services.progress_service import reconcile_user_progress
+
+
+def _progress(session_factory, email):
+    db = session_factory()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        return db.get(UserProgress, user.id)
+    finally:
+        db.close()
+
+
+def _add_university(session_factory, name):
+    db = session_factory()
+    university = University(
+        name=name,
+        country="USA",
+        degree_type="masters",
+        competitiveness="medium",
+        estimated_cost_max=40000,
+        field_of_study="Computer Science"
+    )
+    db.add(university)
+    db.commit()
+    university_id = str(university.id)
+    db.close()
+    return university_id
+
+
+def test_progress_follows_writes(api_client, session_factory, make_user):
+    email = "progress@example.com"
+    headers = make_user(email)
+    progress = _progress(session_factory, email)
+    assert (progress.profile_score, progress.current_stage) == (90, 2)
+    assert progress.profile_academic == "strong"
+
+    university_id = _add_university(session_factory, "Progress University")
+    api_client.post("/api/universities/shortlist", json={"university_id": university_id, "category": "dream"}, headers=headers)
+    progress = _progress(session_factory, email)
+    assert (progress.shortlisted_count, progress.dream_count, progress.current_stage) == (1, 1, 3)
+
+    todo = api_client.post("/api/todos/", json={"title": "SOP", "category": "document", "priority": "high"}, headers=headers).json()
+    assert _progress(session_factory, email).open_todos_high == 1
+    api_client.post(f"/api/todos/{todo['id']}/complete", headers=headers)
+    assert _progress(session_factory, email).open_todos_high == 0
+
+    api_client.post("/api/universities/lock", json={"university_id": university_id}, headers=headers)
+    progress = _progress(session_factory, email)
+    assert (progress.shortlisted_count, progress.locked_count, progress.current_stage) == (0, 1, 4)
+
+    api_client.post(f"/api/universities/unlock/{university_id}", headers=headers)
+    api_client.delete(f"/api/universities/remove/{university_id}", headers=headers)
+    progress = _progress(session_factory, email)
+    assert (progress.shortlisted_count, progress.locked_count, progress.dream_count) == (0, 0, 0)
+    assert progress.current_stage == 2
+
+
+def test_reconcile_repairs_drifted_rows(api_client, session_factory, make_user):
+    email = "progress-reconcile@example.com"
+    headers = make_user(email)
+    university_id = _add_university(session_factory, "Reconcile University")
+    api_client.post("/api/universities/shortlist", json={"university_id": university_id, "category": "safe"}, headers=headers)
+
+    db = session_factory()
+    user = db.query(User).filter(User.email == email).first()
+    db.query(UserProgress).filter(UserProgress.user_id == user.id).update({"shortlisted_count": 99, "current_stage": 1})
+    db.commit()
+    assert reconcile_user_progress(db, batch_size=2) >= 1
+    db.close()
+
+    progress = _progress(session_factory, email)
+    assert (progress.shortlisted_count, progress.safe_count, progress.current_stage) == (1, 1, 3)
+
+
+def test_dashboard_builds_a_missing_progress_row(api_client, session_factory, make_user):
+    email = "progress-missing@example.com"
+    headers = make_user(email)
+    db = session_factory()
+    user = db.query(User).filter(User.email == email).first()
+    db.query(UserProgress).filter(UserProgress.user_id == user.id).delete()
+    db.commit()
+    db.close()
+
+    response = api_client.get("/api/dashboard/", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["stage_info"]["current_stage"] == 2
+    assert _progress(session_factory, email) is not None
+
+
+def test_concurrent_writes_keep_every_count(api_client, session_factory, make_user):
+    email = "progress-concurrent@example.com"
+    headers = make_user(email)
+    db = session_factory()
+    user = db.query(User).filter(User.email == email).first()
+    db.query(UserProgress).filter(UserProgress.user_id == user.id).delete()
+    db.commit()
+    db.close()
+
+    async def create_todos(count):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            return await asyncio.gather(*(
+                client.post("/api/todos/", json={"title": f"Task {i}", "category": "other", "priority": "high"}, headers=headers)
+                for i in range(count)
+            ))
+
+    # Concurrent first writes all create-or-lock the same missing row without a conflict,
+    # and none of them overwrites another's count
+    responses = asyncio.run(create_todos(8))
+    assert [r.status_code for r in responses] == [201] * 8
+    assert _progress(session_factory, email).open_todos_high == 8
@@ -1,21 +1,37 @@
 from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from database import get_async_db, get_db
 from services.auth_service import verify_token
-from models.user import User
+from services.cache_service import VersionedCache, get_user_version
+from models.user import User, Onboarding
+from config import settings
 import uuid
 
 # Security scheme
 security = HTTPBearer()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Dependency to get current authenticated user from JWT token."""
+class Principal:
+    """The authenticated user as most routes need it: identity and onboarding state, no ORM row."""
+    
+    def __init__(self, id: uuid.UUID, email: str, full_name: str, onboarding_complete: bool):
+        self.id = id
+        self.email = email
+        self.full_name = full_name
+        self.onboarding_complete = onboarding_complete
+
+
+# Principals by user id, versioned by the user's data version, which onboarding
+# submission bumps, so a newly onboarded user is never served a stale flag
+principal_cache = VersionedCache(ttl_seconds=settings.principal_cache_ttl_seconds)
+
+
+def _user_id_from_credentials(credentials: HTTPAuthorizationCredentials) -> uuid.UUID:
+    """Validate the bearer token and return the user id it was issued for."""
     
     token = credentials.credentials
     payload = verify_token(token)
@@ -35,7 +51,18 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
+    return uuid.UUID(user_id)
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Dependency to get current authenticated user from JWT token."""
+    
+    user_id = _user_id_from_credentials(credentials)
+    # Onboarding is joined in: require_onboarding_complete and most handlers read it
+    user = db.query(User).options(joinedload(User.onboarding)).filter(User.id == user_id).first()
     
     if not user:
         raise HTTPException(
@@ -53,10 +80,124 @@ def require_onboarding_complete(
 ) -> User:
     """Dependency to ensure user has completed onboarding."""
     
-    if not current_user.onboarding or not current_user.onboarding.is_complete:
+    _check_onboarding_complete(current_user)
+    return current_user
+
+
+def _check_onboarding_complete(user: User) -> None:
+    if not user.onboarding or not user.onboarding.is_complete:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Onboarding must be completed first"
         )
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Async get_current_user. Onboarding is joined in (async sessions cannot lazy-load)."""
+    
+    user_id = _user_id_from_credentials(credentials)
+    result = await db.execute(
+        select(User).options(joinedload(User.onboarding)).where(User.id == user_id)
+    )
+    user = result.scalar_one_or_none()
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return user
+
+
+async def require_onboarding_complete_async(
+    current_user: User = Depends(get_current_user_async)
+) -> User:
+    """Async require_onboarding_complete."""
     
+    _check_onboarding_complete(current_user)
     return current_user
+
+
+def principal_statement(user_id: uuid.UUID):
+    """Identity and onboarding flag of a user, in one query."""
+    return select(
+        User.id,
+        User.email,
+        User.full_name,
+        Onboarding.is_complete
+    ).outerjoin(Onboarding, Onboarding.user_id == User.id).where(User.id == user_id)
+
+
+def _principal_from_row(row) -> Principal:
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return Principal(row.id, row.email, row.full_name, bool(row.is_complete))
+
+
+def _check_principal_onboarded(principal: Principal) -> None:
+    if not principal.onboarding_complete:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Onboarding must be completed first"
+        )
+
+
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Dependency for routes that only need who the user is. Served from the
+    principal cache, so a warm request runs no query before the handler.
+    """
+    
+    user_id = _user_id_from_credentials(credentials)
+    # Read the version before loading so a concurrent onboarding submission leaves the entry stale
+    version = get_user_version(user_id)
+    principal = principal_cache.get(user_id, version)
+    if principal is None:
+        principal = _principal_from_row(db.execute(principal_statement(user_id)).first())
+        principal_cache.set(user_id, version, principal)
+    return principal
+
+
+def require_onboarded_principal(
+    principal: Principal = Depends(get_current_principal)
+) -> Principal:
+    """get_current_principal for routes that require completed onboarding."""
+    
+    _check_principal_onboarded(principal)
+    return principal
+
+
+async def get_current_principal_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Async get_current_principal."""
+    
+    user_id = _user_id_from_credentials(credentials)
+    version = get_user_version(user_id)
+    principal = principal_cache.get(user_id, version)
+    if principal is None:
+        principal = _principal_from_row((await db.execute(principal_statement(user_id))).first())
+        principal_cache.set(user_id, version, principal)
+    return principal
+
+
+async def require_onboarded_principal_async(
+    principal: Principal = Depends(get_current_principal_async)
+) -> Principal:
+    """Async require_onboarded_principal."""
+    
+    _check_principal_onboarded(principal)
+    return principal
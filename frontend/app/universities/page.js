@@ -3,7 +3,8 @@
 import { useState, useEffect } from 'react';
 import ProtectedRoute from '@/components/ProtectedRoute';
 import UniversityCard from '@/components/UniversityCard';
-import { universityAPI } from '@/lib/api';
+import { universityAPI, onboardingAPI } from '@/lib/api';
+import { renderFitAnalysis } from '@/lib/fitAnalysis';
 import Link from 'next/link';
 import { FaFilter, FaUniversity, FaChartLine, FaLock, FaExclamationTriangle } from 'react-icons/fa';
 import { MotionDiv } from '@/components/MotionWrapper';
@@ -21,6 +22,7 @@ function Universities() {
     const [universities, setUniversities] = useState([]);
     const [shortlisted, setShortlisted] = useState([]);
     const [locked, setLocked] = useState([]);
+    const [profile, setProfile] = useState(null);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
@@ -31,7 +33,15 @@ function Universities() {
         setLoading(true);
         try {
             if (tab === 'recommendations') {
-                const response = await universityAPI.getRecommendations();
+                // Only the reason codes are fetched; the fit/risk text is rendered here from
+                // the codes and the profile, which is loaded once per visit
+                const [response, profileResponse] = await Promise.all([
+                    universityAPI.getRecommendations({ details: false }),
+                    profile ? null : onboardingAPI.get(),
+                ]);
+                if (profileResponse) {
+                    setProfile(profileResponse.data);
+                }
                 setUniversities(response.data);
             } else if (tab === 'shortlisted') {
                 const response = await universityAPI.getShortlisted();
@@ -246,8 +256,7 @@ function Universities() {
                                                     userUniversity={{
                                                         category: rec.category,
                                                         acceptance_likelihood: rec.acceptance_likelihood,
-                                                        fit_reason: rec.fit_reason,
-                                                        risk_factors: rec.risk_factors,
+                                                        ...renderFitAnalysis(rec, profile),
                                                     }}
                                                     onShortlist={(uni) => handleShortlist(uni, rec.category)}
                                                 />
@@ -58,7 +58,8 @@ export const dashboardAPI = {
 // University APIs
 export const universityAPI = {
     discover: (params) => api.get('/universities/discover', { params }),
-    getRecommendations: () => api.get('/universities/recommendations'),
+    getRecommendations: (params) => api.get('/universities/recommendations', { params }),
+    getFit: (id) => api.get(`/universities/${id}/fit`),
     shortlist: (data) => api.post('/universities/shortlist', data),
     getShortlisted: () => api.get('/universities/shortlisted'),
     lock: (data) => api.post('/universities/lock', data),
@@ -70,7 +71,7 @@ export const universityAPI = {
 // AI Counsellor APIs
 export const aiAPI = {
     chat: (data) => api.post('/counsellor/chat', data),
-    getHistory: (limit) => api.get('/counsellor/history', { params: { limit } }),
+    getHistory: (limit, before) => api.get('/counsellor/history', { params: { limit, before } }),
     clearHistory: () => api.delete('/counsellor/history'),
 };
 
@@ -0,0 +1,38 @@
+// Renders recommendation reason codes as the fit/risk text shown on university cards.
+// Mirrors render_fit_analysis in backend/services/recommendation_service.py; keep the two in sync.
+
+const formatCost = (value) => Number(value).toLocaleString('en-US');
+
+const FIT_TEXT = {
+    FIELD_MATCH: (profile) => `Matches your field of study: ${profile.field_of_study}`,
+    COUNTRY_MATCH: (profile, university) => `Located in your preferred country: ${university.country}`,
+    DEGREE_MATCH: (profile, university) => `Offers ${university.degree_type} programs`,
+    WITHIN_BUDGET: () => 'Within your budget range',
+};
+
+const RISK_TEXT = {
+    OVER_BUDGET: (profile, university) => `Cost may exceed budget ($${formatCost(university.estimated_cost_max)}/year)`,
+    GPA_BELOW: (profile, university) => `Your GPA (${profile.gpa}) is below average requirement (${university.avg_gpa_required})`,
+    IELTS_BELOW: (profile, university) => `IELTS score below requirement (${profile.ielts_score} < ${university.min_ielts_required})`,
+    HIGHLY_COMPETITIVE: () => 'Highly competitive program with low acceptance rate',
+};
+
+export function renderFitAnalysis(recommendation, profile) {
+    // Responses requested with details=true already carry the text
+    if (recommendation.fit_reason !== undefined) {
+        return { fit_reason: recommendation.fit_reason, risk_factors: recommendation.risk_factors };
+    }
+
+    const { university } = recommendation;
+    const render = (texts, codes) => (codes || [])
+        .filter((code) => texts[code])
+        .map((code) => texts[code](profile || {}, university));
+
+    const fitReasons = render(FIT_TEXT, recommendation.fit_codes);
+    const riskFactors = render(RISK_TEXT, recommendation.risk_codes);
+
+    return {
+        fit_reason: (fitReasons.length ? fitReasons : ['General alignment with your profile']).join('; '),
+        risk_factors: (riskFactors.length ? riskFactors : ['No significant risks identified']).join('; '),
+    };
+}